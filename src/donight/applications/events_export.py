@@ -0,0 +1,126 @@
+"""
+Exports events to files, in a few formats (see get_events_writer).
+The events are written while they are read (see query_exported_events), one row at a time,
+so exporting any amount of events takes the same memory.
+"""
+import csv
+import json
+import os
+from abc import ABCMeta, abstractmethod
+
+from donight.events import Event
+from donight.utils import get_model_fields
+
+# The fields of the events that are exported.
+EXPORTED_FIELDS = get_model_fields(Event, ['id'] + Event.DERIVED_FIELDS)
+# The amount of events read from the db at once, while exporting.
+EXPORT_ROWS_CHUNK_SIZE = 1000
+
+
+def query_exported_events(session, start_from=None, start_to=None):
+    """
+    Queries the exported fields of events, ordered by their start time.
+    The events are fetched from the db in chunks while they are iterated (as rows, without creating Event objects).
+    :param session: The session to query with.
+    :type session: sqlalchemy.orm.Session
+    :param start_from: If given, only events starting at this time or after it are queried.
+    :type start_from: datetime.datetime|None
+    :param start_to: If given, only events starting at this time or before it are queried.
+    :type start_to: datetime.datetime|None
+    :return: The events (rows holding the EXPORTED_FIELDS as attributes).
+    :rtype: iterable
+    """
+    query = session.query(*[getattr(Event, field_name) for field_name in EXPORTED_FIELDS])
+
+    if start_from is not None:
+        query = query.filter(Event.start_time >= start_from)
+    if start_to is not None:
+        query = query.filter(Event.start_time <= start_to)
+
+    return query.order_by(Event.start_time, Event.id).yield_per(EXPORT_ROWS_CHUNK_SIZE)
+
+
+def get_events_writer(file_name):
+    """
+    :param file_name: The name of the exported file, whose extension is the format of the export.
+    :type file_name: str
+    :return: The writer of the file's format.
+    :rtype: EventsWriter
+    :raises ValueError: If there is no writer of the file's format.
+    """
+    extension = os.path.splitext(file_name)[1].lower()
+
+    if extension == '.xlsx':
+        # The excel library is only imported when exporting to excel.
+        from donight.applications.events_to_excel import EventsExcel
+        return EventsExcel()
+    if extension == '.csv':
+        return CsvEventsWriter()
+    if extension in ['.ndjson', '.jsonl']:
+        return JsonLinesEventsWriter()
+
+    raise ValueError('Unknown export format: {} (supported formats: .xlsx, .csv, .ndjson)'.format(file_name))
+
+
+class EventsWriter(object):
+    """
+    This is an interface for writers of events to a file of some format.
+    """
+    __metaclass__ = ABCMeta
+
+    def __init__(self, field_names=EXPORTED_FIELDS):
+        """
+        :param field_names: The fields of the events that are written.
+        :type field_names: list(str)
+        """
+        self.field_names = field_names
+
+    @abstractmethod
+    def write(self, events, events_file_name):
+        """
+        Writes the events to a file, one by one.
+        :param events: The events to write, ordered by their start time (see query_exported_events).
+            Any objects with the fields as attributes can be written.
+        :type events: iterable
+        :param events_file_name: The name of the file to write.
+        :type events_file_name: str
+        """
+        pass
+
+    def get_attributes(self, event):
+        """
+        :return: The unicode values of the fields of the event (empty strings for missing values).
+        :rtype: list(unicode)
+        """
+        return [_get_unicode_or_empty_string(getattr(event, field_name)) for field_name in self.field_names]
+
+
+class CsvEventsWriter(EventsWriter):
+    """
+    Writes events to a csv file (encoded in utf8), with a header line of the field names.
+    """
+    def write(self, events, events_file_name):
+        with open(events_file_name, 'wb') as events_file:
+            writer = csv.writer(events_file)
+            writer.writerow(self.field_names)
+
+            for event in events:
+                writer.writerow([value.encode('utf8') for value in self.get_attributes(event)])
+
+
+class JsonLinesEventsWriter(EventsWriter):
+    """
+    Writes events to a newline delimited json file: a json object of every event (like the api's) in every line.
+    """
+    def write(self, events, events_file_name):
+        serializers = [(field_name, Event.get_attr_serializer(field_name)) for field_name in self.field_names]
+
+        with open(events_file_name, 'wb') as events_file:
+            for event in events:
+                event_dict = {field_name: serializer(getattr(event, field_name))
+                              for field_name, serializer in serializers}
+                events_file.write(json.dumps(event_dict, ensure_ascii=False).encode('utf8') + '\n')
+
+
+def _get_unicode_or_empty_string(obj):
+    return u"" if obj is None else unicode(obj)
@@ -1,54 +1,62 @@
 from itertools import groupby
-from pyexcelerate import Workbook
+from openpyxl import Workbook
+from openpyxl.cell.cell import ILLEGAL_CHARACTERS_RE
 
-from donight.events import Event
-from donight.utils import get_model_fields
+from donight.applications.events_export import EventsWriter
 
 
-class EventsExcel(object):
+class EventsExcel(EventsWriter):
     """
     Used to turn information about events into an excel spreadsheet.
+    The spreadsheet is written in openpyxl's write only mode, so its rows are written while the events are read,
+    and are never held in memory together
+    (only the table of the distinct texts of the spreadsheet is, which the xlsx format requires).
+    For exports of many events, a csv or a json lines file (see get_events_writer) takes the same memory at any size.
     """
-    EXCLUDED_FIELDS = ['id']
-    FIELD_NAMES = get_model_fields(Event, EXCLUDED_FIELDS)
 
     def create_excel(self, events, events_file_name):
         """
         Gets a list of events, and a destination file name.
         It creates an excel spreadsheet containing information about all the events given, split up by the day.
+        (See write, which should be used for events that are already ordered by their start time.)
+        :param events: The events to write to the excel.
+        :type events: list(Event)
+        :param events_file_name: The name of the final excel file.
+        :type events_file_name: str
+        """
+        self.write(sorted(events, key=lambda event: event.start_time), events_file_name)
+
+    def write(self, events, events_file_name):
+        """
+        Writes the events to an excel spreadsheet, split up by the day.
         The format of the spreadsheet is:
         a header line with column names,
         then for every day a line with only the day,
         then for every event of that day all the information about the event.
-        :param events: The events to write to the excel.
-        :type events: list(Event)
+        :param events: The events to write, ordered by their start time (see query_exported_events).
+        :type events: iterable
         :param events_file_name: The name of the final excel file.
         :type events_file_name: str
         """
-        events = list(sorted(events, key=lambda event: event.start_time))
-        workbook = Workbook()
-        events_data = [map(unicode.title, self.FIELD_NAMES)]
+        workbook = Workbook(write_only=True)
+        sheet = workbook.create_sheet('Events')
+        sheet.append(map(unicode.title, self.field_names))
 
-        for day, day_events in groupby(events, key=lambda event: event.start_time.date()):
-            events_data += [[unicode(day)]]
-            events_data += map(self.get_attributes, day_events)
+        for day, day_events in groupby(events, key=_get_start_day):
+            sheet.append([unicode(day) if day is not None else u''])
+            for event in day_events:
+                sheet.append(self.get_attributes(event))
 
-        workbook.new_sheet('Events', data=events_data)
         workbook.save(events_file_name)
 
-    def get_attributes(self, event, attributes=FIELD_NAMES):
+    def get_attributes(self, event):
         """
-        Gets an event, and a list of attributes to get from that event,
-        and returns a list of all those attributes from the event.
-        :param event: The event to get the attributes of.
-        :type event: Event
-        :param attributes: A list of attributes to get from the event.
-        :type attributes: list(str)
-        :return: A list of the values of the attributes in the event.
-        :rtype: list
+        :return: The unicode values of the fields of the event,
+                 without the control characters that openpyxl refuses to write (scraped texts may contain them).
+        :rtype: list(unicode)
         """
-        return [_get_unicode_or_empty_string(getattr(event, attr)) for attr in attributes]
+        return [ILLEGAL_CHARACTERS_RE.sub(u'', value) for value in super(EventsExcel, self).get_attributes(event)]
 
 
-def _get_unicode_or_empty_string(obj):
-    return u"" if obj is None else unicode(obj)
+def _get_start_day(event):
+    return event.start_time.date() if event.start_time is not None else None
@@ -15,9 +15,35 @@ if not DEBUG:
     DB_PASSWORD = os.environ.get('DB_PASSWORD', '')
     DB_CONNECTION_STRING = '{0}://{1}:{2}@{3}/{4}'.format(
         DB_ENGINE, DB_USERNAME, DB_PASSWORD, DB_ADDRESS, DB_NAME)
+    # The address of a read replica of the db, which the web server reads from (defaults to the db itself).
+    DB_READ_ADDRESS = os.environ.get('DB_READ_ADDRESS', '')
+    DB_READ_CONNECTION_STRING = '{0}://{1}:{2}@{3}/{4}'.format(
+        DB_ENGINE, DB_USERNAME, DB_PASSWORD, DB_READ_ADDRESS, DB_NAME) if DB_READ_ADDRESS else DB_CONNECTION_STRING
 else:
-    DB_PATH = os.path.join(ROOT_DIR, 'db.sqlite3')
+    # The path of the sqlite db file (can be changed, for example to run on a temporary db).
+    DB_PATH = os.environ.get('DB_PATH', os.path.join(ROOT_DIR, 'db.sqlite3'))
     DB_CONNECTION_STRING = 'sqlite:///{0}'.format(DB_PATH)
+    DB_READ_CONNECTION_STRING = DB_CONNECTION_STRING
+
+# Whether the schema of the db is migrated when a process first connects to it (see donight.db.bootstrap).
+# Can be disabled when the schema is migrated before the processes start (see donight.scripts.migrate).
+MIGRATE_DB_ON_BOOTSTRAP = os.environ.get('MIGRATE_DB_ON_BOOTSTRAP', 'true').lower() == 'true'
+
+# The amount of web server processes (gunicorn reads it from the same variable) and threads in each of them.
+WEB_WORKERS = int(os.environ.get('WEB_CONCURRENCY', 1))
+WEB_THREADS = int(os.environ.get('WEB_THREADS', 1))
+# The maximal amount of connections all the processes (the web server's and the indexer) may open to the db.
+DB_MAX_CONNECTIONS = int(os.environ.get('DB_MAX_CONNECTIONS', 20))
+# The connections of every process are pooled (see donight.db). By default, the connections are split evenly
+# between the web server's processes and the indexer, and a process doesn't keep more connections than its threads.
+DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', max(1, min(WEB_THREADS, DB_MAX_CONNECTIONS / (WEB_WORKERS + 1)))))
+# Connections beyond the pool size that may be opened when all the pooled connections are in use.
+DB_POOL_MAX_OVERFLOW = int(os.environ.get('DB_POOL_MAX_OVERFLOW',
+                                          max(0, DB_MAX_CONNECTIONS / (WEB_WORKERS + 1) - DB_POOL_SIZE)))
+# The time (in seconds) to wait for a connection when all of them are in use.
+DB_POOL_TIMEOUT = int(os.environ.get('DB_POOL_TIMEOUT', 30))
+# Pooled connections are replaced after this time (in seconds), before the db (or a proxy) drops them.
+DB_POOL_RECYCLE = int(os.environ.get('DB_POOL_RECYCLE', 30 * 60))
 
 LOG_PATH = os.path.join(ROOT_DIR, 'log.txt')
 SCRAPERS_LOG_PATH = os.path.join(ROOT_DIR, 'scrapers_log.txt')
@@ -25,3 +51,64 @@ EXTERNALS_LOG_PATH = os.path.join(ROOT_DIR, 'externals_log.txt')
 
 TIME_BETWEEN_INDEXES = SECONDS_IN_DAY / 4
 
+# The default and maximal amount of events in a page of the events api (see donight.web.app.get_events).
+API_EVENTS_PAGE_SIZE = int(os.environ.get('API_EVENTS_PAGE_SIZE', 100))
+API_EVENTS_MAX_PAGE_SIZE = int(os.environ.get('API_EVENTS_MAX_PAGE_SIZE', 1000))
+# The default and maximal radius (in kilometers) of the events near a point (see donight.web.app.get_events_near).
+API_EVENTS_NEAR_RADIUS = float(os.environ.get('API_EVENTS_NEAR_RADIUS', 2))
+API_EVENTS_NEAR_MAX_RADIUS = float(os.environ.get('API_EVENTS_NEAR_MAX_RADIUS', 50))
+# After every index, the indexer publishes the upcoming events here, so the web server doesn't query them
+# (see donight.snapshot). An empty path disables the snapshot.
+EVENTS_SNAPSHOT_PATH = os.environ.get('EVENTS_SNAPSHOT_PATH', os.path.join(ROOT_DIR, 'events_snapshot.json.gz'))
+
+# Events with titles closer than this (in edit distance, relative to the title length) might be the same event.
+MAX_SIMILAR_TITLE_DISTANCE_RATIO = float(os.environ.get('MAX_SIMILAR_TITLE_DISTANCE_RATIO', 0.15))
+# Only titles sharing at least this part of their trigrams (by Dice coefficient) are compared by edit distance.
+MIN_SIMILAR_TITLE_NGRAMS_SIMILARITY = float(os.environ.get('MIN_SIMILAR_TITLE_NGRAMS_SIMILARITY', 0.5))
+
+# Whether to upload events using native bulk upserts instead of the ORM (see EventFinder.bulk_upload_to_db).
+BULK_UPSERT = os.environ.get('BULK_UPSERT', 'false').lower() == 'true'
+BULK_UPSERT_BATCH_SIZE = int(os.environ.get('BULK_UPSERT_BATCH_SIZE', 500))
+
+# The comma separated names of the sources the indexer scrapes (see donight.event_finder.scrapers.registry),
+# all the sources by default.
+SCRAPED_SOURCES = [name for name in os.environ.get('SCRAPED_SOURCES', '').split(',') if name] or None
+# The amount of scrapers that run at the same time while indexing (1 means scraping one source after another).
+SCRAPING_WORKERS = int(os.environ.get('SCRAPING_WORKERS', 4))
+# The maximal time (in seconds) a single scraper may run before its events are given up on.
+SCRAPER_TIMEOUT = int(os.environ.get('SCRAPER_TIMEOUT', 20 * 60))
+# The amount of scraping tasks (see ConcurrentScraper) that run at the same time, across all the scrapers.
+SCRAPING_TASK_WORKERS = int(os.environ.get('SCRAPING_TASK_WORKERS', 8))
+# The amount of facebook events fetched in a single graph api batch request (the graph api allows at most 50).
+FACEBOOK_BATCH_SIZE = int(os.environ.get('FACEBOOK_BATCH_SIZE', 50))
+
+# The http connections of the scrapers (see donight.utils.http_session).
+HTTP_POOL_SIZE = int(os.environ.get('HTTP_POOL_SIZE', 10))
+HTTP_CONNECT_TIMEOUT = float(os.environ.get('HTTP_CONNECT_TIMEOUT', 10))
+HTTP_READ_TIMEOUT = float(os.environ.get('HTTP_READ_TIMEOUT', 60))
+HTTP_MAX_RETRIES = int(os.environ.get('HTTP_MAX_RETRIES', 3))
+HTTP_BACKOFF_FACTOR = float(os.environ.get('HTTP_BACKOFF_FACTOR', 0.5))
+
+# Scraped http responses are cached here, so unchanged sources are detected (see donight.utils.http_cache).
+HTTP_CACHE_DIR = os.environ.get('HTTP_CACHE_DIR', os.path.join(ROOT_DIR, 'http_cache'))
+# Cached responses expire after this time, so even unchanged sources are fully re-indexed once in a while.
+HTTP_CACHE_TTL = int(os.environ.get('HTTP_CACHE_TTL', SECONDS_IN_DAY))
+HTTP_CACHE_MAX_SIZE = int(os.environ.get('HTTP_CACHE_MAX_SIZE', 50 * 1024 * 1024))
+
+# Scraped facebook events are cached here, so unchanged events aren't fully fetched again
+# (see donight.event_finder.scrapers.facebook_events.FacebookEventsCache).
+FACEBOOK_EVENTS_CACHE_PATH = os.environ.get('FACEBOOK_EVENTS_CACHE_PATH',
+                                            os.path.join(ROOT_DIR, 'facebook_events_cache.json'))
+# Cached facebook events expire after this time, so they are fully fetched once in a while even if unchanged.
+FACEBOOK_EVENTS_CACHE_TTL = int(os.environ.get('FACEBOOK_EVENTS_CACHE_TTL', 7 * SECONDS_IN_DAY))
+
+# Scraped facebook access tokens are stored here (by account), so they are reused by the next runs.
+# They are secrets, so they are stored outside of the source tree by default (readable only by their owner).
+FACEBOOK_ACCESS_TOKENS_PATH = os.environ.get('FACEBOOK_ACCESS_TOKENS_PATH',
+                                             os.path.join(os.path.expanduser('~'), '.donight',
+                                                          'facebook_access_tokens.json'))
+# The assumed lifetime (in seconds) of an access token whose expiry time facebook didn't tell.
+FACEBOOK_ACCESS_TOKEN_LIFETIME = int(os.environ.get('FACEBOOK_ACCESS_TOKEN_LIFETIME', 60 * 60))
+# Access tokens are replaced this time (in seconds) before they expire,
+# so they don't expire in the middle of a scraping.
+FACEBOOK_ACCESS_TOKEN_REFRESH_MARGIN = int(os.environ.get('FACEBOOK_ACCESS_TOKEN_REFRESH_MARGIN', 10 * 60))
@@ -9,6 +9,11 @@ should_hide_browser_window = True
 # e.g. "C:\Program Files (x86)\Mozilla Firefox\firefox.exe". Use None to use the default installation path.
 browser_installation_path = None
 
+# The maximal amount of browsers used at the same time (so a few pages are scraped at the same time).
+browsers_pool_size = 2
+# A browser is replaced by a new one after scraping this amount of pages.
+browser_max_uses = 10
+
 # See documentation of FacebookEventsScraper for more details.
 default_max_events_per_page = 50
 default_max_event_start = datetime.datetime.now() + datetime.timedelta(days=3 * 30)
@@ -18,6 +23,8 @@ default_password = None  # TODO fill in
 facebook_scraped_pages = [
     {
         "page_url": 'https://www.facebook.com/events/subscribed',
+        # The page's events are discovered through the graph api (the page is only browsed if it fails).
+        "graph_edge": 'me/events',
         "email": default_email,
         "password": default_password,
         "halt_condition": MaxEventsHaltCondition(default_max_events_per_page) |  # or:
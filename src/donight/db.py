@@ -0,0 +1,151 @@
+"""
+The connections to the db, shared by the web server and the indexer.
+Session creates sessions of the db itself, which the indexer writes with.
+ReadSession is a scoped (thread local) session of the read replica (or of the db itself, if there is no replica),
+which the web server reads with, and removes at the end of every request (see donight.web.app).
+
+Importing donight doesn't connect to the db: the engines are created (and the schema is migrated)
+by bootstrap, which is called when the first session is created (or explicitly, see scripts/migrate.py).
+engine is kept for code that used the module level engine of donight.events, and bootstraps on its first use.
+"""
+from logging import getLogger
+from threading import Lock
+
+from sqlalchemy import create_engine, event, exc, select
+from sqlalchemy.engine.url import make_url
+from sqlalchemy.orm import sessionmaker, scoped_session
+
+from donight.config.consts import (DB_CONNECTION_STRING, DB_READ_CONNECTION_STRING, DB_POOL_SIZE, DB_POOL_MAX_OVERFLOW,
+                                   DB_POOL_TIMEOUT, DB_POOL_RECYCLE, MIGRATE_DB_ON_BOOTSTRAP)
+
+# Dialects whose connections aren't pooled by sqlalchemy (so the pool can't be sized).
+UNPOOLED_DIALECTS = ['sqlite']
+
+logger = getLogger(__name__)
+
+_bootstrap_lock = Lock()
+# The engines of the db and of the read replica, created by bootstrap.
+_engines = {}
+
+
+class BootstrappingSessionMaker(sessionmaker):
+    """
+    A session maker that bootstraps the db (see bootstrap) before creating its first session.
+    """
+    def __call__(self, **kwargs):
+        bootstrap()
+        return super(BootstrappingSessionMaker, self).__call__(**kwargs)
+
+
+Session = BootstrappingSessionMaker()
+ReadSession = scoped_session(BootstrappingSessionMaker())
+
+
+def bootstrap(migrate_schema=MIGRATE_DB_ON_BOOTSTRAP):
+    """
+    Creates the engines of the db and binds the sessions to them, once per process (later calls do nothing).
+    :param migrate_schema: Whether to also create the db schema, or upgrade it to the latest version
+        (see donight.migrations.migrate).
+    :type migrate_schema: bool
+    """
+    with _bootstrap_lock:
+        if _engines:
+            return
+
+        engine = create_db_engine(DB_CONNECTION_STRING)
+        read_engine = create_db_engine(DB_READ_CONNECTION_STRING) \
+            if DB_READ_CONNECTION_STRING != DB_CONNECTION_STRING else engine
+
+        if migrate_schema:
+            # The models import the sessions from here, so they are only imported once they are needed.
+            from donight.events import Base
+            from donight.migrations import migrate
+            migrate(engine, Base.metadata)
+
+        Session.configure(bind=engine)
+        ReadSession.configure(bind=read_engine)
+        _engines.update(engine=engine, read_engine=read_engine)
+        logger.debug("Bootstrapped the db %r", engine.url)
+
+
+def get_engine():
+    """
+    :return: The engine of the db (bootstrapping it if it wasn't yet).
+    :rtype: sqlalchemy.engine.Engine
+    """
+    bootstrap()
+    return _engines['engine']
+
+
+def get_read_engine():
+    """
+    :return: The engine of the read replica, or of the db itself if there is no replica (see get_engine).
+    :rtype: sqlalchemy.engine.Engine
+    """
+    bootstrap()
+    return _engines['read_engine']
+
+
+class LazyEngine(object):
+    """
+    Stands for an engine that is only created when it is first used,
+    by passing every attribute access to the engine returned by the given function.
+    """
+    def __init__(self, get_engine_function):
+        """
+        :param get_engine_function: A function (receiving no arguments) returning the engine.
+        :type get_engine_function: function
+        """
+        self.__get_engine = get_engine_function
+
+    def __getattr__(self, name):
+        return getattr(self.__get_engine(), name)
+
+    def __repr__(self):
+        return '{}({!r})'.format(type(self).__name__, self.__get_engine)
+
+
+engine = LazyEngine(get_engine)
+
+
+def create_db_engine(connection_string):
+    """
+    Creates an engine with a pool of connections sized by the configuration (see DB_POOL_SIZE),
+    whose connections are replaced once in a while, and are checked before they are used (see ping_connection).
+    :param connection_string: The url of the db.
+    :type connection_string: str
+    :rtype: sqlalchemy.engine.Engine
+    """
+    pool_arguments = {'pool_recycle': DB_POOL_RECYCLE}
+    if make_url(connection_string).get_backend_name() not in UNPOOLED_DIALECTS:
+        pool_arguments.update(pool_size=DB_POOL_SIZE, max_overflow=DB_POOL_MAX_OVERFLOW, pool_timeout=DB_POOL_TIMEOUT)
+
+    engine = create_engine(connection_string, **pool_arguments)
+    event.listen(engine, 'engine_connect', ping_connection)
+    return engine
+
+
+def ping_connection(connection, branch):
+    """
+    Checks a connection when it is taken from the pool, so connections the db dropped
+    (for example when it restarted, or a proxy timed out) are replaced before they are used, instead of failing a query.
+    Follows sqlalchemy's "pessimistic disconnect handling" recipe.
+    """
+    if branch:
+        # A branch of a connection that was already checked.
+        return
+
+    # The ping shouldn't close the connection, even if it was created to close after its result.
+    should_close_with_result = connection.should_close_with_result
+    connection.should_close_with_result = False
+
+    try:
+        connection.scalar(select([1]))
+    except exc.DBAPIError as e:
+        # A disconnect invalidates the whole pool, so the ping is retried with a new connection.
+        if e.connection_invalidated:
+            connection.scalar(select([1]))
+        else:
+            raise
+    finally:
+        connection.should_close_with_result = should_close_with_result
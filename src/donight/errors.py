@@ -1,2 +1,29 @@
 class EventScrapingError(Exception):
     pass
+
+
+class ScrapingTimeoutError(EventScrapingError):
+    pass
+
+
+class SourceNotModified(Exception):
+    """
+    Raised by a scraper when its source didn't change since it was last scraped,
+    so there is no need to parse or upload its events again.
+    """
+    pass
+
+
+class UnknownSourceError(Exception):
+    """
+    Raised when scraping a source that isn't registered (see donight.event_finder.scrapers.registry).
+    """
+    pass
+
+
+class NoSourcesError(Exception):
+    """
+    Raised when scraping sources, but no source is registered at all,
+    usually because donight's entry points weren't installed (see donight.event_finder.scrapers.registry).
+    """
+    pass
@@ -1,13 +1,25 @@
+import datetime
+import sys
 import time
+from collections import OrderedDict, defaultdict, namedtuple
 from itertools import chain, imap
 from logging import getLogger
+from multiprocessing.pool import ThreadPool
+from threading import Thread
 
-from sqlalchemy import func
+from donight.config.consts import (TIME_BETWEEN_INDEXES, SCRAPING_WORKERS, SCRAPER_TIMEOUT, SCRAPING_TASK_WORKERS,
+                                   BULK_UPSERT, BULK_UPSERT_BATCH_SIZE, EVENTS_SNAPSHOT_PATH, SCRAPED_SOURCES)
+from donight.errors import ScrapingTimeoutError, SourceNotModified
+from donight.event_finder.scrapers import Scraper, ConcurrentScraper, get_all_scrapers
+from donight.event_finder.similar_events import SimilarEventsIndex
+from donight.event_finder.upsert import Upsert
+from donight.events import Session, Event, Venue
+from donight.search import update_search_index
+from donight.snapshot import publish_events_snapshot
+from donight.utils import iterate_chunks
 
-from donight.config.consts import TIME_BETWEEN_INDEXES
-from donight.event_finder.scrapers import Scraper, get_all_scrapers
-from donight.events import Session, Event
-from donight.utils import get_model_fields
+# The amount of events that were created, changed and left unchanged by uploading events to the db.
+UploadSummary = namedtuple('UploadSummary', ['created', 'changed', 'unchanged'])
 
 
 class EventFinder(object):
@@ -17,18 +29,47 @@ class EventFinder(object):
     """
     # TODO: Add tests !.
     # TODO: Add tests for the scrapers (against the real internet) !.
-    def __init__(self, scrapers=None, session=None, logger=None):
+    def __init__(self, scrapers=None, session=None, logger=None,
+                 scraping_workers=SCRAPING_WORKERS, scraper_timeout=SCRAPER_TIMEOUT,
+                 scraping_task_workers=SCRAPING_TASK_WORKERS, bulk_upsert=BULK_UPSERT,
+                 snapshot_path=EVENTS_SNAPSHOT_PATH, sources_names=SCRAPED_SOURCES):
         """
         :param scrapers: A list of scrapers, from which to scrape events and upload to the DB.
+            Defaults to the scrapers of the given sources.
         :type scrapers: list(Scraper)
         :param session: A sessions to the DB.
         :type session: Session
         :param logger: Defaults to the logger with the module name.
         :type logger: logging.Logger
+        :param scraping_workers: The amount of scrapers to run at the same time (1 scrapes one after another).
+        :type scraping_workers: int
+        :param scraper_timeout: The time (in seconds) to wait for a single scraper before giving up on its events.
+            None means waiting for the scraper forever.
+        :type scraper_timeout: int|None
+        :param scraping_task_workers: The amount of scraping tasks (see ConcurrentScraper) to run at the same time,
+            across all the scrapers (1 runs every scraper's tasks one after another).
+        :type scraping_task_workers: int
+        :param bulk_upsert: Whether to upload events using native bulk upserts (see bulk_upload_to_db).
+        :type bulk_upsert: bool
+        :param snapshot_path: Where to publish a snapshot of the upcoming events after every index
+            (see donight.snapshot), None (or empty) to not publish one.
+        :type snapshot_path: str|None
+        :param sources_names: The names of the sources to scrape if no scrapers are given
+            (see donight.event_finder.scrapers.registry), None for all the sources.
+        :type sources_names: list(str)|None
         """
-        self.scrapers = scrapers or get_all_scrapers()
+        self.scrapers = scrapers or get_all_scrapers(sources_names)
         self.session = session or Session()
         self.logger = logger or getLogger(__name__)
+        self.scraping_workers = scraping_workers
+        self.scraper_timeout = scraper_timeout
+        self.scraping_task_workers = scraping_task_workers
+        # The pool running the scraping tasks of concurrent scrapers, exists only while scraping.
+        self.tasks_pool = None
+        # The scrapers that failed (or timed out) in the last scraping, whose fetched responses aren't stored.
+        self.failed_scrapers = set()
+        self.bulk_upsert = bulk_upsert
+        self.snapshot_path = snapshot_path
 
     def index_forever(self, seconds_between_indexes=TIME_BETWEEN_INDEXES):
         """
@@ -52,87 +93,461 @@ class EventFinder(object):
         Indexes events from all the scrapers.
         Uses each scraper to scrape events, then uploads everything to the db
         (updating existing events or creating new ones)
+        The session is closed at the end, so no connection (or transaction) is held until the next index.
         """
+        try:
+            self.__index_events()
+        finally:
+            self.session.close()
+
+    def __index_events(self):
         all_scraper_names = ', '.join([scraper.get_scraping_source() for scraper in self.scrapers])
         self.logger.info("Indexing events from: %s", all_scraper_names)
 
-        all_events = list(chain.from_iterable(imap(self.safely_scrape, self.scrapers)))
+        all_events = self.scrape_all()
+        self.log_http_stats()
 
         events_amount = len(all_events)
-        self.logger.info("Uploading to the db %d events from: %s", events_amount, all_scraper_names)
+        try:
+            self.locate_events(all_events)
+            self.logger.info("Uploading to the db %d events from: %s", events_amount, all_scraper_names)
+
+            if self.bulk_upsert:
+                summary = self.bulk_upload_to_db(all_events)
+            else:
+                summary = self.upload_to_db(all_events)
+        except Exception:
+            self.store_fetched_responses(uploaded=False)
+            raise
+        self.store_fetched_responses(uploaded=True)
+
+        self.logger.info("Finished uploading to the db %d events (%d created, %d changed, %d unchanged) from: %s",
+                         events_amount, summary.created, summary.changed, summary.unchanged, all_scraper_names)
+
+        if self.snapshot_path:
+            try:
+                publish_events_snapshot(self.session, self.snapshot_path)
+            except Exception:
+                self.logger.exception("Failed publishing the events snapshot, the web server will query the db:")
+
+    def locate_events(self, events, chunk_size=500):
+        """
+        Completes the coordinates of the events using the venues in the db (see Venue):
+        events without coordinates get the coordinates of the venue of their location,
+        and the locations of events with coordinates that aren't venues yet are added as venues
+        (with the coordinates of the first of their events).
+        The added venues are committed with the uploaded events.
+        :param events: The events to locate.
+        :type events: list(Event)
+        :param chunk_size: The amount of venues queried at once.
+        :type chunk_size: int
+        """
+        events = [event for event in events if event is not None and event.location]
+        venues = {}
+        for locations in iterate_chunks(set(event.location for event in events), chunk_size):
+            venues.update((venue.name, venue) for venue in self.session.query(Venue).filter(Venue.name.in_(locations)))
 
-        updated = self.upload_to_db(all_events)
+        for event in events:
+            venue = venues.get(event.location)
 
-        self.logger.info("Finished uploading to the db %d events (%d created, %d updated) from: %s",
-                         events_amount, events_amount - updated, updated, all_scraper_names)
+            if event.latitude is None or event.longitude is None:
+                if venue is not None:
+                    event.latitude, event.longitude = venue.latitude, venue.longitude
+            elif venue is None:
+                venues[event.location] = Venue(name=event.location, latitude=event.latitude, longitude=event.longitude)
+                self.session.add(venues[event.location])
+
+    def store_fetched_responses(self, uploaded):
+        """
+        Stores the http responses the scrapers fetched in the cache (see Scraper.commit_fetched),
+        only for the scrapers whose events were uploaded, and drops the rest (see Scraper.discard_fetched),
+        so the sources that failed aren't skipped as unchanged by the next index.
+        :param uploaded: Whether the scraped events were uploaded to the db.
+        :type uploaded: bool
+        """
+        for scraper in self.scrapers:
+            if uploaded and scraper not in self.failed_scrapers:
+                scraper.commit_fetched()
+            else:
+                scraper.discard_fetched()
+
+    def log_http_stats(self):
+        """
+        Logs the amount of http requests the scrapers sent, and bytes they received, per host, since the last log.
+        """
+        for host, host_stats in sorted(Scraper.get_http_session().pop_stats().iteritems()):
+            self.logger.info('Sent %d http requests to %s, received %d bytes',
+                             host_stats['requests'], host, host_stats['bytes'])
+
+    def scrape_all(self):
+        """
+        Scrapes events from all the scrapers.
+        When more than one worker is configured the scrapers run concurrently,
+        except for scrapers sharing a resource (see Scraper.get_shared_resource), which run one after another.
+        The tasks of concurrent scrapers (see ConcurrentScraper) run concurrently in a pool shared by all scrapers.
+        :return: A list of all the events scraped.
+        :rtype: list(Event)
+        """
+        self.failed_scrapers = set()
+        if not self.scrapers:
+            # For example the facebook source, when no pages are configured.
+            self.logger.warning('There are no scrapers to scrape events from.')
+            return []
+
+        if self.scraping_task_workers > 1:
+            self.tasks_pool = ThreadPool(self.scraping_task_workers)
+
+        try:
+            if self.scraping_workers <= 1:
+                return list(chain.from_iterable(imap(self.safely_scrape, self.scrapers)))
+
+            scraper_groups = self.group_by_shared_resource(self.scrapers)
+            pool = ThreadPool(min(self.scraping_workers, len(scraper_groups)))
+            try:
+                return list(chain.from_iterable(pool.imap(self.safely_scrape_serially, scraper_groups)))
+            finally:
+                pool.close()
+                pool.join()
+
+        finally:
+            if self.tasks_pool is not None:
+                # Tasks of timed out scrapers might still be running, so we don't wait for them.
+                self.tasks_pool.close()
+                self.tasks_pool = None
+
+    @staticmethod
+    def group_by_shared_resource(scrapers):
+        """
+        Splits the scrapers into groups that can run concurrently with each other.
+        Scrapers sharing a resource are in the same group, every other scraper is in a group of its own.
+        Scrapers sharing a resource with a size (see Scraper.get_shared_resource) are split between that many groups,
+        so no more of them run at once than the resource allows (and they don't hold workers waiting for it).
+        :param scrapers: The scrapers to group.
+        :type scrapers: list(Scraper)
+        :return: A list of groups of scrapers.
+        :rtype: list(list(Scraper))
+        """
+        groups = OrderedDict()
+        resources_scrapers_counts = defaultdict(int)
+        for index, scraper in enumerate(scrapers):
+            shared_resource = scraper.get_shared_resource()
+            if shared_resource is None:
+                group_key = ('scraper', index)
+            else:
+                resource_size = getattr(shared_resource, 'size', 1)
+                group_key = ('resource', id(shared_resource),
+                             resources_scrapers_counts[id(shared_resource)] % resource_size)
+                resources_scrapers_counts[id(shared_resource)] += 1
+            groups.setdefault(group_key, []).append(scraper)
+        return groups.values()
+
+    def safely_scrape_serially(self, scrapers):
+        """
+        Safely scrapes events from the scrapers, one after another.
+        If a scraper times out it might still be using the shared resource,
+        so the rest of the scrapers are skipped.
+        :param scrapers: Scrapers that should not run concurrently.
+        :type scrapers: list(Scraper)
+        :return: A list of the events scraped from all the scrapers.
+        :rtype: list(Event)
+        """
+        events = []
+
+        for index, scraper in enumerate(scrapers):
+            scraper_events, timed_out = self._safely_scrape(scraper)
+            events.extend(scraper_events)
+
+            if timed_out and scrapers[index + 1:]:
+                self.logger.error("Skipping %s, since %s timed out and might still be using their shared resource.",
+                                  ', '.join([skipped.get_scraping_source() for skipped in scrapers[index + 1:]]),
+                                  scraper.get_scraping_source())
+                break
+
+        return events
 
     def safely_scrape(self, scraper):
         """
-        Used to scrape events from a scraper, but not fail everything if the scraper fails.
+        Used to scrape events from a scraper, but not fail everything if the scraper fails (or takes too long).
         :param scraper: A scraper to scrape events from.
         :type scraper: Scraper
         :return: A list of events scraped from the scraper.
         :rtype: list(Event)
         """
+        events, _ = self._safely_scrape(scraper)
+        return events
+
+    def _safely_scrape(self, scraper):
+        """
+        Safely scrapes events from the scraper (see safely_scrape).
+        :return: The events scraped, and whether the scraper timed out.
+        :rtype: (list(Event), bool)
+        """
         self.logger.info('Scraping events from %s', scraper.get_scraping_source())
         events = []
+        timed_out = False
+        start_time = time.time()
 
         try:
-            events.extend([event for event in scraper.scrape() if event and event.title != ''])
+            events.extend([event for event in self.scrape_with_timeout(scraper) if event and event.title != ''])
+        except SourceNotModified:
+            self.logger.info("%s did not change since it was last scraped, its events are already in the db.",
+                             scraper.get_scraping_source())
+        except ScrapingTimeoutError:
+            timed_out = True
+            self.failed_scrapers.add(scraper)
+            self.logger.error("Timed out scraping events from %s after %d seconds. Still scraping from other sources.",
+                              scraper.get_scraping_source(), self.scraper_timeout)
         except Exception:
+            self.failed_scrapers.add(scraper)
             self.logger.exception("Failed scraping events from %s. Still scraping from other sources. Exception:",
                                   scraper.get_scraping_source())
         finally:
-            self.logger.info('Scraped %d events from %s', len(events), scraper.get_scraping_source())
+            self.logger.info('Scraped %d events from %s in %.2f seconds',
+                             len(events), scraper.get_scraping_source(), time.time() - start_time)
 
-        return events
+        return events, timed_out
+
+    def scrape_with_timeout(self, scraper):
+        """
+        Scrapes all the events of the scraper, in a separate thread so we can stop waiting for it after a timeout.
+        (The thread itself can't be stopped, so a timed out scraper keeps running in the background).
+        :param scraper: A scraper to scrape events from.
+        :type scraper: Scraper
+        :return: A list of events scraped from the scraper.
+        :rtype: list(Event)
+        :raises ScrapingTimeoutError: If the scraper didn't finish in time.
+        """
+        if self.scraper_timeout is None:
+            return self.run_scraper(scraper)
+
+        result = {}
+
+        def scrape():
+            try:
+                result['events'] = self.run_scraper(scraper)
+            except Exception:
+                result['error'] = sys.exc_info()
+
+        scraping_thread = Thread(target=scrape, name='Scraping ' + scraper.get_scraping_source())
+        scraping_thread.daemon = True
+        scraping_thread.start()
+        scraping_thread.join(self.scraper_timeout)
+
+        if scraping_thread.is_alive():
+            raise ScrapingTimeoutError('Scraping {} took more than {} seconds.'.format(
+                scraper.get_scraping_source(), self.scraper_timeout))
+
+        if 'error' in result:
+            exc_type, exc_value, exc_traceback = result['error']
+            raise exc_type, exc_value, exc_traceback
+
+        return result['events']
+
+    def run_scraper(self, scraper):
+        """
+        Scrapes all the events of the scraper.
+        Concurrent scrapers run their tasks in the shared tasks pool (if it exists).
+        :param scraper: A scraper to scrape events from.
+        :type scraper: Scraper
+        :return: A list of events scraped from the scraper.
+        :rtype: list(Event)
+        """
+        if isinstance(scraper, ConcurrentScraper):
+            return list(scraper.scrape(self.tasks_pool))
+
+        return list(scraper.scrape())
 
     def upload_to_db(self, events):
         """
         Uploads all the given events to the db.
         Uploading an event doesn't necessarily mean adding it to the db.
-        If the event exists in the db, we only update its information,
+        If the event exists in the db, we only update its information (if it changed),
         If it doesn't exist yet we update it.
-        We return the amount of events updated (and not added).
+        Similar events are found using an index of the db events loaded at once (see get_similar_events_index),
+        events uploaded earlier in the same call are indexed too, so duplicates in the given events are merged.
+        The created and changed events are also written to the search index (see donight.search).
         :param events: The events to upload to the db.
         :type events: list(Event)
-        :return: The amount of updated events.
-        :rtype: int
+        :return: The amount of events created, changed and unchanged.
+        :rtype: UploadSummary
         """
-        updated = 0
+        events = filter(None, events)
+        similar_events_index = self.get_similar_events_index(events)
+        written_events = OrderedDict()  # Used as an ordered set, since an event might be changed a few times.
+        created = changed = 0
 
-        for event in filter(None, events):
-            existing_similar_event = self.get_similar_event(event)
+        for event in events:
+            existing_similar_event = similar_events_index.find(event)
 
             if existing_similar_event is not None:
-                self.update_in_db(existing_similar_event, event)
-                updated += 1
+                if self.update_in_db(existing_similar_event, event):
+                    written_events[existing_similar_event] = None
+                    changed += 1
             else:
                 self.add_to_db(event)
+                similar_events_index.add(event)
+                written_events[event] = None
+                created += 1
 
+        # Flushing assigns ids to the created events.
+        self.session.flush()
+        update_search_index(self.session.connection(), written_events)
         self.session.commit()
-        return updated
+        return UploadSummary(created, changed, len(events) - created - changed)
+
+    def bulk_upload_to_db(self, events, batch_size=BULK_UPSERT_BATCH_SIZE):
+        """
+        Uploads all the given events to the db, like upload_to_db,
+        but using batches of native upserts (INSERT ... ON CONFLICT DO UPDATE) instead of the ORM,
+        which is much faster when uploading many events.
+        Here events are similar only if they have the same natural key (see Event.NATURAL_KEY),
+        events missing a part of their natural key can't conflict, so they are uploaded using upload_to_db.
+        Only events that are new or changed (by their content hash) are written (and written to the search index).
+        Only supported by the dialects in upsert.SUPPORTED_DIALECTS.
+        :param events: The events to upload to the db.
+        :type events: list(Event)
+        :param batch_size: The amount of events to upsert in each statement.
+        :type batch_size: int
+        :return: The amount of events created, changed and unchanged.
+        :rtype: UploadSummary
+        """
+        events_by_key = OrderedDict()
+        partially_keyed_events = []
+        changed = unchanged = 0
+
+        for event in filter(None, events):
+            event.content_hash = event.compute_content_hash()
+            natural_key = event.get_natural_key()
+
+            if None in natural_key:
+                partially_keyed_events.append(event)
+            elif natural_key in events_by_key:
+                # Like in upload_to_db, the later duplicate updates the earlier one.
+                if events_by_key[natural_key].content_hash == event.content_hash:
+                    unchanged += 1
+                else:
+                    changed += 1
+                events_by_key[natural_key] = event
+            else:
+                events_by_key[natural_key] = event
+
+        keyed_events = events_by_key.values()
+        created = 0
+        field_names = [column.name for column in Event.__table__.columns if not column.primary_key]
+        upsert = Upsert(Event.__table__, Event.NATURAL_KEY, changed_column='content_hash')
+
+        for batch_start in xrange(0, len(keyed_events), batch_size):
+            batch = keyed_events[batch_start:batch_start + batch_size]
+            existing_content_hashes = self.get_existing_content_hashes(batch)
+            written_events = []
+
+            for event in batch:
+                natural_key = event.get_natural_key()
+
+                if natural_key not in existing_content_hashes:
+                    created += 1
+                elif existing_content_hashes[natural_key] != event.content_hash:
+                    changed += 1
+                else:
+                    unchanged += 1
+                    continue
+
+                written_events.append(event)
+
+            if written_events:
+                self.session.execute(upsert, [{field_name: getattr(event, field_name) for field_name in field_names}
+                                              for event in written_events])
+                # The upsert doesn't return the ids of the events, which the search index needs.
+                written_events_ids = self.get_existing_field_values(written_events, Event.id)
+                for event in written_events:
+                    event.id = written_events_ids[event.get_natural_key()]
+                update_search_index(self.session.connection(), written_events)
+
+        # upload_to_db also commits the upserted events.
+        partially_keyed_summary = self.upload_to_db(partially_keyed_events)
+        return UploadSummary(created + partially_keyed_summary.created,
+                             changed + partially_keyed_summary.changed,
+                             unchanged + partially_keyed_summary.unchanged)
+
+    def get_existing_content_hashes(self, events):
+        """
+        Finds which of the natural keys of the given events already exist in the db (using a single query),
+        and the content hashes of the existing events.
+        :param events: Events with full natural keys.
+        :type events: list(Event)
+        :return: A dict from the natural keys of the given events that exist in the db, to their content hash.
+        :rtype: dict(tuple, str)
+        """
+        return self.get_existing_field_values(events, Event.content_hash)
+
+    def get_existing_field_values(self, events, column):
+        """
+        Finds which of the natural keys of the given events exist in the db (using a single query),
+        and the value of a column of the existing events.
+        :param events: Events with full natural keys.
+        :type events: list(Event)
+        :param column: The column of the events to query.
+        :type column: sqlalchemy.orm.attributes.InstrumentedAttribute
+        :return: A dict from the natural keys of the given events that exist in the db, to their column value.
+        :rtype: dict(tuple, object)
+        """
+        if not events:
+            return {}
+
+        natural_keys = set(event.get_natural_key() for event in events)
+        start_dates = [event.start_date for event in events]
+        natural_key_columns = [getattr(Event, field_name) for field_name in Event.NATURAL_KEY]
+        existing_events = self.session.query(column, *natural_key_columns) \
+            .filter(Event.start_date >= min(start_dates),
+                    Event.start_date <= max(start_dates),
+                    Event.title.in_(set(event.title for event in events)))
+
+        existing_values = {}
+        for existing_event in existing_events:
+            natural_key = tuple(existing_event[1:])
+            if natural_key in natural_keys:
+                existing_values[natural_key] = existing_event[0]
+
+        return existing_values
+
+    def get_similar_events_index(self, events):
+        """
+        Loads from the db (using a single query) all the events that might be similar to the given events,
+        meaning all the events in the days range of the given events.
+        :param events: The events that will be looked up in the index.
+        :type events: list(Event)
+        :return: An index of the db events that might be similar to the given events.
+        :rtype: SimilarEventsIndex
+        """
+        start_dates = [event.start_time.date() for event in events if event.start_time is not None]
+        if not start_dates:
+            return SimilarEventsIndex()
+
+        range_start = datetime.datetime.combine(min(start_dates), datetime.time.min)
+        range_end = datetime.datetime.combine(max(start_dates) + datetime.timedelta(days=1), datetime.time.min)
+
+        return SimilarEventsIndex(self.session.query(Event).filter(
+            Event.start_time >= range_start,
+            Event.start_time < range_end))
 
     def get_similar_event(self, event):
         """
         Given an event, this function finds an event that is similar to it
         (meaning it is actually the same event, with small variances in information).
+        See SimilarEventsIndex for the exact meaning of similar events.
         :param event: An event to find a similar event to.
         :type event: Event
         :return: An event that is similar to the given event, or None if no such event exists.
         :rtype: Event or None
         """
-        # TODO: change string equals to Levenshtein distance.
-        return self.session.query(Event).filter(
-            Event.title == event.title,
-            Event.location == event.location,
-            func.date(Event.start_time) == event.start_time.date()).first()
+        return self.get_similar_events_index([event]).find(event)
 
     def add_to_db(self, event):
         """
         Adds the event to the db.
         :param event: The event to upload to the db.
         """
+        event.content_hash = event.compute_content_hash()
         self.session.add(event)
 
     def update_in_db(self, existing_event, event):
@@ -140,12 +555,21 @@ class EventFinder(object):
         Gets two events, one that already exists,
         and one that holds new information we want to insert into the existing event.
         Updates the existing event to hold the information from the given event.
+        If the information didn't change (by the content hash), the existing event isn't written at all.
         :param existing_event: An event that already exists in the db, to update with new information.
         :type existing_event: Event
         :param event: An event to get the new information from.
         :type event: Event
+        :return: Whether the existing event changed.
+        :rtype: bool
         """
-        for field_name in get_model_fields(Event, ['id']):
+        content_hash = event.compute_content_hash()
+        if existing_event.content_hash == content_hash:
+            return False
+
+        for field_name in Event.get_scraped_fields():
             new_field_value = getattr(event, field_name)
             setattr(existing_event, field_name, new_field_value)
+        existing_event.content_hash = content_hash
 
+        return True
@@ -1,5 +1,12 @@
 from abc import ABCMeta, abstractmethod
 from logging import getLogger
+from threading import Lock
+
+from donight.config.consts import (HTTP_CACHE_DIR, HTTP_CACHE_TTL, HTTP_CACHE_MAX_SIZE, HTTP_POOL_SIZE,
+                                   HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT, HTTP_MAX_RETRIES, HTTP_BACKOFF_FACTOR)
+from donight.errors import SourceNotModified
+from donight.utils.http_cache import HttpCache
+from donight.utils.http_session import HttpSession
 
 
 class Scraper(object):
@@ -11,6 +18,10 @@ class Scraper(object):
     """
     __metaclass__ = ABCMeta
 
+    __http_session = None
+    __http_cache = None
+    __http_lock = Lock()
+
     def __init__(self, logger=None):
         """
         A scraper defaultly has a logger,
@@ -38,6 +49,85 @@ class Scraper(object):
         """
         pass
 
+    @classmethod
+    def get_http_session(cls):
+        """
+        Scrapers should send their http requests using this session (and not using requests directly),
+        so connections are reused, and requests have timeouts and retries.
+        :return: The http session shared by all the scrapers (created on first use).
+        :rtype: HttpSession
+        """
+        with Scraper.__http_lock:
+            if Scraper.__http_session is None:
+                Scraper.__http_session = HttpSession(HTTP_POOL_SIZE, HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT,
+                                                     HTTP_MAX_RETRIES, HTTP_BACKOFF_FACTOR)
+
+        return Scraper.__http_session
+
+    @classmethod
+    def get_http_cache(cls):
+        """
+        :return: The http responses cache shared by all the scrapers (created on first use).
+        :rtype: HttpCache
+        """
+        http_session = cls.get_http_session()
+
+        with Scraper.__http_lock:
+            if Scraper.__http_cache is None:
+                Scraper.__http_cache = HttpCache(HTTP_CACHE_DIR, HTTP_CACHE_TTL, HTTP_CACHE_MAX_SIZE, http_session)
+
+        return Scraper.__http_cache
+
+    def fetch(self, method, url, **kwargs):
+        """
+        Sends an http request through the shared http responses cache,
+        so the scraper can know whether the response changed since it was last scraped (see HttpCache.fetch).
+        The response is only stored in the cache after the source's events are uploaded (see commit_fetched).
+        :param method: The http method of the request.
+        :type method: str
+        :param url: The url of the request.
+        :type url: str
+        :rtype: donight.utils.http_cache.CachedResponse
+        """
+        return self.get_http_cache().fetch(method, url, stage=self.get_scraping_source(), **kwargs)
+
+    def commit_fetched(self):
+        """
+        Stores the responses the scraper fetched in the http responses cache,
+        once the events scraped from them are uploaded, so the next runs compare their responses to them.
+        """
+        if Scraper.__http_cache is not None:
+            Scraper.__http_cache.commit(self.get_scraping_source())
+
+    def discard_fetched(self):
+        """
+        Drops the responses the scraper fetched, when the events scraped from them weren't uploaded,
+        so the next runs don't skip the source as unchanged.
+        """
+        if Scraper.__http_cache is not None:
+            Scraper.__http_cache.discard(self.get_scraping_source())
+
+    def raise_if_not_modified(self, *responses):
+        """
+        Stops the scraping if none of the given responses changed since the source was last scraped,
+        so the source's events aren't parsed and uploaded again.
+        :param responses: All the responses the source's events are scraped from.
+        :type responses: list(donight.utils.http_cache.CachedResponse)
+        :raises SourceNotModified: If none of the responses changed.
+        """
+        if not any(response.is_modified for response in responses):
+            raise SourceNotModified('{} did not change since it was last scraped.'.format(self.get_scraping_source()))
+
+    def get_shared_resource(self):
+        """
+        Returns a resource this scraper shares with other scrapers, and can't be used by two scrapers at once
+        (for example a web driver).
+        Scrapers that return the same resource are never run concurrently,
+        unless the resource has a size (for example a pool of web drivers), which is how many of them can run at once.
+        :return: The shared resource, or None if the scraper can run concurrently with any other scraper.
+        """
+        return None
+
     @classmethod
     def get_scraping_source(cls):
         """
@@ -47,3 +137,49 @@ class Scraper(object):
         :rtype: str
         """
         return cls.__name__.replace('Scraper', '').replace('Events', '').replace('Event', '')
+
+
+class ConcurrentScraper(Scraper):
+    """
+    An interface for scrapers whose scraping is split into independent tasks (usually http requests),
+    so the tasks can run concurrently, with each other and with other scrapers' tasks.
+    Instead of scrape, get_scraping_tasks and combine_results should be implemented:
+    scrape runs all the tasks, and combines their results into the scraped events.
+    """
+    __metaclass__ = ABCMeta
+
+    @abstractmethod
+    def get_scraping_tasks(self):
+        """
+        :return: A list of functions (receiving no arguments) that together scrape the source.
+        :rtype: list(function)
+        """
+        pass
+
+    @abstractmethod
+    def combine_results(self, results):
+        """
+        Combines the results of the scraping tasks into the scraped events.
+        :param results: The results of the scraping tasks, in the order of the tasks.
+        :type results: list
+        :return: A list of events from the scraped source.
+        :rtype: list(Event)
+        """
+        pass
+
+    def scrape(self, tasks_pool=None):
+        """
+        Runs all the scraping tasks, and combines their results into the scraped events.
+        :param tasks_pool: A pool to run the tasks in (usually shared by a few scrapers, to bound the concurrency).
+            If not given, the tasks run one after another.
+        :type tasks_pool: multiprocessing.pool.ThreadPool|None
+        :return: A list of events from the scraped source.
+        :rtype: list(Event)
+        """
+        tasks = self.get_scraping_tasks()
+        results = tasks_pool.map(_run_task, tasks) if tasks_pool is not None else map(_run_task, tasks)
+        return self.combine_results(results)
+
+
+def _run_task(task):
+    return task()
@@ -1,7 +1,11 @@
+import datetime as dt
 import json
 import logging
+import os
 import re
 import time
+from itertools import islice
+from threading import RLock
 
 import dateutil.parser
 import facebook
@@ -12,18 +16,35 @@ from selenium.webdriver import FirefoxProfile
 from selenium.webdriver.common import keys
 from selenium.webdriver.firefox.firefox_binary import FirefoxBinary
 
+from donight.config import facebook_scraping_config
+from donight.config.consts import (FACEBOOK_BATCH_SIZE, FACEBOOK_EVENTS_CACHE_PATH, FACEBOOK_EVENTS_CACHE_TTL,
+                                   FACEBOOK_ACCESS_TOKENS_PATH, FACEBOOK_ACCESS_TOKEN_LIFETIME,
+                                   FACEBOOK_ACCESS_TOKEN_REFRESH_MARGIN)
 from donight.errors import EventScrapingError
 from donight.event_finder.scrapers.base_scraper import Scraper
 from donight.events import Event
-from donight.utils import to_local_timezone
-from donight.utils.web_drivers import EnhancedWebDriver, By
+from donight.utils import to_local_timezone, to_timestamp, load_json_file, save_json_file
+from donight.utils.web_drivers import EnhancedWebDriver, By, WebDriverPool
 
 assert __name__ != "facebook", "conflict with the facebook-sdk package name"
 
+# Marks all the events anchors that weren't harvested yet as handled, and returns their urls.
+HARVEST_EVENTS_URLS_SCRIPT = """
+var anchors = document.querySelectorAll('a[href*="/events/"]:not([data-already-handled])');
+var urls = [];
+for (var i = 0; i < anchors.length; i++) {
+    anchors[i].setAttribute("data-already-handled", "true");
+    urls.push(anchors[i].href);
+}
+return urls;
+"""
+
 
 # TODO a more descriptive return value for self.get_scraping_source (including scraped page).
 class FacebookEventsScraper(Scraper):
-    __scraped_access_tokens = {}  # A dict mapping (email, password) to the lastly scraped access token
+    __access_tokens_store = None
+    __events_cache = None
+    __shared_stores_lock = RLock()
 
     def __init__(self, **kwargs):
         """
@@ -39,8 +60,16 @@ class FacebookEventsScraper(Scraper):
                                scraping.
         :type halt_condition: ScrapingHaltCondition
 
+        :param graph_edge: A graph api edge of the scraped events (for example "me/events" or "<page id>/events").
+                           If given, the events are discovered by paging through the edge instead of by browsing
+                           the page, which is only browsed if the graph api fails.
+        :type graph_edge: basestring|None
+
         :param driver: A selenium web driver to interact with facebook.
         :type driver: FacebookScrapingWebDriver
+        :param driver_pool: Instead of a driver, a pool to check out a web driver from for every scraping,
+                            so a few pages can be scraped at the same time (each with its own browser).
+        :type driver_pool: WebDriverPool
 
         :type logger: logging.Logger|None
         """
@@ -48,11 +77,13 @@ class FacebookEventsScraper(Scraper):
 
         self.__email = kwargs.pop('email')
         self.__password = kwargs.pop('password')
-        self.__access_token = None
 
         self.__page_url = kwargs.pop('page_url')
         self.__halt_condition = kwargs.pop('halt_condition')
+        self.__graph_edge = kwargs.pop('graph_edge', None)
         self.__driver = kwargs.pop('driver', None)
+        self.__driver_pool = kwargs.pop('driver_pool', None)
+        self.__checked_out_driver = None
 
         if kwargs:
             raise ValueError('Received some unexpected arguments: {}'.format(', '.join(kwargs.keys())))
@@ -62,46 +93,124 @@ class FacebookEventsScraper(Scraper):
         self.__is_already_refreshed = False
 
     def scrape(self):
-        event_scraper = FacebookEventScraper(self._access_token or self.__scrape_access_token(self.__driver))
-        self.__driver.get(self.__page_url)
+        try:
+            for event in self.__scrape():
+                yield event
+
+        finally:
+            if self.__checked_out_driver is not None:
+                self.__driver_pool.release(self.__checked_out_driver)
+                self.__checked_out_driver = None
+
+    def __scrape(self):
+        access_token = self._access_token or self.__scrape_access_token(self.__get_driver())
+        event_scraper = FacebookEventScraper(access_token, self.get_events_cache())
+
+        # The events are fetched in chunks, every chunk with a single request to the graph api.
+        for events_ids in self.__iterate_events_ids_chunks():
+            stored_access_token = self._access_token
+            if stored_access_token is None:
+                self.logger.info("The access token is about to expire. Scraping another access token.")
+                stored_access_token = self.__scrape_access_token(self.__get_driver())
+
+            # The access token might have been refreshed since (for example while paging through the graph api edge).
+            if stored_access_token != access_token:
+                access_token = stored_access_token
+                event_scraper = FacebookEventScraper(access_token, self.get_events_cache())
 
-        for event_id in self.__iterate_unique_events_ids(self.__driver):
             try:
-                event = event_scraper.scrape(event_id)
+                events = event_scraper.scrape_many(events_ids)
 
             except AuthError:
                 self.logger.warn("Encountered an authentication error. Access token might have expired. "
                                  "Scraping another access token and retrying.")
 
                 self._access_token = None
-                event_scraper = FacebookEventScraper(self.__scrape_access_token(self.__driver))
+                access_token = self.__scrape_access_token(self.__get_driver())
+                event_scraper = FacebookEventScraper(access_token, self.get_events_cache())
 
                 try:
-                    event = event_scraper.scrape(event_id)
+                    events = event_scraper.scrape_many(events_ids)
 
                 except EventScrapingError:
-                    self.logger.exception('Error scraping facebook event with id {}.'.format(event_id))
+                    self.logger.exception('Error scraping facebook events with ids {}.'.format(', '.join(events_ids)))
                     continue
 
             except EventScrapingError:
-                self.logger.exception('Error scraping facebook event with id {}.'.format(event_id))
+                self.logger.exception('Error scraping facebook events with ids {}.'.format(', '.join(events_ids)))
                 continue
 
-            yield event
+            for event_id, event in zip(events_ids, events):
+                if isinstance(event, CanceledEventError):
+                    self.logger.info('Skipping the canceled facebook event with id {}.'.format(event_id))
+                    continue
 
-            should_stop_scraping = self.__halt_condition.should_stop_scraping(event)
-            if should_stop_scraping:
-                self.logger.warn("Reached events threshold: " + should_stop_scraping.why)
-                break
+                if isinstance(event, EventScrapingError):
+                    self.logger.error('Error scraping facebook event with id {}: {}'.format(event_id, event))
+                    continue
 
-    def __iterate_unique_events_ids(self, driver):
-        scraped_events_ids = set()
+                yield event
+
+                should_stop_scraping = self.__halt_condition.should_stop_scraping(event)
+                if should_stop_scraping:
+                    self.logger.warn("Reached events threshold: " + should_stop_scraping.why)
+                    return
+
+    def __iterate_events_ids_chunks(self):
+        """
+        Splits the ids of the page's events into chunks, discovering the ids of every chunk only when it is needed.
+        A chunk isn't larger than the amount of events the halt condition still allows,
+        so no events are discovered (and fetched) past the event the scraping stops at.
+        :rtype: generator(list(str))
+        """
+        events_ids = self.__iterate_unique_events_ids()
+        while True:
+            max_events_left = self.__halt_condition.get_max_events_left()
+            chunk_size = min(FACEBOOK_BATCH_SIZE, max_events_left) if max_events_left is not None \
+                else FACEBOOK_BATCH_SIZE
+
+            chunk = list(islice(events_ids, chunk_size))
+            if not chunk:
+                return
+            yield chunk
+
+    @classmethod
+    def get_events_cache(cls):
+        """
+        :return: The cache of scraped events shared by all the facebook scrapers (created on first use).
+        :rtype: FacebookEventsCache
+        """
+        with FacebookEventsScraper.__shared_stores_lock:
+            if FacebookEventsScraper.__events_cache is None:
+                FacebookEventsScraper.__events_cache = FacebookEventsCache(FACEBOOK_EVENTS_CACHE_PATH,
+                                                                           FACEBOOK_EVENTS_CACHE_TTL)
+
+        return FacebookEventsScraper.__events_cache
 
-        for event_anchor in self.__iterate_events_anchors(driver):
-            event_url = event_anchor.get_attribute('href')
+    def get_shared_resource(self):
+        # Facebook scrapers using the same browser have to scrape one after another,
+        # and scrapers using the same driver pool can only scrape as many at a time as the pool has browsers.
+        return self.__driver if self.__driver is not None else self.__driver_pool
 
-            event_id = self.__parse_event_id(event_url)
+    def __get_driver(self):
+        """
+        A driver is only checked out of the driver pool once it is needed,
+        so scrapings that don't need a browser don't start one.
+        :return: The web driver of the scraping.
+        :rtype: EnhancedWebDriver
+        """
+        if self.__driver is not None:
+            return self.__driver
+
+        if self.__checked_out_driver is None:
+            self.__checked_out_driver = self.__driver_pool.acquire()
 
+        return self.__checked_out_driver
+
+    def __iterate_unique_events_ids(self):
+        scraped_events_ids = set()
+
+        for event_id in self.__iterate_events_ids():
             if event_id in scraped_events_ids:
                 continue
             else:
@@ -110,6 +219,48 @@ class FacebookEventsScraper(Scraper):
 
             yield event_id
 
+    def __iterate_events_ids(self):
+        if self.__graph_edge is not None:
+            try:
+                for event_id in self.__iterate_graph_edge_events_ids():
+                    yield event_id
+                return
+
+            except (AuthError, EventScrapingError):
+                self.logger.exception("Failed paging through the graph api edge {}. "
+                                      "Browsing the page {} instead.".format(self.__graph_edge, self.__page_url))
+
+        driver = self.__get_driver()
+        driver.get(self.__page_url)
+
+        for event_url in self.__iterate_events_urls(driver):
+            yield self.__parse_event_id(event_url)
+
+    def __iterate_graph_edge_events_ids(self):
+        try:
+            for event_id in self.__iterate_graph_edge_events_ids_once():
+                yield event_id
+
+        except AuthError:
+            self.logger.warn("Encountered an authentication error paging through the graph api edge {}. "
+                             "Access token might have expired. Scraping another access token and retrying."
+                             .format(self.__graph_edge))
+
+            self._access_token = None
+            # The edge is paged again from its start, the ids that were already yielded are skipped by the caller.
+            for event_id in self.__iterate_graph_edge_events_ids_once():
+                yield event_id
+
+    def __iterate_graph_edge_events_ids_once(self):
+        # Only upcoming events are scraped (like in the browsed pages),
+        # and events starting after the halt condition's maximal start time aren't even requested.
+        since = to_timestamp(dt.datetime.combine(dt.date.today(), dt.time.min))
+        max_start_time = self.__halt_condition.get_max_start_time()
+        until = to_timestamp(max_start_time) if max_start_time is not None else None
+
+        graph_scraper = FacebookEventScraper(self._access_token or self.__scrape_access_token(self.__get_driver()))
+        return graph_scraper.iterate_edge_events_ids(self.__graph_edge, since, until)
+
     def __parse_event_id(self, event_url):
         match = self.__event_id_regex_in_url.search(event_url)
         if match is not None:
@@ -117,25 +268,18 @@ class FacebookEventsScraper(Scraper):
 
         raise EventScrapingError("Unable to parse facebook event id from url: {}".format(event_url))
 
-    def __iterate_events_anchors(self, driver):
+    def __iterate_events_urls(self, driver):
         while True:
-            try:
-                event_anchor = driver.find_element_by_css_selector('a[href*="/events/"]:not([data-already-handled])')
-
-            except NoSuchElementException:
-                if self.__load_more_posts(driver):
+            # All the anchors loaded since the last harvest are found and marked in a single call to the browser.
+            for event_url in driver.execute_script(HARVEST_EVENTS_URLS_SCRIPT):
+                if self.__event_id_regex_in_url.search(event_url) is None:
+                    # That's not really an event anchor
                     continue
-                else:
-                    break
 
-            driver.execute_script('arguments[0].setAttribute("data-already-handled", "true");',
-                                  event_anchor)
-
-            if self.__event_id_regex_in_url.search(event_anchor.get_attribute('href')) is None:
-                # That's not really an event anchor
-                continue
+                yield event_url
 
-            yield event_anchor
+            if not self.__load_more_posts(driver):
+                break
 
     def __load_more_posts(self, driver):
         """
@@ -172,20 +316,34 @@ class FacebookEventsScraper(Scraper):
         self.logger.info("It seems no there are no more events to scrape from the page {}".format(self.__page_url))
         return False
 
+    @classmethod
+    def get_access_tokens_store(cls):
+        """
+        :return: The store of access tokens shared by all the facebook scrapers (created on first use).
+        :rtype: AccessTokensStore
+        """
+        with FacebookEventsScraper.__shared_stores_lock:
+            if FacebookEventsScraper.__access_tokens_store is None:
+                FacebookEventsScraper.__access_tokens_store = AccessTokensStore(FACEBOOK_ACCESS_TOKENS_PATH,
+                                                                                FACEBOOK_ACCESS_TOKEN_REFRESH_MARGIN)
+
+        return FacebookEventsScraper.__access_tokens_store
+
     @property
     def _access_token(self):
-        if self.__access_token is not None:
-            return self.__access_token
-
-        scraped_access_token = self.__scraped_access_tokens.get((self.__email, self.__password), None)
-        return scraped_access_token
+        """
+        The lastly scraped access token of the scraped user, None if there is none or it is about to expire.
+        """
+        return self.get_access_tokens_store().get(self.__email or '')
 
     @_access_token.setter
     def _access_token(self, value):
-        if self.__email:
-            self.__scraped_access_tokens[(self.__email, self.__password)] = value
+        if value is None:
+            self.get_access_tokens_store().remove(self.__email or '')
+            return
 
-        self.__access_token = value
+        expires_at = FacebookEventScraper(value).get_access_token_expiry(FACEBOOK_ACCESS_TOKEN_LIFETIME)
+        self.get_access_tokens_store().set(self.__email or '', value, expires_at)
 
     def __scrape_access_token(self, driver):
         with driver.new_tab(self.__graph_api_explorer_url):
@@ -240,23 +398,195 @@ class FacebookEventsScraper(Scraper):
 class FacebookEventScraper(object):
     """docs at https://developers.facebook.com/docs/graph-api/reference/v2.5/event"""
 
-    def __init__(self, access_token):
+    EVENT_FIELDS = "place,name,description,start_time,end_time,ticket_uri,cover,owner,is_canceled,updated_time"
+    # Requested for cached events, to check whether they were updated since they were cached.
+    FRESHNESS_FIELDS = "updated_time"
+    # The amount of events requested in every page of an edge.
+    EDGE_PAGE_SIZE = 100
+
+    def __init__(self, access_token, events_cache=None):
+        """
+        :param access_token: A graph api access token, that has access to the scraped events.
+        :type access_token: str
+        :param events_cache: If given, events that weren't updated since they were cached aren't fully fetched again.
+        :type events_cache: FacebookEventsCache|None
+        """
         requests.packages.urllib3.disable_warnings()
         self.__graph = facebook.GraphAPI(access_token, version='2.5')
+        self.__events_cache = events_cache
 
     def scrape(self, event_id):
         try:
-            event_dict = self.__graph.get_object(
-                event_id,
-                fields="place,name,description,start_time,end_time,ticket_uri,cover,owner,is_canceled")
+            event_dict = self.__graph.get_object(event_id, fields=self.EVENT_FIELDS)
+        except facebook.GraphAPIError as e:
+            raise self.__get_graph_error(e, 'event with id {}'.format(event_id))
+
+        return self.__create_event(event_id, event_dict)
+
+    def scrape_many(self, events_ids):
+        """
+        Scrapes a few events with a single batch request to the graph api, instead of a request for every event.
+        docs at https://developers.facebook.com/docs/graph-api/making-multiple-requests
+        If there is an events cache, the cached events are only probed for the time they were last updated,
+        and are fully fetched (in another batch request) only if they were updated since they were cached.
+        :param events_ids: The ids of the events to scrape (at most 50).
+        :type events_ids: list(str)
+        :return: A list with the result of every event id, in the order of the ids:
+            the scraped event, or the EventScrapingError it could not be scraped because of
+            (a CanceledEventError if the event has been canceled).
+        :rtype: list(Event|EventScrapingError)
+        :raises AuthError: If the access token was rejected (usually because it expired).
+        """
+        cached_events_dicts = {}
+        if self.__events_cache is not None:
+            for event_id in events_ids:
+                cached_event_dict = self.__events_cache.get(event_id)
+                if cached_event_dict is not None:
+                    cached_events_dicts[event_id] = cached_event_dict
+
+        events_dicts = self.__request_events_dicts(
+            events_ids, lambda event_id: self.FRESHNESS_FIELDS if event_id in cached_events_dicts else self.EVENT_FIELDS)
+
+        updated_events_ids = []
+        for event_id, cached_event_dict in cached_events_dicts.iteritems():
+            freshness_dict = events_dicts[event_id]
+            if isinstance(freshness_dict, EventScrapingError):
+                continue
+
+            if freshness_dict.get('updated_time') == cached_event_dict.get('updated_time'):
+                events_dicts[event_id] = cached_event_dict
+            else:
+                updated_events_ids.append(event_id)
+
+        if updated_events_ids:
+            events_dicts.update(self.__request_events_dicts(updated_events_ids, lambda event_id: self.EVENT_FIELDS))
+
+        if self.__events_cache is not None:
+            self.__events_cache.update({event_id: event_dict for event_id, event_dict in events_dicts.iteritems()
+                                        if not isinstance(event_dict, EventScrapingError) and
+                                        (event_id not in cached_events_dicts or event_id in updated_events_ids)})
+
+        results = []
+        for event_id in events_ids:
+            event_dict = events_dicts[event_id]
+            if isinstance(event_dict, EventScrapingError):
+                results.append(event_dict)
+                continue
+
+            try:
+                results.append(self.__create_event(event_id, event_dict))
+            except EventScrapingError as e:
+                results.append(e)
+
+        return results
+
+    def iterate_edge_events_ids(self, edge, since=None, until=None):
+        """
+        Pages through a graph api edge of events, using its cursors.
+        docs at https://developers.facebook.com/docs/graph-api/using-graph-api#paging
+        :param edge: The edge of the events (for example "me/events" or "<page id>/events").
+        :type edge: str
+        :param since: If given, only events that start after this time (a unix timestamp) are returned.
+        :type since: float|None
+        :param until: If given, only events that start before this time (a unix timestamp) are returned.
+        :type until: float|None
+        :return: A generator of the ids of the edge's events (every page of the edge is requested when needed).
+        :rtype: generator(str)
+        :raises AuthError: If the access token was rejected (usually because it expired).
+        """
+        args = {'fields': 'id', 'limit': self.EDGE_PAGE_SIZE}
+        if since is not None:
+            args['since'] = int(since)
+        if until is not None:
+            args['until'] = int(until)
+
+        while True:
+            try:
+                page = self.__graph.request('{}/{}'.format(self.__graph.version, edge), dict(args))
+            except facebook.GraphAPIError as e:
+                raise self.__get_graph_error(e, 'edge {}'.format(edge))
+
+            for event_dict in page.get('data', []):
+                yield event_dict['id']
+
+            paging = page.get('paging', {})
+            if 'next' not in paging or 'after' not in paging.get('cursors', {}):
+                return
+
+            args['after'] = paging['cursors']['after']
+
+    def get_access_token_expiry(self, default_lifetime):
+        """
+        Asks facebook when the access token expires.
+        docs at https://developers.facebook.com/docs/graph-api/reference/v2.5/debug_token
+        :param default_lifetime: The lifetime (in seconds) to assume if facebook doesn't tell when the token expires.
+        :type default_lifetime: int
+        :return: The time (a unix timestamp) in which the access token expires, None if it never expires.
+        :rtype: float|None
+        """
+        try:
+            token_info = self.__graph.request(self.__graph.version + '/debug_token',
+                                              {'input_token': self.__graph.access_token})['data']
+        except (facebook.GraphAPIError, KeyError):
+            return time.time() + default_lifetime
+
+        if not token_info.get('is_valid', True):
+            return time.time()
+
+        # facebook uses 0 for tokens that never expire.
+        return token_info.get('expires_at') or None
+
+    def __request_events_dicts(self, events_ids, get_fields):
+        """
+        Requests the given fields of the events, in a single batch request.
+        :param events_ids: The ids of the events to request.
+        :type events_ids: list(str)
+        :param get_fields: A function returning the fields to request for an event id.
+        :type get_fields: function
+        :return: A dict from every event id to the graph api's dict of the event,
+            or to the EventScrapingError it could not be requested because of.
+        :rtype: dict(str, dict|EventScrapingError)
+        :raises AuthError: If the access token was rejected.
+        """
+        batch = [{'method': 'GET', 'relative_url': '{}?fields={}'.format(event_id, get_fields(event_id))}
+                 for event_id in events_ids]
+
+        try:
+            responses = self.__graph.request(self.__graph.version,
+                                             post_args={'batch': json.dumps(batch), 'include_headers': 'false'})
         except facebook.GraphAPIError as e:
-            if e.type == 'OAuthException':
-                raise AuthError(e)
+            raise self.__get_graph_error(e, 'events with ids {}'.format(', '.join(events_ids)))
+
+        events_dicts = {}
+        for event_id, response in zip(events_ids, responses):
+            try:
+                events_dicts[event_id] = self.__parse_batch_response(event_id, response)
+            except EventScrapingError as e:
+                events_dicts[event_id] = e
+
+        return events_dicts
 
-            raise EventScrapingError("Could not access facebook event with id {}.".format(event_id), e)
+    def __parse_batch_response(self, event_id, response):
+        if response is None:
+            # The graph api doesn't answer the requests of a batch that didn't complete in time.
+            raise EventScrapingError("Facebook did not answer the request for the event with id {}.".format(event_id))
+
+        event_dict = json.loads(response['body'])
+        if 'error' in event_dict:
+            raise self.__get_graph_error(facebook.GraphAPIError(event_dict), 'event with id {}'.format(event_id))
+
+        return event_dict
+
+    # noinspection PyMethodMayBeStatic
+    def __get_graph_error(self, graph_error, accessed_object):
+        if graph_error.type == 'OAuthException':
+            return AuthError(graph_error)
 
+        return EventScrapingError("Could not access facebook {}.".format(accessed_object), graph_error)
+
+    def __create_event(self, event_id, event_dict):
         if event_dict.get('is_canceled', False):
-            raise EventScrapingError("Event has been canceled.")
+            raise CanceledEventError("Event has been canceled.")
 
         # if not event_dict.get("can_guests_invite"):
         #     raise EventScrapingError("Event does not allow inviting guests")
@@ -272,12 +602,16 @@ class FacebookEventScraper(object):
         else:
             owner_url = None
 
+        place_location = event_dict.get("place", {}).get("location", {})
+
         start_time = event_dict.get("start_time")
         end_time = event_dict.get("end_time")
         event = Event(title=event_dict.get("name"),
                       start_time=self.__parse_datetime(start_time),
                       end_time=self.__parse_datetime(end_time),
-                      location=event_dict.get("place", {}).get("name"),  # coordinates and id also available
+                      location=event_dict.get("place", {}).get("name"),  # id also available
+                      latitude=place_location.get("latitude"),
+                      longitude=place_location.get("longitude"),
                       price=None,  # TODO parse
                       url="https://www.facebook.com/events/" + event_dict.get("id", event_id),
                       description=description,
@@ -298,6 +632,125 @@ class AuthError(Exception):
     pass
 
 
+class CanceledEventError(EventScrapingError):
+    pass
+
+
+class AccessTokensStore(object):
+    """
+    An on-disk store of the lastly scraped access token of every facebook account,
+    so access tokens are reused until they are about to expire, instead of scraped in every run.
+    The access tokens are secrets, so the file (and a directory created for it) is only accessible by its owner.
+    """
+    FILE_MODE = 0600
+    DIR_MODE = 0700
+
+    def __init__(self, path, refresh_margin):
+        """
+        :param path: The path of the json file in which the access tokens are stored.
+        :type path: str
+        :param refresh_margin: The time (in seconds) before its expiry in which an access token is no longer used.
+        :type refresh_margin: int
+        """
+        self.__path = path
+        self.__refresh_margin = refresh_margin
+        self.__lock = RLock()
+
+        tokens_dir = os.path.dirname(os.path.abspath(self.__path))
+        if not os.path.isdir(tokens_dir):
+            os.makedirs(tokens_dir, self.DIR_MODE)
+
+        # A dict from an account to its access token, and the time in which it expires (None if it never expires).
+        self.__access_tokens = load_json_file(self.__path, {})
+
+    def get(self, account):
+        """
+        :return: The access token of the account, None if there is none or it is about to expire.
+        :rtype: str|None
+        """
+        with self.__lock:
+            entry = self.__access_tokens.get(account)
+
+        if entry is None:
+            return None
+
+        if entry['expires_at'] is not None and entry['expires_at'] - self.__refresh_margin < time.time():
+            return None
+
+        return entry['access_token']
+
+    def set(self, account, access_token, expires_at):
+        """
+        :param account: The account the access token belongs to.
+        :type account: str
+        :param access_token: The access token.
+        :type access_token: str
+        :param expires_at: The time (a unix timestamp) in which the access token expires, None if it never expires.
+        :type expires_at: float|None
+        """
+        with self.__lock:
+            self.__access_tokens[account] = {'access_token': access_token, 'expires_at': expires_at}
+            save_json_file(self.__path, self.__access_tokens, self.FILE_MODE)
+
+    def remove(self, account):
+        with self.__lock:
+            if self.__access_tokens.pop(account, None) is not None:
+                save_json_file(self.__path, self.__access_tokens, self.FILE_MODE)
+
+
+class FacebookEventsCache(object):
+    """
+    An on-disk cache of the graph api's dicts of scraped events (by their ids),
+    used to know whether an event changed since it was last scraped (by its updated_time),
+    so unchanged events aren't fully fetched again.
+    Every cached event expires after a while, so even unchanged events are fully fetched once in a while.
+    """
+    def __init__(self, path, ttl):
+        """
+        :param path: The path of the json file in which the cache is stored.
+        :type path: str
+        :param ttl: The time (in seconds) after which a cached event expires.
+        :type ttl: int
+        """
+        self.__path = path
+        self.__ttl = ttl
+        self.__lock = RLock()
+
+        # A dict from an event id to its cache entry.
+        self.__entries = load_json_file(self.__path, {})
+
+    def get(self, event_id):
+        """
+        :return: The cached dict of the event, None if it isn't cached or expired.
+        :rtype: dict|None
+        """
+        with self.__lock:
+            entry = self.__entries.get(event_id)
+            if entry is None or self.__is_expired(entry):
+                return None
+
+            return entry['event']
+
+    def update(self, events_dicts):
+        """
+        Caches the given events (instead of their previously cached dicts), and removes the expired events.
+        :param events_dicts: A dict from an event id to the graph api's dict of the event.
+        :type events_dicts: dict(str, dict)
+        """
+        with self.__lock:
+            for event_id, event_dict in events_dicts.iteritems():
+                self.__entries[event_id] = {'event': event_dict, 'stored_at': time.time()}
+
+            for event_id, entry in self.__entries.items():
+                if self.__is_expired(entry):
+                    del self.__entries[event_id]
+
+            save_json_file(self.__path, self.__entries)
+
+    def __is_expired(self, entry):
+        return time.time() - entry['stored_at'] > self.__ttl
+
+
 class FacebookScrapingWebDriver(EnhancedWebDriver):
     def __init__(self, should_hide_window, installation_path):
         # ASSUMPTION: installation_path refers to a valid firefox executable.
@@ -315,3 +768,23 @@ class FacebookScrapingWebDriver(EnhancedWebDriver):
 
         super(FacebookScrapingWebDriver, self).__init__(web_driver, should_hide_window)
         self.implicitly_wait(5)
+
+
+def get_facebook_scrapers():
+    """
+    Creates the scrapers of the facebook pages in the facebook scraping config (registered as the facebook source).
+    The scrapers share a pool of browsers, which are only started when a scraper needs one.
+    :rtype: list(FacebookEventsScraper)
+    """
+    driver_pool = WebDriverPool(create_facebook_driver, facebook_scraping_config.browsers_pool_size,
+                                facebook_scraping_config.browser_max_uses)
+
+    return [FacebookEventsScraper(driver_pool=driver_pool, **kwargs)
+            for kwargs in facebook_scraping_config.facebook_scraped_pages]
+
+
+def create_facebook_driver():
+    driver = FacebookScrapingWebDriver(facebook_scraping_config.should_hide_browser_window,
+                                       facebook_scraping_config.browser_installation_path)
+    driver.maximize_window()
+    return driver
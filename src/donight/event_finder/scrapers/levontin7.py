@@ -2,8 +2,6 @@ import datetime as dt
 import json
 import time
 
-import requests
-
 from donight.event_finder.scrapers.base_scraper import Scraper
 from donight.events import Event
 from donight.utils import SECONDS_IN_MONTH, SECONDS_IN_YEAR, find, to_local_timezone
@@ -19,6 +17,8 @@ class Levontin7Scraper(Scraper):
                      'post_type': 'events'}
 
     LEVONTIN_LOCATION = u'\u05dc\u05d1\u05d5\u05e0\u05d8\u05d9\u05df 7'
+    # The latitude and longitude of 7 Levontin street, Tel Aviv.
+    LEVONTIN_COORDINATES = (32.0626, 34.7740)
 
     TIME_FORMAT = '%Y-%m-%d %H:%M:%S'
     SHEKEL_CHAR = u'\u20aa'
@@ -29,11 +29,14 @@ class Levontin7Scraper(Scraper):
         This method scrapes events (music shows) from the Levontin 7 website.
         Levontin's website exposes a restful json api for its clients,
         so we use that api and just parse the json for the events.
+        If the events didn't change since they were last scraped, SourceNotModified is raised.
         :return: A list of all the events in Levontin 7.
         :rtype: list(Event)
         """
         event_range = {'start': time.time() - 3 * SECONDS_IN_MONTH, 'end': time.time() + SECONDS_IN_YEAR}
-        response = requests.post(self.URL, params=self.EVENTS_PARAMS, data=event_range)
+        # The range changes all the time, but the responses are still comparable.
+        response = self.fetch('POST', self.URL, cache_key='levontin7-events', params=self.EVENTS_PARAMS, data=event_range)
+        self.raise_if_not_modified(response)
 
         events_list = json.loads(response.content)['EVENTS']
         return map(self.levontin_json_to_event, events_list)
@@ -57,6 +60,8 @@ class Levontin7Scraper(Scraper):
                          start_time=start_time,
                          end_time=end_time,
                          location=self.LEVONTIN_LOCATION,
+                         latitude=self.LEVONTIN_COORDINATES[0],
+                         longitude=self.LEVONTIN_COORDINATES[1],
                          price=price,
                          url=levontin_event['url'],
                          description=description,
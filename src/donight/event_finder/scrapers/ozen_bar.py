@@ -1,38 +1,57 @@
 import datetime as dt
 import re
+from functools import partial
 from itertools import chain
 
-import requests
-from bs4 import BeautifulSoup
+import lxml.html
 from dateutil.relativedelta import relativedelta
+from lxml import etree
 
-from donight.event_finder.scrapers.base_scraper import Scraper
+from donight.event_finder.scrapers.base_scraper import ConcurrentScraper
 from donight.events import Event
 from donight.utils import to_local_timezone
 
 TIME_SEPERATOR = ':'
 
-NUMBER_REGEX = '.*?([0-9]+).*?'
-HOUR_REGEX = '.*?([0-9]+:[0-9]+).*?'
+NUMBER_REGEX = re.compile('[0-9]+')
+HOUR_REGEX = re.compile('[0-9]+:[0-9]+')
 
+HTML_PARSER = lxml.html.HTMLParser(encoding='utf8')
 
-class OzenBarScraper(Scraper):
+
+def _class_xpath(tag, class_name):
+    return './/{0}[contains(concat(" ", normalize-space(@class), " "), " {1} ")]'.format(tag, class_name)
+
+
+EVENT_ELEMENTS_XPATH = etree.XPath('//li')
+TITLE_XPATH = etree.XPath('(.//h2)[1]')
+PRICE_XPATH = etree.XPath('(.//b)[1]')
+URL_XPATH = etree.XPath('(.//a)[1]/@href')
+DESCRIPTION_XPATH = etree.XPath('(.//p)[1]')
+IMAGE_XPATH = etree.XPath('(.//img)[1]/@src')
+DATE_XPATH = etree.XPath('({0})[1]'.format(_class_xpath('div', 'date')))
+TIMES_XPATH = etree.XPath('({0})[1]'.format(_class_xpath('div', 'times')))
+
+
+class OzenBarScraper(ConcurrentScraper):
     """
     This scraper is used to scrape music shows from the OzenBar website.
     """
     EVENTS_URL = 'http://www.ozenbar.com/wp-admin/admin-ajax.php'
 
     OZEN_BAR_LOCATION = u'\u05d0\u05d5\u05d6\u05df\u05d1\u05e8'
+    # The latitude and longitude of 48 King George street, Tel Aviv.
+    OZEN_BAR_COORDINATES = (32.0738, 34.7757)
 
-    def scrape(self):
+    def get_scraping_tasks(self):
         """
         This method scrapes events (mostly music shows) from the OzenBar website.
         The OzenBar website exposes a php view, that receives a month and a year,
         and returns an html representation of a list of the events of that month.
-        We send requests for three months back, and a year forward,
-        parse the returned html, and scrape information on the events from that.
-        :return: A list of all the events in the OzenBar.
-        :rtype: list(Event)
+        We send requests for a month back, and four months forward (each request is a separate task),
+        then parse the returned html, and scrape information on the events from that (see combine_results).
+        :return: A task fetching every scraped month.
+        :rtype: list(function)
         """
         today = dt.date.today()
         # TODO: The OzenBar website has a bug, that doesn't account for the year in their calendar,
@@ -40,9 +59,23 @@ class OzenBarScraper(Scraper):
         dates_in_surrounding_months = [today + relativedelta(months=diff)
                                        for diff in xrange(-1, 5)]
 
-        return list(chain.from_iterable([self.get_events_for_month(date.year, date.month)
-                                         for date in dates_in_surrounding_months
-                                         if date.year == today.year]))
+        return [partial(self.fetch_month, date.year, date.month)
+                for date in dates_in_surrounding_months
+                if date.year == today.year]
+
+    def combine_results(self, results):
+        """
+        Parses the html of all the fetched months into the events of the OzenBar.
+        If none of the months changed since they were last scraped, SourceNotModified is raised.
+        :param results: The (year, month, response) of every fetched month.
+        :type results: list((int, int, donight.utils.http_cache.CachedResponse))
+        :return: A list of all the events in the OzenBar.
+        :rtype: list(Event)
+        """
+        self.raise_if_not_modified(*[response for _, _, response in results])
+
+        return list(chain.from_iterable([self.parse_events(response.content, year, month)
+                                         for year, month, response in results]))
 
     def get_events_for_month(self, year, month):
         """
@@ -57,23 +90,52 @@ class OzenBarScraper(Scraper):
         :return: A list of events of that month.
         :rtype: list(Event)
         """
+        _, _, response = self.fetch_month(year, month)
+        return self.parse_events(response.content, year, month)
+
+    def fetch_month(self, year, month):
+        """
+        Sends a request for the html representation of the events of the given month.
+        :param year: The year to get the events of.
+        :type year: int
+        :param month: The month to get the events of.
+        :type month: int
+        :return: The year, the month and the response.
+        :rtype: (int, int, donight.utils.http_cache.CachedResponse)
+        """
         # The month is 0-based, WTF ?
         request_data = {'action': 'get_event_showpage',
                         'year': year, 'month': month - 1}
-        response = requests.post(self.EVENTS_URL, data=request_data)
+        return year, month, self.fetch('POST', self.EVENTS_URL, data=request_data)
 
-        events_soup = BeautifulSoup(response.content, 'lxml', from_encoding='utf8')
+    def parse_events(self, html, year, month):
+        """
+        Parses the html representation of the events of a month into a list of events.
+        The html is parsed with lxml, and only the needed parts of it are extracted, using precompiled xpaths.
+        :param html: The html returned by the OzenBar website for the month (blank if the month has no events).
+        :type html: str
+        :param year: The year of the events.
+        :type year: int
+        :param month: The month of the events.
+        :type month: int
+        :return: A list of events of that month.
+        :rtype: list(Event)
+        """
+        # lxml fails parsing an empty document.
+        if not html.strip():
+            return []
+
+        events_tree = lxml.html.fromstring(html, parser=HTML_PARSER)
 
-        all_event_elements = events_soup.find_all('li')
         return [self.create_event_from_element(event_element, year, month)
-                for event_element in all_event_elements]
+                for event_element in EVENT_ELEMENTS_XPATH(events_tree)]
 
     def create_event_from_element(self, event_element, year, month):
         """
         Receives an event element, that should be displayed in the OzenBar website,
         scrapes out the important data from the html, and returns an Event object representing the event.
-        :param event_element: A beutifulsoup element representing an OzenBar event.
-        :type event_element: bs4.Tag
+        :param event_element: An lxml element representing an OzenBar event.
+        :type event_element: lxml.html.HtmlElement
         :param year: The year the event is held in.
         :type year: int
         :param month: The month the event is held in.
@@ -82,18 +144,20 @@ class OzenBarScraper(Scraper):
         :rtype: Event
         """
         try:
-            title = event_element.find('h2').text
+            title = _get_text(TITLE_XPATH, event_element)
             start_time = self.parse_time(event_element, year, month)
-            price = event_element.find('b').text
-            url = event_element.find('a')['href']
-            description = event_element.find('p').text
-            image = event_element.find('img')['src']
+            price = _get_text(PRICE_XPATH, event_element)
+            url = _get_first(URL_XPATH, event_element)
+            description = _get_text(DESCRIPTION_XPATH, event_element)
+            image = _get_first(IMAGE_XPATH, event_element)
         except Exception:
             self.logger.exception("Failed turning an OzenBar event of month (%s, %s) into an event, "
-                                  "the OzenBar event element is: \n%s\nException:", year, month, event_element.prettify())
+                                  "the OzenBar event element is: \n%s\nException:", year, month,
+                                  lxml.html.tostring(event_element, encoding=unicode, pretty_print=True))
             return None
 
         return Event(title=title, start_time=start_time, location=self.OZEN_BAR_LOCATION,
+                     latitude=self.OZEN_BAR_COORDINATES[0], longitude=self.OZEN_BAR_COORDINATES[1],
                      price=price, url=url, description=description, image=image, owner=None, owner_url=None)
 
     def parse_time(self, event_element, year, month):
@@ -103,8 +167,8 @@ class OzenBarScraper(Scraper):
         and the day and time are scattered across many sub-elements.
         This method parses the day and time, and receives the month and year,
         to create a full datetime object for the time of the event.
-        :param event_element: A beutifulsoup element representing an OzenBar event.
-        :type event_element: bs4.Tag
+        :param event_element: An lxml element representing an OzenBar event.
+        :type event_element: lxml.html.HtmlElement
         :param year: The year the event is held in.
         :type year: int
         :param month: The month the event is held in.
@@ -112,12 +176,32 @@ class OzenBarScraper(Scraper):
         :return:
         :rtype:
         """
-        date_element = event_element.find('div', {'class': 'date'})
-        day = int(re.findall(NUMBER_REGEX, date_element.text)[0])
+        day = int(NUMBER_REGEX.search(_get_text(DATE_XPATH, event_element)).group())
 
-        time_element = event_element.find('div', {'class': 'times'})
-        full_time = re.findall(HOUR_REGEX, time_element.text)[0]
+        full_time = HOUR_REGEX.search(_get_text(TIMES_XPATH, event_element)).group()
         hour, minute = map(int, full_time.split(TIME_SEPERATOR))
 
         return to_local_timezone(dt.datetime(year, month, day, hour, minute))
 
+
+def _get_first(xpath, element):
+    """
+    :return: The first result of the xpath on the element.
+    :raises ValueError: If the xpath has no results.
+    """
+    results = xpath(element)
+    if not results:
+        raise ValueError('The element has no {}'.format(xpath.path))
+    return unicode(results[0])
+
+
+def _get_text(xpath, element):
+    """
+    :return: The text of the first element the xpath finds in the element.
+    :raises ValueError: If the xpath finds no element.
+    :rtype: unicode
+    """
+    results = xpath(element)
+    if not results:
+        raise ValueError('The element has no {}'.format(xpath.path))
+    return unicode(results[0].text_content())
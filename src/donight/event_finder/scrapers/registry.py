@@ -0,0 +1,92 @@
+"""
+The registry of the scraped sources.
+Sources are discovered through the "donight.scrapers" setuptools entry points, so a source can be added
+(by donight or by any other installed package) without changing donight's code, for example in setup.py:
+
+    entry_points={'donight.scrapers': ['birthdays = birthdays.scraper:BirthDayScraper']}
+
+The name of the entry point is the name of the source, and it refers to a scraper class,
+or to any function that creates the source's scrapers (a scraper or a list of scrapers).
+The entry points are only loaded (importing their modules) when their sources are selected,
+so a run scraping only some of the sources doesn't import (or start) what the other sources need.
+
+The entry points are only registered by installing donight (python setup.py develop, in the src directory),
+which should be done again when sources are added, so running from a checkout that wasn't installed raises
+NoSourcesError instead of silently scraping nothing.
+"""
+from logging import getLogger
+
+from donight.errors import UnknownSourceError, NoSourcesError
+from donight.event_finder.scrapers.base_scraper import Scraper
+
+SCRAPERS_ENTRY_POINTS_GROUP = 'donight.scrapers'
+
+
+class ScrapersRegistry(object):
+    def __init__(self, entry_points_group=SCRAPERS_ENTRY_POINTS_GROUP, logger=None):
+        """
+        :param entry_points_group: The group of the entry points of the sources.
+        :type entry_points_group: str
+        :param logger: Defaults to the logger with the module name.
+        :type logger: logging.Logger
+        """
+        # Importing pkg_resources scans all the installed packages, so it is only imported when sources are needed.
+        import pkg_resources
+
+        self.logger = logger or getLogger(__name__)
+        self.__entry_points_group = entry_points_group
+        self.__entry_points = {}
+
+        for entry_point in pkg_resources.iter_entry_points(entry_points_group):
+            if entry_point.name in self.__entry_points:
+                self.logger.warn("The source %s is registered more than once, using %s", entry_point.name,
+                                 self.__entry_points[entry_point.name])
+                continue
+            self.__entry_points[entry_point.name] = entry_point
+
+    def get_sources_names(self):
+        """
+        :return: The names of all the registered sources (without loading them).
+        :rtype: list(str)
+        """
+        return sorted(self.__entry_points)
+
+    def get_scrapers(self, sources_names=None):
+        """
+        Creates the scrapers of the given sources.
+        :param sources_names: The names of the sources to create scrapers for, None for all the sources.
+        :type sources_names: list(str)|None
+        :return: The scrapers of the sources.
+        :rtype: list(Scraper)
+        :raises UnknownSourceError: If one of the sources isn't registered.
+        :raises NoSourcesError: If no source is registered at all.
+        """
+        if not self.__entry_points:
+            raise NoSourcesError('No sources are registered in the "{}" entry points group. '
+                                 'Install donight (python setup.py develop, in the src directory) '
+                                 'to register its sources.'.format(self.__entry_points_group))
+
+        if sources_names is None:
+            sources_names = self.get_sources_names()
+
+        unknown_sources_names = [name for name in sources_names if name not in self.__entry_points]
+        if unknown_sources_names:
+            raise UnknownSourceError('Unknown sources: {} (the registered sources are: {})'.format(
+                ', '.join(unknown_sources_names), ', '.join(self.get_sources_names())))
+
+        scrapers = []
+        for source_name in sources_names:
+            scrapers += self.create_scrapers(source_name)
+        return scrapers
+
+    def create_scrapers(self, source_name):
+        """
+        Loads the entry point of a source, and creates its scrapers.
+        :type source_name: str
+        :rtype: list(Scraper)
+        """
+        # Resolving (and not loading) the entry point doesn't check the requirements of its package,
+        # which are checked by the installation anyway.
+        create_scrapers = self.__entry_points[source_name].resolve()
+        scrapers = create_scrapers()
+        return [scrapers] if isinstance(scrapers, Scraper) else list(scrapers)
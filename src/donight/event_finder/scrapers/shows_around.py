@@ -1,8 +1,6 @@
 import datetime as dt
 import json
 
-import requests
-
 from donight.event_finder.scrapers.base_scraper import Scraper
 from donight.events import Event
 from donight.utils import jsonp_loads
@@ -28,11 +26,16 @@ class ShowsAroundScraper(Scraper):
         This method scrapes events (music shows) from the ShowsAround app.
         ShowsAround is actually a website disguised as an app, so it's easier to scrape.
         We use their restful json api to scrape them.
+        If both json files didn't change since they were last scraped, SourceNotModified is raised.
         :return: A list of all the events in ShowsAround.
         :rtype: list(Event)
         """
-        shows = jsonp_loads(requests.get(self.HOST + self.SHOWS_URI).content)
-        artists = jsonp_loads(requests.get(self.HOST + self.ARTIST_URI).content)
+        shows_response = self.fetch('GET', self.HOST + self.SHOWS_URI)
+        artists_response = self.fetch('GET', self.HOST + self.ARTIST_URI)
+        self.raise_if_not_modified(shows_response, artists_response)
+
+        shows = jsonp_loads(shows_response.content)
+        artists = jsonp_loads(artists_response.content)
 
         return [self.show_json_to_event(show, artists) for show in shows]
 
@@ -16,6 +16,22 @@ class ScrapingHaltCondition(object):
         """
         raise NotImplementedError
 
+    def get_max_start_time(self):
+        """
+        The start time after which events aren't scraped, so scrapers can avoid fetching them in the first place.
+        :returns: The maximal start time, or None if the condition doesn't limit the start time.
+        :rtype: datetime.datetime|None
+        """
+        return None
+
+    def get_max_events_left(self):
+        """
+        The amount of events that can still be scraped, so scrapers fetching events in chunks don't fetch more.
+        :returns: The maximal amount of events left, or None if the condition doesn't limit the amount of events.
+        :rtype: int|None
+        """
+        return None
+
 
 class UnionHaltCondition(ScrapingHaltCondition):
     def __init__(self, *halt_conditions):
@@ -28,6 +44,16 @@ class UnionHaltCondition(ScrapingHaltCondition):
                 return should_stop_scraping
         return ScrapingShouldContinue()
 
+    def get_max_start_time(self):
+        max_start_times = [halt_condition.get_max_start_time() for halt_condition in self.__halt_conditions
+                           if halt_condition.get_max_start_time() is not None]
+        return min(max_start_times) if max_start_times else None
+
+    def get_max_events_left(self):
+        max_events_left = [halt_condition.get_max_events_left() for halt_condition in self.__halt_conditions
+                           if halt_condition.get_max_events_left() is not None]
+        return min(max_events_left) if max_events_left else None
+
 
 class MaxEventsHaltCondition(ScrapingHaltCondition):
     def __init__(self, max_events):
@@ -40,6 +66,9 @@ class MaxEventsHaltCondition(ScrapingHaltCondition):
             return ScrapingShouldStop("Scraped the maximal number of events ({}).".format(self.__max_events))
         return ScrapingShouldContinue()
 
+    def get_max_events_left(self):
+        return max(self.__max_events - self.__total_events, 0)
+
 
 class MaxEventStartTimeHaltCondition(ScrapingHaltCondition):
     def __init__(self, max_time):
@@ -51,6 +80,9 @@ class MaxEventStartTimeHaltCondition(ScrapingHaltCondition):
                                                                                                  self.__max_time))
         return ScrapingShouldContinue()
 
+    def get_max_start_time(self):
+        return self.__max_time
+
 
 class ScrapingShouldStop(object):
     def __init__(self, reason):
@@ -0,0 +1,150 @@
+from collections import defaultdict
+
+from donight.config.consts import MAX_SIMILAR_TITLE_DISTANCE_RATIO, MIN_SIMILAR_TITLE_NGRAMS_SIMILARITY
+from donight.utils.text import normalize_text, get_ngrams, bounded_edit_distance
+
+
+class SimilarEventsIndex(object):
+    """
+    An in-memory index of events, used to find an event that is similar to a given event
+    (meaning it is actually the same event, with small variances in information),
+    without querying the db for every event.
+
+    Two events are similar if they start on the same day, their normalized locations (see normalize_text) are equal
+    (or both have no location), and their titles are similar:
+    their normalized titles are within a small edit distance of each other.
+    Locations aren't matched by their words, since different venues in the same city share most of their words
+    (like "Ozen, Tel Aviv" and "Barby, Tel Aviv").
+    To avoid calculating the edit distance against every indexed event,
+    events are first blocked by day and venue,
+    then only titles that share enough character trigrams are compared.
+    """
+    def __init__(self, events=(), max_title_distance_ratio=MAX_SIMILAR_TITLE_DISTANCE_RATIO,
+                 min_title_ngrams_similarity=MIN_SIMILAR_TITLE_NGRAMS_SIMILARITY):
+        """
+        :param events: The events to index.
+        :type events: iterable(Event)
+        :param max_title_distance_ratio: The maximal edit distance between similar titles,
+            relative to the length of the longer title (0 means only equal normalized titles are similar).
+        :type max_title_distance_ratio: float
+        :param min_title_ngrams_similarity: The minimal Dice coefficient of the trigrams of two titles
+            for them to be compared at all.
+        :type min_title_ngrams_similarity: float
+        """
+        self.__max_title_distance_ratio = max_title_distance_ratio
+        self.__min_title_ngrams_similarity = min_title_ngrams_similarity
+
+        self.__exact_events = {}
+        self.__days = defaultdict(_DayIndex)
+
+        for event in events:
+            self.add(event)
+
+    def add(self, event):
+        """
+        Adds the event to the index, so similar events will be found from now on.
+        If an identical event (see get_key) is already indexed, it is kept.
+        :param event: The event to add to the index.
+        :type event: Event
+        """
+        key = self.get_key(event)
+        if key in self.__exact_events:
+            return
+
+        self.__exact_events[key] = event
+        self.__days[key[2]].add(_IndexedEvent(event))
+
+    def find(self, event):
+        """
+        Finds an indexed event that is similar to the given event.
+        If there are a few, the one with the most similar title is returned.
+        :param event: An event to find a similar event to.
+        :type event: Event
+        :return: An event that is similar to the given event, or None if no such event is indexed.
+        :rtype: Event or None
+        """
+        key = self.get_key(event)
+        exact_event = self.__exact_events.get(key)
+        if exact_event is not None:
+            return exact_event
+
+        day_index = self.__days.get(key[2])
+        if day_index is None:
+            return None
+
+        return day_index.find(_IndexedEvent(event), self.__max_title_distance_ratio,
+                              self.__min_title_ngrams_similarity)
+
+    def __len__(self):
+        return len(self.__exact_events)
+
+    @staticmethod
+    def get_key(event):
+        """
+        :return: The key by which identical events are found, events with the same key are always similar.
+        :rtype: tuple
+        """
+        start_date = event.start_time.date() if event.start_time is not None else None
+        return event.title, event.location, start_date
+
+
+class _IndexedEvent(object):
+    """
+    An event along with its normalized information used for finding similar events.
+    """
+    def __init__(self, event):
+        self.event = event
+        self.title = normalize_text(event.title)
+        self.title_ngrams = get_ngrams(self.title)
+        self.venue = normalize_text(event.location)
+
+
+class _DayIndex(object):
+    """
+    Indexes the events of a single day, by venue and title trigrams.
+    """
+    def __init__(self):
+        self.__events = []
+        self.__events_by_venue = defaultdict(set)
+        self.__events_by_ngram = defaultdict(list)
+
+    def add(self, indexed_event):
+        event_number = len(self.__events)
+        self.__events.append(indexed_event)
+
+        self.__events_by_venue[indexed_event.venue].add(event_number)
+        for ngram in indexed_event.title_ngrams:
+            self.__events_by_ngram[ngram].append(event_number)
+
+    def find(self, indexed_event, max_title_distance_ratio, min_title_ngrams_similarity):
+        same_venue_events = self.__events_by_venue.get(indexed_event.venue)
+        if not same_venue_events:
+            return None
+
+        shared_ngrams = defaultdict(int)
+        for ngram in indexed_event.title_ngrams:
+            for event_number in self.__events_by_ngram.get(ngram, ()):
+                if event_number in same_venue_events:
+                    shared_ngrams[event_number] += 1
+
+        candidates = []
+        for event_number, shared_ngrams_amount in shared_ngrams.iteritems():
+            candidate = self.__events[event_number]
+            ngrams_similarity = 2.0 * shared_ngrams_amount / (len(candidate.title_ngrams) +
+                                                              len(indexed_event.title_ngrams))
+            if ngrams_similarity >= min_title_ngrams_similarity:
+                candidates.append((ngrams_similarity, candidate))
+
+        best_event, best_distance = None, None
+        for _, candidate in sorted(candidates, key=lambda candidate: candidate[0], reverse=True):
+            max_distance = int(max_title_distance_ratio * max(len(candidate.title), len(indexed_event.title)))
+            if best_distance is not None:
+                max_distance = min(max_distance, best_distance - 1)
+
+            distance = bounded_edit_distance(candidate.title, indexed_event.title, max_distance)
+            if distance is not None:
+                best_event, best_distance = candidate.event, distance
+                if distance == 0:
+                    break
+
+        return best_event
@@ -0,0 +1,55 @@
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import Insert
+
+# Both dialects share the "INSERT ... ON CONFLICT (...) DO UPDATE SET ..." syntax.
+# (PostgreSQL since 9.5, SQLite since 3.24)
+SUPPORTED_DIALECTS = ['postgresql', 'sqlite']
+
+# The null-safe inequality operator of every dialect.
+DISTINCT_OPERATORS = {'postgresql': 'IS DISTINCT FROM', 'sqlite': 'IS NOT'}
+
+
+class Upsert(Insert):
+    """
+    An "INSERT ... ON CONFLICT (...) DO UPDATE" statement.
+    Rows that conflict with an existing row on the conflict columns (which must have a unique index)
+    update all the other columns of the existing row, instead of being inserted.
+    The primary key of existing rows is never updated.
+    """
+    def __init__(self, table, conflict_columns, changed_column=None, **kwargs):
+        """
+        :param table: The table to upsert rows into.
+        :type table: sqlalchemy.Table
+        :param conflict_columns: The names of the columns of the unique index on which rows conflict.
+        :type conflict_columns: list(str)
+        :param changed_column: If given, an existing row is only updated if the value of this column changed
+            (for example a hash of the row's content).
+        :type changed_column: str|None
+        """
+        super(Upsert, self).__init__(table, **kwargs)
+        self.conflict_columns = list(conflict_columns)
+        self.changed_column = changed_column
+
+
+@compiles(Upsert)
+def compile_upsert(upsert, compiler, **kwargs):
+    dialect_name = compiler.dialect.name
+    if dialect_name not in SUPPORTED_DIALECTS:
+        raise NotImplementedError('Upserts are not supported by the {} dialect.'.format(dialect_name))
+
+    quote = compiler.preparer.quote
+    updated_columns = [column.name for column in upsert.table.columns
+                       if not column.primary_key and column.name not in upsert.conflict_columns]
+
+    statement = '{insert} ON CONFLICT ({conflict_columns}) DO UPDATE SET {updates}'.format(
+        insert=compiler.visit_insert(upsert, **kwargs),
+        conflict_columns=', '.join(map(quote, upsert.conflict_columns)),
+        updates=', '.join('{0} = excluded.{0}'.format(quote(column)) for column in updated_columns))
+
+    if upsert.changed_column is not None:
+        statement += ' WHERE {table}.{column} {distinct} excluded.{column}'.format(
+            table=compiler.preparer.format_table(upsert.table),
+            column=quote(upsert.changed_column),
+            distinct=DISTINCT_OPERATORS[dialect_name])
+
+    return statement
@@ -1,12 +1,21 @@
 import datetime
+import hashlib
+import json
 
-from sqlalchemy import create_engine, Column, Integer, String, Text, Sequence, DateTime
+from sqlalchemy import Column, Integer, String, Text, Sequence, DateTime, Date, Float, Index
+from sqlalchemy.event import listen
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import validates
 
-from donight.config.consts import DB_CONNECTION_STRING
+# Session (and engine) are imported from here by most of the code, along with the models.
+from donight.db import Session, engine
+from donight.search import create_search_index
+from donight.utils import get_model_fields
+from donight.utils.geo import encode_geohash
 
 MEDIUM_STR_LEN = 1024
+# The length of the geohashes of the events (9 characters are cells of a few meters).
+GEOHASH_PRECISION = 9
 
 Base = declarative_base()
 
@@ -34,6 +43,68 @@ class Event(Base):
     owner = Column(String(MEDIUM_STR_LEN))
     owner_url = Column(String(MEDIUM_STR_LEN))
     ticket_url = Column(String(MEDIUM_STR_LEN))
+    # The day the event starts in, derived from start_time (and kept up to date by _set_start_date).
+    # Used to find events by day without applying functions on start_time, which prevent using its index.
+    start_date = Column(Date)
+    # A fingerprint of the scraped information of the event (see compute_content_hash).
+    content_hash = Column(String(40))
+    # The coordinates of the place of the event, in degrees.
+    latitude = Column(Float)
+    longitude = Column(Float)
+    # The geohash of the coordinates, derived from them (and kept up to date by _set_geohash).
+    # Used to find events by area using its index, see donight.utils.geo.get_geohash_ranges.
+    geohash = Column(String(GEOHASH_PRECISION))
+
+    # Events with the same natural key are the same event, there is at most one such event in the db.
+    NATURAL_KEY = ('title', 'location', 'start_date')
+    # Fields that are computed from the other fields of the event, and aren't scraped.
+    DERIVED_FIELDS = ['start_date', 'content_hash', 'geohash']
+
+    # Any change here should also be done in a migration (see donight.migrations).
+    __table_args__ = (Index('uq_events_natural_key', *NATURAL_KEY, unique=True),
+                      Index('ix_events_start_time', 'start_time'),
+                      Index('ix_events_geohash', 'geohash'))
+
+    @validates('start_time')
+    def _set_start_date(self, key, start_time):
+        self.start_date = start_time.date() if start_time is not None else None
+        return start_time
+
+    @validates('latitude', 'longitude')
+    def _set_geohash(self, key, value):
+        coordinates = {'latitude': self.latitude, 'longitude': self.longitude}
+        coordinates[key] = value
+
+        if None in coordinates.values():
+            self.geohash = None
+        else:
+            self.geohash = encode_geohash(coordinates['latitude'], coordinates['longitude'], GEOHASH_PRECISION)
+        return value
+
+    def get_natural_key(self):
+        """
+        :return: The values of the natural key fields of the event (see NATURAL_KEY).
+        :rtype: tuple
+        """
+        return tuple(getattr(self, field_name) for field_name in self.NATURAL_KEY)
+
+    @classmethod
+    def get_scraped_fields(cls):
+        """
+        :return: The names of the fields that hold scraped information (all the fields but the id and derived ones).
+        :rtype: list(str)
+        """
+        return get_model_fields(cls, ['id'] + cls.DERIVED_FIELDS)
+
+    def compute_content_hash(self):
+        """
+        Computes a stable fingerprint of the scraped information of the event,
+        so events holding the same information have the same hash.
+        :return: A hex sha1 digest of the scraped fields.
+        :rtype: str
+        """
+        content = [(field_name, _to_unicode(getattr(self, field_name))) for field_name in self.get_scraped_fields()]
+        return hashlib.sha1(json.dumps(content)).hexdigest()
 
     def __repr__(self):
         return u'{0} at {1} @ {2}'.format(self.title, self.location, self.start_time)
@@ -42,16 +113,53 @@ class Event(Base):
                                 'end_time': datetime.datetime.isoformat}
 
     def to_dict(self):
-        return {column.name: self.get_attr_to_dict(column.name)
-                for column in self.__table__.columns}
+        return {column_name: attr_serializer(getattr(self, column_name))
+                for column_name, attr_serializer in _COLUMNS_SERIALIZERS}
 
     def get_attr_to_dict(self, attr_name):
-        attr_serializer = self.__serialize_attr_to_dict.get(attr_name, unicode)
-        attr = getattr(self, attr_name)
-        return attr_serializer(attr) if attr is not None else ''
+        return self.get_attr_serializer(attr_name)(getattr(self, attr_name))
+
+    @classmethod
+    def get_attr_serializer(cls, attr_name):
+        """
+        Returns a function serializing a value of the attribute the way it is serialized by to_dict,
+        so queried columns can be serialized without loading whole events.
+        :param attr_name: The name of the attribute.
+        :type attr_name: str
+        :return: A function receiving a value of the attribute, and returning its serialized value.
+        :rtype: function
+        """
+        serialize = cls.__serialize_attr_to_dict.get(attr_name, unicode)
+        return lambda attr: serialize(attr) if attr is not None else ''
+
+
+class Venue(Base):
+    """
+    A place where events take place, identified by the location of its events.
+    Venues keep the coordinates of locations, for events whose source only gives the name of their location.
+    """
+    __tablename__ = 'venues'
+
+    id = Column(Integer, Sequence('venue_id_sequence'), primary_key=True)
+    name = Column(String(MEDIUM_STR_LEN), nullable=False, unique=True)
+    latitude = Column(Float, nullable=False)
+    longitude = Column(Float, nullable=False)
+
+    def __repr__(self):
+        return u'{0} ({1}, {2})'.format(self.name, self.latitude, self.longitude)
+
+
+# The search index isn't a model (see donight.search), so it is created along with the events table.
+listen(Event.__table__, 'after_create', lambda table, connection, **kwargs: create_search_index(connection))
+
+# The serializer of every column of an event, created once for all the calls to to_dict.
+_COLUMNS_SERIALIZERS = [(column.name, Event.get_attr_serializer(column.name)) for column in Event.__table__.columns]
 
 
-engine = create_engine(DB_CONNECTION_STRING)
-Base.metadata.create_all(engine)
+def _to_unicode(value):
+    if value is None or isinstance(value, unicode):
+        return value
+    if isinstance(value, str):
+        return value.decode('utf8')
+    return unicode(value)
 
-Session = sessionmaker(bind=engine)
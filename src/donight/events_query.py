@@ -0,0 +1,246 @@
+import base64
+import datetime
+import json
+import math
+
+import dateutil.parser
+from sqlalchemy import and_, or_
+
+from donight.events import Event, GEOHASH_PRECISION
+from donight.search import get_search_results
+from donight.utils import get_model_fields
+from donight.utils.geo import KM_PER_DEGREE, get_geohash_ranges, get_radius_bounding_box
+
+# The fields of an event that aren't returned by the api: the derived fields,
+# and the coordinates, which are only used to find events by area (see get_bounding_box_filter).
+INTERNAL_EVENT_FIELDS = Event.DERIVED_FIELDS + ['latitude', 'longitude']
+# The fields of an event that can be returned by the api.
+EVENT_FIELDS = get_model_fields(Event, INTERNAL_EVENT_FIELDS)
+# The amount of rows fetched from the db at once, while iterating queried events.
+QUERY_ROWS_CHUNK_SIZE = 500
+
+
+def query_events(session, fields, start_from, start_to=None, locations=(), owners=(), bounding_box=None, after=None,
+                 limit=None):
+    """
+    Queries a page of events, ordered by their start time (and id).
+    The pages use keyset pagination, so a page costs the same no matter how far it is.
+    :param session: The session to query with.
+    :type session: sqlalchemy.orm.Session
+    :param fields: The fields of the events to query.
+    :type fields: list(str)
+    :param start_from: Only events starting at this time or after it are queried.
+    :type start_from: datetime.datetime
+    :param start_to: If given, only events starting at this time or before it are queried.
+    :type start_to: datetime.datetime|None
+    :param locations: If not empty, only events in one of these locations are queried.
+    :type locations: list(str)
+    :param owners: If not empty, only events of one of these owners are queried.
+    :type owners: list(str)
+    :param bounding_box: If given, only events (with coordinates) in this area are queried.
+    :type bounding_box: donight.utils.geo.BoundingBox|None
+    :param after: The (start time, id) of the last event of the previous page, None for the first page.
+    :type after: tuple(datetime.datetime, int)|None
+    :param limit: The maximal amount of events in the page, None for all the events.
+    :type limit: int|None
+    :return: The page of events (whose events are only queried when it is iterated).
+    :rtype: EventsPage
+    """
+    queried_fields = get_queried_fields(fields)
+    query = session.query(*[getattr(Event, field) for field in queried_fields]).filter(Event.start_time >= start_from)
+
+    if start_to is not None:
+        query = query.filter(Event.start_time <= start_to)
+    if locations:
+        query = query.filter(Event.location.in_(locations))
+    if owners:
+        query = query.filter(Event.owner.in_(owners))
+    if bounding_box is not None:
+        query = query.filter(get_bounding_box_filter(bounding_box))
+    if after is not None:
+        after_start_time, after_id = after
+        query = query.filter(or_(Event.start_time > after_start_time,
+                                 and_(Event.start_time == after_start_time, Event.id > after_id)))
+
+    query = query.order_by(Event.start_time, Event.id)
+    # One more event is queried, to know whether there is a next page.
+    if limit is not None:
+        query = query.limit(limit + 1)
+
+    return EventsPage(query, fields, queried_fields, limit)
+
+
+def search_events(session, fields, search_query, start_from, start_to=None, limit=None):
+    """
+    Searches events by their text, using the full-text search index (see donight.search).
+    :param session: The session to query with.
+    :type session: sqlalchemy.orm.Session
+    :param fields: The fields of the events to query.
+    :type fields: list(str)
+    :param search_query: The searched text.
+    :type search_query: basestring
+    :param start_from: Only events starting at this time or after it are queried.
+    :type start_from: datetime.datetime
+    :param start_to: If given, only events starting at this time or before it are queried.
+    :type start_to: datetime.datetime|None
+    :param limit: The maximal amount of events queried, None for all the matching events.
+    :type limit: int|None
+    :return: The matching events (queried when they are iterated), ordered from the most relevant.
+        The events aren't paged, so there is never a next page.
+    :rtype: EventsPage
+    :raises ValueError: If the searched text has no words.
+    """
+    search_results = get_search_results(session.bind.dialect.name, search_query)
+    queried_fields = get_queried_fields(fields)
+    query = session.query(*[getattr(Event, field) for field in queried_fields]) \
+        .join(search_results, search_results.c.event_id == Event.id) \
+        .filter(Event.start_time >= start_from)
+
+    if start_to is not None:
+        query = query.filter(Event.start_time <= start_to)
+
+    query = query.order_by(search_results.c.rank, Event.start_time, Event.id).limit(limit)
+    return EventsPage(query, fields, queried_fields, None)
+
+
+def query_events_near(session, fields, latitude, longitude, radius, start_from, start_to=None, limit=None):
+    """
+    Queries the events around a point, ordered from the nearest.
+    The events are found by the geohash index (see get_bounding_box_filter), and their distance is computed by the db.
+    :param session: The session to query with.
+    :type session: sqlalchemy.orm.Session
+    :param fields: The fields of the events to query.
+    :type fields: list(str)
+    :param latitude: The latitude of the point, in degrees.
+    :type latitude: float
+    :param longitude: The longitude of the point, in degrees.
+    :type longitude: float
+    :param radius: Only events up to this distance from the point (in kilometers) are queried.
+    :type radius: float
+    :param start_from: Only events starting at this time or after it are queried.
+    :type start_from: datetime.datetime
+    :param start_to: If given, only events starting at this time or before it are queried.
+    :type start_to: datetime.datetime|None
+    :param limit: The maximal amount of events queried, None for all the events in the radius.
+    :type limit: int|None
+    :return: The events around the point (queried when they are iterated).
+        The events aren't paged, so there is never a next page.
+    :rtype: EventsPage
+    """
+    # The distance is approximated on a plane (scaling the longitudes to the latitude of the point),
+    # which is accurate enough in the radius of a city, and needs no trigonometric functions in the db.
+    longitude_scale = math.cos(math.radians(latitude))
+    squared_distance = (Event.latitude - latitude) * (Event.latitude - latitude) + \
+        (Event.longitude - longitude) * (Event.longitude - longitude) * longitude_scale ** 2
+
+    queried_fields = get_queried_fields(fields)
+    query = session.query(*[getattr(Event, field) for field in queried_fields]) \
+        .filter(get_bounding_box_filter(get_radius_bounding_box(latitude, longitude, radius)),
+                squared_distance <= (radius / KM_PER_DEGREE) ** 2,
+                Event.start_time >= start_from)
+
+    if start_to is not None:
+        query = query.filter(Event.start_time <= start_to)
+
+    query = query.order_by(squared_distance, Event.start_time, Event.id).limit(limit)
+    return EventsPage(query, fields, queried_fields, None)
+
+
+def get_bounding_box_filter(bounding_box):
+    """
+    Returns a filter of the events in an area.
+    The events are found by ranges of their geohash index, that cover a bit more than the area,
+    and are then filtered by their coordinates.
+    :type bounding_box: donight.utils.geo.BoundingBox
+    :rtype: sqlalchemy.sql.elements.ClauseElement
+    """
+    geohash_filters = []
+    for range_start, range_end in get_geohash_ranges(bounding_box, GEOHASH_PRECISION):
+        if range_end is None:
+            geohash_filters.append(Event.geohash >= range_start)
+        else:
+            geohash_filters.append(and_(Event.geohash >= range_start, Event.geohash < range_end))
+
+    return and_(or_(*geohash_filters),
+                Event.latitude.between(bounding_box.south, bounding_box.north),
+                Event.longitude.between(bounding_box.west, bounding_box.east))
+
+
+def get_queried_fields(fields):
+    """
+    :return: The given fields, and the fields of the pagination keyset (see query_events).
+    :rtype: list(str)
+    """
+    return list(fields) + [field for field in ['start_time', 'id'] if field not in fields]
+
+
+class EventsPage(object):
+    """
+    A page of queried events, which can be iterated once.
+    The events are fetched from the db in chunks of rows (only the queried columns, without creating Event objects),
+    and serialized while they are iterated, so the page is never held in memory as a whole.
+    """
+    def __init__(self, query, fields, queried_fields, limit):
+        """
+        :param query: The query of the page's rows, holding the queried fields (in this order),
+            and one more row than the limit.
+        :type query: sqlalchemy.orm.Query
+        :param fields: The fields of every event in the page.
+        :type fields: list(str)
+        :param queried_fields: The fields queried for every event (the fields and the keyset fields).
+        :type queried_fields: list(str)
+        :param limit: The maximal amount of events in the page, None for all the events.
+        :type limit: int|None
+        """
+        self.__query = query
+        self.__limit = limit
+        self.__fields_serializers = [(field, queried_fields.index(field), Event.get_attr_serializer(field))
+                                     for field in fields]
+        self.__start_time_index = queried_fields.index('start_time')
+        self.__id_index = queried_fields.index('id')
+        # The cursor of the next page, known once the page was iterated (None if it is the last page).
+        self.next_cursor = None
+
+    def __iter__(self):
+        """
+        :return: A generator of the dicts of the events (holding the page's fields).
+        :rtype: generator(dict)
+        """
+        last_row = None
+        for row_index, row in enumerate(self.__query.yield_per(QUERY_ROWS_CHUNK_SIZE)):
+            if row_index == self.__limit:
+                self.next_cursor = encode_cursor(last_row[self.__start_time_index], last_row[self.__id_index])
+                return
+
+            yield {field: serializer(row[index]) for field, index, serializer in self.__fields_serializers}
+            last_row = row
+
+
+def get_today_start():
+    return datetime.datetime.combine(datetime.date.today(), datetime.time.min)
+
+
+def encode_cursor(start_time, event_id):
+    return base64.urlsafe_b64encode(json.dumps([start_time.isoformat(), event_id]))
+
+
+def decode_cursor(cursor):
+    """
+    :return: The (start time, id) of the last event of the previous page.
+    :rtype: tuple(datetime.datetime, int)
+    :raises ValueError: If the cursor is invalid.
+    """
+    try:
+        decoded_cursor = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        # A valid json of the wrong shape can't be turned into a cursor.
+        if not isinstance(decoded_cursor, list) or len(decoded_cursor) != 2:
+            raise ValueError('The cursor is not a pair')
+
+        start_time, event_id = decoded_cursor
+        if not isinstance(start_time, basestring) or not isinstance(event_id, (int, long)) or \
+                isinstance(event_id, bool):
+            raise ValueError('The cursor is not a (string, int) pair')
+
+        return dateutil.parser.parse(start_time), event_id
+    except (TypeError, ValueError, AttributeError, OverflowError):
+        raise ValueError(u'Invalid cursor: {}'.format(cursor))
@@ -0,0 +1,154 @@
+"""
+Versioned migrations of the db schema.
+The version of the schema is kept in the schema_version table,
+and every migration in MIGRATIONS upgrades the schema by one version.
+
+The migrations only use plain sql (and not the models), since they must keep
+creating the same schema even after the models change.
+When changing a model's table, add a migration to the end of MIGRATIONS that upgrades existing dbs the same way.
+(New tables, and new dbs, are created directly from the models, and the search index with the events table.)
+"""
+from logging import getLogger
+
+from sqlalchemy import inspect, select, text, Table, Column, Integer, MetaData
+
+from donight.search import create_search_index, update_search_index, SEARCHED_FIELDS
+
+logger = getLogger(__name__)
+
+schema_metadata = MetaData()
+
+schema_version_table = Table('schema_version', schema_metadata,
+                             Column('version', Integer, nullable=False))
+
+
+def add_start_date(connection):
+    """
+    Adds the events natural key (title, location, start_date):
+    adds and fills the start_date column, merges duplicate events (see merge_duplicate_events)
+    and creates the unique index.
+    """
+    if 'start_date' in [column['name'] for column in inspect(connection).get_columns('events')]:
+        # The table was created with the natural key (before migrations existed).
+        return
+
+    connection.execute(text('ALTER TABLE events ADD COLUMN start_date DATE'))
+    connection.execute(text('UPDATE events SET start_date = date(start_time)'))
+    merge_duplicate_events(connection)
+    connection.execute(text('CREATE UNIQUE INDEX uq_events_natural_key ON events (title, location, start_date)'))
+
+
+# The columns of the events (besides their natural key) when the natural key was added, merged by add_start_date.
+NATURAL_KEY_MERGED_COLUMNS = ['start_time', 'end_time', 'price', 'url', 'description', 'image', 'owner', 'owner_url',
+                              'ticket_url']
+
+
+def merge_duplicate_events(connection):
+    """
+    Merges the events that have the same natural key into one event.
+    The oldest event (with the lowest id) is kept, and every column of it gets the value of the newest event
+    that has a value in it, so no scraped information of a newer event is lost. The rest of the events are removed.
+    """
+    natural_key_filter = 'title = :title AND location = :location AND start_date = :start_date'
+    duplicate_keys = connection.execute(text(
+        'SELECT title, location, start_date FROM events '
+        'WHERE title IS NOT NULL AND location IS NOT NULL AND start_date IS NOT NULL '
+        'GROUP BY title, location, start_date HAVING COUNT(*) > 1')).fetchall()
+
+    removed_events_count = 0
+    for title, location, start_date in duplicate_keys:
+        natural_key = {'title': title, 'location': location, 'start_date': start_date}
+        events = connection.execute(text('SELECT id, {} FROM events WHERE {} ORDER BY id'.format(
+            ', '.join(NATURAL_KEY_MERGED_COLUMNS), natural_key_filter)), **natural_key).fetchall()
+
+        merged_values = {}
+        for column in NATURAL_KEY_MERGED_COLUMNS:
+            values = [event[column] for event in events if event[column] not in (None, '')]
+            if values:
+                merged_values[column] = values[-1]
+
+        kept_id = events[0]['id']
+        if merged_values:
+            connection.execute(text('UPDATE events SET {} WHERE id = :id'.format(
+                ', '.join('{0} = :{0}'.format(column) for column in merged_values))), id=kept_id, **merged_values)
+        connection.execute(text('DELETE FROM events WHERE {} AND id != :id'.format(natural_key_filter)),
+                           id=kept_id, **natural_key)
+        removed_events_count += len(events) - 1
+
+    if duplicate_keys:
+        logger.warning('Removed %d duplicate events, after merging them into the %d events with their natural key.',
+                       removed_events_count, len(duplicate_keys))
+
+
+def add_start_time_index(connection):
+    connection.execute(text('CREATE INDEX ix_events_start_time ON events (start_time)'))
+
+
+def add_content_hash(connection):
+    connection.execute(text('ALTER TABLE events ADD COLUMN content_hash VARCHAR(40)'))
+
+
+def add_search_index(connection):
+    """
+    Creates the full-text search index of the events, and indexes the existing events.
+    """
+    create_search_index(connection)
+    events = connection.execute(text('SELECT id, {} FROM events'.format(', '.join(SEARCHED_FIELDS))))
+    update_search_index(connection, events)
+
+
+def add_coordinates(connection):
+    connection.execute(text('ALTER TABLE events ADD COLUMN latitude FLOAT'))
+    connection.execute(text('ALTER TABLE events ADD COLUMN longitude FLOAT'))
+    connection.execute(text('ALTER TABLE events ADD COLUMN geohash VARCHAR(9)'))
+    connection.execute(text('CREATE INDEX ix_events_geohash ON events (geohash)'))
+
+
+MIGRATIONS = [
+    add_start_date,
+    add_start_time_index,
+    add_content_hash,
+    add_search_index,
+    add_coordinates,
+]
+
+LATEST_VERSION = len(MIGRATIONS)
+
+
+def get_schema_version(connection):
+    """
+    :return: The version of the schema of the db, or None if the db isn't versioned yet.
+    :rtype: int|None
+    """
+    if not schema_version_table.exists(connection):
+        return None
+
+    return connection.execute(select([schema_version_table.c.version])).scalar()
+
+
+def migrate(engine, metadata):
+    """
+    Creates the db schema, or upgrades it to the latest version.
+    A db that doesn't have the events table yet is created from the given metadata, in the latest version.
+    A db that has the events table but isn't versioned yet was created before migrations existed,
+    so it is migrated from the first version.
+    :param engine: The engine of the db to migrate.
+    :type engine: sqlalchemy.engine.Engine
+    :param metadata: The metadata of the models.
+    :type metadata: sqlalchemy.MetaData
+    """
+    with engine.begin() as connection:
+        version = get_schema_version(connection)
+
+        if version is None:
+            version = 0 if engine.dialect.has_table(connection, 'events') else LATEST_VERSION
+            schema_metadata.create_all(connection)
+            connection.execute(schema_version_table.insert().values(version=version))
+
+        for version, migration in enumerate(MIGRATIONS[version:], version + 1):
+            logger.info('Migrating the db schema to version %d (%s)', version, migration.__name__)
+            migration(connection)
+            connection.execute(schema_version_table.update().values(version=version))
+
+        # Creates any missing table (every table, if the db is new), so adding a table requires no migration.
+        metadata.create_all(connection)
@@ -0,0 +1,96 @@
+"""
+Measures how fast OzenBarScraper parses the html of a month of events,
+and checks it scrapes the same events as the previous BeautifulSoup parsing.
+Usage: benchmark_ozen_bar.py [<recorded month html> <year> <month>]
+(A recorded response can be saved from the OzenBar website, see OzenBarScraper.fetch_month,
+tests/fixtures/ozen_bar_month.html is a month in the format of the website. Without one, a generated month is used.)
+"""
+import datetime as dt
+import re
+import sys
+import time
+from logging import getLogger
+
+from bs4 import BeautifulSoup
+
+from donight.events import Event
+from donight.event_finder.scrapers.ozen_bar import OzenBarScraper, TIME_SEPERATOR
+from donight.utils import to_local_timezone
+
+EVENT_HTML = u'''
+<li>
+    <a href="http://www.ozenbar.com/event/{number}/"><img src="http://www.ozenbar.com/images/{number}.jpg"></a>
+    <div class="date">\u05d9\u05d5\u05dd \u05d3\u05f3 {day} \u05d1\u05de\u05e8\u05e5</div>
+    <div class="times">\u05e4\u05ea\u05d9\u05d7\u05ea \u05d3\u05dc\u05ea\u05d5\u05ea: {hour}:30</div>
+    <h2>\u05d4\u05d5\u05e4\u05e2\u05d4 \u05de\u05e1\u05e4\u05e8 {number}</h2>
+    <p>{description}</p>
+    <b>{price} \u20aa</b>
+</li>
+'''
+PAGE_HTML = u'''
+<html><head><script>{script}</script></head>
+<body><div class="menu">{menu}</div><ul class="events">{events}</ul><div class="footer">{menu}</div></body></html>
+'''
+
+
+def generate_month_html(events_amount=60):
+    events = u''.join(EVENT_HTML.format(number=number, day=number % 28 + 1, hour=19 + number % 4,
+                                        description=u'Description ' * 40, price=40 + number % 5 * 10)
+                      for number in xrange(events_amount))
+    menu = u''.join(u'<div><span><a href="#{0}">Item {0}</a></span></div>'.format(number) for number in xrange(200))
+    return PAGE_HTML.format(script=u'var x = 1;' * 500, menu=menu, events=events).encode('utf8')
+
+
+def parse_with_beautifulsoup(html, year, month):
+    """Parses the events the way OzenBarScraper used to, by searching a BeautifulSoup tree of the html."""
+    events_soup = BeautifulSoup(html, 'lxml', from_encoding='utf8')
+    return [create_event_from_soup_element(event_element, year, month)
+            for event_element in events_soup.find_all('li')]
+
+
+def create_event_from_soup_element(event_element, year, month):
+    try:
+        day = int(re.findall('.*?([0-9]+).*?', event_element.find('div', {'class': 'date'}).text)[0])
+        full_time = re.findall('.*?([0-9]+:[0-9]+).*?', event_element.find('div', {'class': 'times'}).text)[0]
+        hour, minute = map(int, full_time.split(TIME_SEPERATOR))
+        return Event(title=event_element.find('h2').text,
+                     start_time=to_local_timezone(dt.datetime(year, month, day, hour, minute)),
+                     location=OzenBarScraper.OZEN_BAR_LOCATION, latitude=OzenBarScraper.OZEN_BAR_COORDINATES[0],
+                     longitude=OzenBarScraper.OZEN_BAR_COORDINATES[1], price=event_element.find('b').text,
+                     url=event_element.find('a')['href'], description=event_element.find('p').text,
+                     image=event_element.find('img')['src'], owner=None, owner_url=None)
+    except Exception:
+        return None
+
+
+def measure_events_per_second(parse, html, year, month, repeats=20):
+    start_time = time.time()
+    for _ in xrange(repeats):
+        events = parse(html, year, month)
+    return len(events) * repeats / (time.time() - start_time)
+
+
+def to_comparable(events):
+    return [event.to_dict() if event is not None else None for event in events]
+
+
+if __name__ == '__main__':
+    logger = getLogger('donight.scripts.benchmarks')
+    scraper = OzenBarScraper()
+
+    if len(sys.argv) > 3:
+        with open(sys.argv[1], 'rb') as recorded_html:
+            html = recorded_html.read()
+        year, month = int(sys.argv[2]), int(sys.argv[3])
+    else:
+        html, year, month = generate_month_html(), 2016, 3
+
+    if to_comparable(scraper.parse_events(html, year, month)) != \
+            to_comparable(parse_with_beautifulsoup(html, year, month)):
+        logger.error("OzenBarScraper scrapes different events than the BeautifulSoup parsing")
+        sys.exit(1)
+
+    beautifulsoup_rate = measure_events_per_second(parse_with_beautifulsoup, html, year, month)
+    xpath_rate = measure_events_per_second(scraper.parse_events, html, year, month)
+    logger.info("BeautifulSoup: %.0f events per second, xpath: %.0f events per second (x%.1f)",
+                beautifulsoup_rate, xpath_rate, xpath_rate / beautifulsoup_rate)
@@ -0,0 +1,65 @@
+import datetime
+import random
+import sys
+import time
+from logging import getLogger
+
+from donight.event_finder.similar_events import SimilarEventsIndex
+from donight.events import Event
+
+VENUES = [u'\u05dc\u05d1\u05d5\u05e0\u05d8\u05d9\u05df 7', u'\u05d0\u05d5\u05d6\u05df\u05d1\u05e8', u'The Barby',
+          u'Kuli Alma', u'Gagarin Club', u'Hangar 11', u'Zappa Tel Aviv', u'The Container']
+WORDS = [u'band', u'live', u'trio', u'jazz', u'night', u'release', u'show', u'quartet', u'acoustic', u'party',
+         u'\u05d4\u05d5\u05e4\u05e2\u05d4', u'\u05d4\u05e9\u05e7\u05d4', u'\u05dc\u05d9\u05dc\u05d4',
+         u'\u05de\u05e1\u05d9\u05d1\u05d4', u'\u05d0\u05dc\u05d1\u05d5\u05dd']
+DAYS = 450
+
+
+def create_random_event(random_generator, first_day):
+    title = u' '.join(random_generator.choice(WORDS) for _ in xrange(random_generator.randint(2, 5)))
+    start_time = first_day + datetime.timedelta(days=random_generator.randrange(DAYS),
+                                                hours=random_generator.randint(18, 23))
+    return Event(title=title + u' ' + unicode(random_generator.randrange(10 ** 6)),
+                 location=random_generator.choice(VENUES), start_time=start_time)
+
+
+def create_variant(random_generator, event):
+    """Creates an event like the given event, with a small typo in its title."""
+    title = list(event.title)
+    title[random_generator.randrange(len(title))] = random_generator.choice(u'abcdefgh')
+    return Event(title=u''.join(title), location=event.location, start_time=event.start_time)
+
+
+def benchmark(stored_events_amount=100000, lookups_amount=10000, seed=0):
+    """
+    Measures the throughput of finding similar events in an index of many stored events.
+    Half of the looked up events are stored events with a typo, and half are new events.
+    :return: The indexing time, the lookups per second and the amount of similar events found.
+    :rtype: (float, float, int)
+    """
+    random_generator = random.Random(seed)
+    first_day = datetime.datetime(2016, 1, 1)
+    stored_events = [create_random_event(random_generator, first_day) for _ in xrange(stored_events_amount)]
+
+    start_time = time.time()
+    index = SimilarEventsIndex(stored_events)
+    indexing_time = time.time() - start_time
+
+    lookups = [create_variant(random_generator, random_generator.choice(stored_events)) if lookup_number % 2 == 0
+               else create_random_event(random_generator, first_day)
+               for lookup_number in xrange(lookups_amount)]
+
+    start_time = time.time()
+    found = sum(1 for event in lookups if index.find(event) is not None)
+    lookups_per_second = lookups_amount / (time.time() - start_time)
+
+    return indexing_time, lookups_per_second, found
+
+
+if __name__ == '__main__':
+    logger = getLogger('donight.scripts.benchmarks')
+    stored_events_amount = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+
+    indexing_time, lookups_per_second, found = benchmark(stored_events_amount)
+    logger.info("Indexed %d events in %.2f seconds, %.0f lookups per second (%d similar events found)",
+                stored_events_amount, indexing_time, lookups_per_second, found)
@@ -0,0 +1,112 @@
+"""
+Measures how long donight takes to start:
+the time it takes to import every module of STARTUP_MODULES (in a new process, so earlier imports aren't counted),
+and the time it takes a new web server process to answer its first request (importing the app,
+bootstrapping the db and handling the request).
+The measuring processes run on a temporary sqlite db (see MEASURED_ENVIRONMENT), never on the configured db.
+Usage: benchmark_startup.py [<repeats>]
+(Every measurement is repeated in new processes, and the median is logged.)
+"""
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+from logging import getLogger
+
+# Configures the logging (the measured modules are only imported by the measuring processes).
+import donight
+
+# The modules that processes start by importing (the web server, the indexer and the applications).
+STARTUP_MODULES = [
+    'donight.config.consts',
+    'donight.events',
+    'donight.db',
+    'donight.event_finder',
+    'donight.web.app',
+    'donight.applications.events_to_excel',
+]
+# The environment of the measuring processes, besides the db path (see get_measured_environment):
+# the debug configuration uses an sqlite db, and no snapshot is read (so the first request queries the db).
+MEASURED_ENVIRONMENT = {'DEBUG': 'true', 'EVENTS_SNAPSHOT_PATH': ''}
+HEAVY_PACKAGES = ['sqlalchemy', 'requests', 'flask', 'selenium', 'facebook', 'lxml', 'bs4', 'pkg_resources']
+
+IMPORT_TIME_SCRIPT = """
+import json, sys, time
+start_time = time.time()
+import {module}
+print json.dumps({{'seconds': time.time() - start_time,
+                   'heavy_packages': [name for name in {heavy_packages!r} if name in sys.modules]}})
+"""
+
+# Creates the schema of the temporary db, so the measured requests bootstrap an existing db.
+CREATE_DB_SCRIPT = """
+from donight.db import bootstrap
+bootstrap(migrate_schema=True)
+"""
+
+FIRST_REQUEST_SCRIPT = """
+import json, time
+start_time = time.time()
+from donight.web.app import app
+import_seconds = time.time() - start_time
+response = app.test_client().get('/api/events?limit=1')
+response.close()
+print json.dumps({'import_seconds': import_seconds, 'seconds': time.time() - start_time,
+                  'status': response.status_code})
+"""
+
+
+def get_measured_environment(db_dir):
+    """
+    :param db_dir: The directory of the temporary db.
+    :type db_dir: str
+    :return: The environment of the measuring processes.
+    :rtype: dict(str, str)
+    """
+    environment = dict(os.environ, DB_PATH=os.path.join(db_dir, 'db.sqlite3'))
+    environment.update(MEASURED_ENVIRONMENT)
+    return environment
+
+
+def run_measurement(script, environment):
+    """
+    Runs the script in a new python process, and returns the json object it printed last.
+    """
+    output = subprocess.check_output([sys.executable, '-c', script], env=environment)
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def median(values):
+    return sorted(values)[len(values) / 2]
+
+
+if __name__ == '__main__':
+    logger = getLogger('donight.scripts.benchmarks')
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    db_dir = tempfile.mkdtemp(prefix='donight_benchmark_')
+    environment = get_measured_environment(db_dir)
+
+    try:
+        for module in STARTUP_MODULES:
+            try:
+                measurements = [run_measurement(IMPORT_TIME_SCRIPT.format(module=module, heavy_packages=HEAVY_PACKAGES),
+                                                environment)
+                                for _ in xrange(repeats)]
+            except subprocess.CalledProcessError:
+                logger.error("Failed importing %s", module)
+                continue
+
+            logger.info("Importing %s: %.0fms (imports %s)", module,
+                        median([measurement['seconds'] for measurement in measurements]) * 1000,
+                        ', '.join(measurements[0]['heavy_packages']) or 'no heavy packages')
+
+        subprocess.check_call([sys.executable, '-c', CREATE_DB_SCRIPT], env=environment)
+        measurements = [run_measurement(FIRST_REQUEST_SCRIPT, environment) for _ in xrange(repeats)]
+        logger.info("Time to first request of donight.web.app: %.0fms (%.0fms importing the app, status %d)",
+                    median([measurement['seconds'] for measurement in measurements]) * 1000,
+                    median([measurement['import_seconds'] for measurement in measurements]) * 1000,
+                    measurements[0]['status'])
+    finally:
+        shutil.rmtree(db_dir)
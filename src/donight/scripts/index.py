@@ -1,3 +1,8 @@
+"""
+Indexes the events of all the sources once, or only of the given sources.
+Usage: index.py [<source name> ...]
+"""
+import sys
 from logging import getLogger
 
 from donight.config.consts import DEBUG
@@ -6,4 +11,4 @@ from donight.event_finder.core import EventFinder
 if __name__ == '__main__':
     logger = getLogger(__name__)
     logger.info("Mode: {0}".format('Debug' if DEBUG else 'Production'))
-    EventFinder().index_events()
\ No newline at end of file
+    EventFinder(sources_names=sys.argv[1:] or None).index_events()
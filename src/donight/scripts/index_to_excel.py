@@ -1,16 +1,24 @@
+"""
+Indexes the events of all the sources, and exports the upcoming events to a file.
+Usage: index_to_excel.py [<events file name>]
+(The format of the file is chosen by its extension: .xlsx (the default), .csv or .ndjson, see get_events_writer.)
+"""
 import sys
 
 import datetime
 
-from donight.applications.events_to_excel import EventsExcel
+from donight.applications.events_export import get_events_writer, query_exported_events
 from donight.event_finder import EventFinder
-from donight.events import Session, Event
+from donight.events import Session
 
 
 def load_events_to_excel(events_file_name):
     session = Session()
-    events = session.query(Event).filter(Event.start_time >= datetime.datetime.now()).all()
-    EventsExcel().create_excel(events, events_file_name)
+    try:
+        events = query_exported_events(session, start_from=datetime.datetime.now())
+        get_events_writer(events_file_name).write(events, events_file_name)
+    finally:
+        session.close()
 
 
 if __name__ == '__main__':
@@ -21,4 +29,3 @@ if __name__ == '__main__':
     EventFinder().index_events()
 
     load_events_to_excel(events_file_name)
-
@@ -0,0 +1,9 @@
+"""
+Creates the db schema, or upgrades it to the latest version (see donight.migrations).
+Run before starting the web server and the indexer, so their processes don't have to migrate the schema
+(see MIGRATE_DB_ON_BOOTSTRAP).
+"""
+from donight.db import bootstrap
+
+if __name__ == '__main__':
+    bootstrap(migrate_schema=True)
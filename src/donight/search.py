@@ -0,0 +1,142 @@
+"""
+The full-text search index of the events.
+The index is kept in the events_search table, which is created by the dialect's full-text search:
+an FTS5 virtual table in SQLite, and a table of tsvectors with a GIN index in PostgreSQL.
+Neither can be declared as a model, so the table is created when the events table is created,
+and is updated by the event finder whenever it writes events (see EventFinder.upload_to_db).
+
+The texts are tokenized here (see donight.utils.text.get_search_words) and not by the db,
+since the db tokenizers don't know the Hebrew final letters and prefixes.
+"""
+from sqlalchemy import text, Integer, Float
+
+from donight.utils import iterate_chunks
+from donight.utils.text import get_words, get_search_words
+
+SUPPORTED_DIALECTS = ['postgresql', 'sqlite']
+
+# The fields of an event that are searched, and the weight of a match in each of them.
+SEARCHED_FIELDS_WEIGHTS = [('title', 10.0), ('location', 4.0), ('owner', 4.0), ('description', 1.0)]
+SEARCHED_FIELDS = [field_name for field_name, _ in SEARCHED_FIELDS_WEIGHTS]
+# The PostgreSQL weight labels of the searched fields (in order), see POSTGRESQL_WEIGHTS.
+POSTGRESQL_WEIGHT_LABELS = ['A', 'B', 'B', 'C']
+# ts_rank weights of the labels D, C, B and A.
+POSTGRESQL_WEIGHTS = '{0.1, 0.1, 0.4, 1.0}'
+
+# The amount of events written to the index in a single statement.
+INDEX_BATCH_SIZE = 500
+
+CREATE_STATEMENTS = {
+    'sqlite': [
+        # The prefix indexes make prefix queries (see get_search_results) as fast as full word queries.
+        "CREATE VIRTUAL TABLE events_search USING fts5({}, tokenize='unicode61', prefix='2 3')".format(
+            ', '.join(SEARCHED_FIELDS)),
+    ],
+    'postgresql': [
+        'CREATE TABLE events_search ('
+        'event_id INTEGER PRIMARY KEY REFERENCES events (id) ON DELETE CASCADE, '
+        'search_vector TSVECTOR NOT NULL)',
+        'CREATE INDEX ix_events_search_vector ON events_search USING GIN (search_vector)',
+    ],
+}
+
+SEARCH_STATEMENTS = {
+    'sqlite': 'SELECT rowid AS event_id, bm25(events_search, {weights}) AS rank '
+              'FROM events_search WHERE events_search MATCH :query'.format(
+                  weights=', '.join(str(weight) for _, weight in SEARCHED_FIELDS_WEIGHTS)),
+    # ts_rank grows with the relevance, so it is negated to be ordered like bm25.
+    'postgresql': "SELECT event_id, -ts_rank('{weights}', search_vector, query) AS rank "
+                  "FROM events_search, to_tsquery('simple', :query) AS query "
+                  "WHERE search_vector @@ query".format(weights=POSTGRESQL_WEIGHTS),
+}
+
+
+def create_search_index(connection):
+    """
+    Creates the (empty) events_search table, if the dialect of the connection supports full-text search.
+    :type connection: sqlalchemy.engine.Connection
+    """
+    for statement in CREATE_STATEMENTS.get(connection.dialect.name, []):
+        connection.execute(text(statement))
+
+
+def update_search_index(connection, events):
+    """
+    Writes the given events to the search index, replacing their previous information in it.
+    Does nothing if the dialect of the connection doesn't support full-text search.
+    :type connection: sqlalchemy.engine.Connection
+    :param events: The events to index, which must have an id (any object with the id and the SEARCHED_FIELDS).
+    :type events: iterable
+    """
+    dialect_name = connection.dialect.name
+    if dialect_name not in SUPPORTED_DIALECTS:
+        return
+
+    for events_batch in iterate_chunks(events, INDEX_BATCH_SIZE):
+        documents = [get_search_document(event) for event in events_batch]
+
+        if dialect_name == 'sqlite':
+            # FTS5 tables have no unique constraints, so the previous rows are deleted instead of being upserted.
+            connection.execute(text('DELETE FROM events_search WHERE rowid IN ({})'.format(
+                ', '.join(str(int(document['id'])) for document in documents))))
+            connection.execute(text('INSERT INTO events_search (rowid, {0}) VALUES (:id, {1})'.format(
+                ', '.join(SEARCHED_FIELDS), ', '.join(':' + field_name for field_name in SEARCHED_FIELDS))),
+                documents)
+        else:
+            search_vector = ' || '.join("setweight(to_tsvector('simple', :{0}), '{1}')".format(field_name, label)
+                                        for field_name, label in zip(SEARCHED_FIELDS, POSTGRESQL_WEIGHT_LABELS))
+            connection.execute(text('INSERT INTO events_search (event_id, search_vector) VALUES (:id, {}) '
+                                    'ON CONFLICT (event_id) DO UPDATE SET search_vector = excluded.search_vector'
+                                    .format(search_vector)),
+                               documents)
+
+
+def get_search_document(event):
+    """
+    :return: The id of the event, and the search words of each of its searched fields (joined by spaces).
+    :rtype: dict
+    """
+    document = {field_name: u' '.join(get_search_words(getattr(event, field_name)))
+                for field_name in SEARCHED_FIELDS}
+    document['id'] = event.id
+    return document
+
+
+def is_search_supported(dialect_name):
+    """
+    :param dialect_name: The dialect of the db that is searched.
+    :type dialect_name: str
+    :return: Whether the dialect supports full-text search (see get_search_results).
+    :rtype: bool
+    """
+    return dialect_name in SUPPORTED_DIALECTS
+
+
+def get_search_results(dialect_name, query):
+    """
+    Returns the results of a search, to be joined with the events table.
+    Every word of the query must be found in an event (as a whole word, or as the start of a word).
+    :param dialect_name: The dialect of the db that is searched.
+    :type dialect_name: str
+    :param query: The searched text.
+    :type query: basestring
+    :return: A selectable of the matching events, with their event_id and rank (lower is more relevant).
+    :rtype: sqlalchemy.sql.expression.Alias
+    :raises ValueError: If the query has no words.
+    :raises NotImplementedError: If the dialect doesn't support full-text search.
+    """
+    if not is_search_supported(dialect_name):
+        raise NotImplementedError('Full-text search is not supported by the {} dialect.'.format(dialect_name))
+
+    words = get_words(query)
+    if not words:
+        raise ValueError(u'Invalid search query: {}'.format(query))
+
+    # The words hold only letters and digits (see normalize_text), so they need no escaping.
+    if dialect_name == 'sqlite':
+        match_query = u' '.join(u'"{}"*'.format(word) for word in words)
+    else:
+        match_query = u' & '.join(u'{}:*'.format(word) for word in words)
+
+    return text(SEARCH_STATEMENTS[dialect_name]).bindparams(query=match_query) \
+        .columns(event_id=Integer, rank=Float).alias('search_results')
@@ -0,0 +1,93 @@
+"""
+The snapshot of the upcoming events, which the indexer publishes after every index (see publish_events_snapshot),
+and the web server reads (see EventsSnapshot), instead of querying the db on every request.
+"""
+import datetime
+import gzip
+import hashlib
+import mmap
+import os
+from threading import Lock
+
+from donight.events_query import EVENT_FIELDS, query_events, get_today_start
+from donight.utils import replace_file, iterate_json_array
+
+
+def publish_events_snapshot(session, path):
+    """
+    Saves a snapshot of the upcoming events (the response of /api/events/all), already serialized and gzipped,
+    so the web server can serve it without querying and serializing the events on every request.
+    Only the public fields of the events are serialized (see EVENT_FIELDS),
+    so the snapshot (and its etag) only changes when the information the api returns changes.
+    The snapshot is first written to a temporary file that then replaces the published snapshot,
+    so readers never see a half written snapshot.
+    :param session: The session to query the events with.
+    :type session: sqlalchemy.orm.Session
+    :param path: The path of the snapshot file.
+    :type path: str
+    """
+    events = query_events(session, EVENT_FIELDS, get_today_start())
+
+    temporary_path = path + '.tmp'
+    # A constant mtime keeps the gzipped content (and so its etag) the same as long as the events are the same.
+    snapshot_file = gzip.GzipFile(temporary_path, 'wb', mtime=0)
+    try:
+        for chunk in iterate_json_array(events):
+            snapshot_file.write(chunk)
+    finally:
+        snapshot_file.close()
+
+    replace_file(temporary_path, path)
+
+
+class EventsSnapshot(object):
+    """
+    Reads the lastly published events snapshot (see publish_events_snapshot).
+    The snapshot is memory mapped, so all the web server's processes share the same memory,
+    and it is mapped again only when a new snapshot is published.
+    """
+    def __init__(self, path):
+        """
+        :param path: The path of the snapshot file.
+        :type path: str
+        """
+        self.__path = path
+        self.__lock = Lock()
+        self.__file_id = None
+        self.__content = None
+        self.__etag = None
+
+    def get(self):
+        """
+        :return: The etag of the snapshot and its gzipped content,
+            or None if there is no snapshot, or it was published before today (so it holds events that already passed).
+        :rtype: tuple(str, mmap.mmap)|None
+        """
+        try:
+            file_stat = os.stat(self.__path)
+        except OSError:
+            return None
+
+        if datetime.date.fromtimestamp(file_stat.st_mtime) != datetime.date.today():
+            return None
+
+        with self.__lock:
+            if self.__get_file_id(file_stat) != self.__file_id:
+                self.__map_snapshot()
+
+            return self.__etag, self.__content
+
+    def __map_snapshot(self):
+        with open(self.__path, 'rb') as snapshot_file:
+            # The id is taken from the opened file, in case the snapshot was replaced since it was checked.
+            file_id = self.__get_file_id(os.fstat(snapshot_file.fileno()))
+            content = mmap.mmap(snapshot_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        # The previous mapping isn't closed, since it might still be sent by other threads.
+        self.__content = content
+        self.__etag = hashlib.sha1(content).hexdigest()
+        self.__file_id = file_id
+
+    # noinspection PyMethodMayBeStatic
+    def __get_file_id(self, file_stat):
+        return file_stat.st_ino, file_stat.st_mtime, file_stat.st_size
@@ -1,8 +1,9 @@
 import json
+import os
 import time
+from itertools import chain, islice
 
 import dateutil.tz
-from sqlalchemy import inspect
 
 SECONDS_IN_DAY = 24 * 60 * 60
 SECONDS_IN_MONTH = 30 * SECONDS_IN_DAY
@@ -50,6 +51,41 @@ def find(iterable, condition, default=None):
     return next((item for item in iterable if condition(item)), default)
 
 
+def iterate_chunks(iterable, chunk_size):
+    """
+    Splits the iterable into consecutive chunks, consuming it lazily (every chunk is taken when it is needed).
+    :param iterable: The iterable to split.
+    :type iterable: iterable
+    :param chunk_size: The maximal amount of items in a chunk (only the last chunk may be smaller).
+    :type chunk_size: int
+    :return: A generator of the chunks.
+    :rtype: generator(list)
+    """
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def prefetch_first(iterable):
+    """
+    Takes the first item of a lazy iterable right away,
+    so errors of starting the iteration (like errors of executing a lazy query) are raised now,
+    and not while the items are sent.
+    :param iterable: The iterable to start.
+    :type iterable: iterable
+    :return: An iterator of all the items of the iterable.
+    :rtype: iterator
+    """
+    iterator = iter(iterable)
+    for first_item in iterator:
+        return chain([first_item], iterator)
+
+    return iter([])
+
+
 def get_model_fields(model, excluded_fields=list()):
     """
     Returns a list of all the fields an sqlalchemy model has.
@@ -60,6 +96,9 @@ def get_model_fields(model, excluded_fields=list()):
     :return: A list of all the fields of the model.
     :rtype: list(str)
     """
+    # Imported here, since the configuration imports this module, and shouldn't import sqlalchemy.
+    from sqlalchemy import inspect
+
     return [unicode(column.key) for column in inspect(model).mapper.columns
             if column.key not in excluded_fields]
 
@@ -76,3 +115,81 @@ def jsonp_loads(jsonp):
     json_without_padding = jsonp[jsonp.index("(") + 1: jsonp.rindex(")")]
     return json.loads(json_without_padding)
 
+
+def iterate_json_array(items, items_per_chunk=100):
+    """
+    Serializes a json array lazily, so the whole serialized array is never held in memory.
+    The concatenated chunks are the same as json.dumps(list(items), ensure_ascii=False), encoded in utf8.
+    :param items: The items of the array (json objects).
+    :type items: iterable
+    :param items_per_chunk: The amount of items serialized in every chunk.
+    :type items_per_chunk: int
+    :return: A generator of the utf8 encoded chunks of the serialized array.
+    :rtype: generator(str)
+    """
+    yield '['
+
+    for chunk_index, chunk in enumerate(iterate_chunks(items, items_per_chunk)):
+        serialized_chunk = u', '.join(json.dumps(item, ensure_ascii=False) for item in chunk).encode('utf8')
+        yield serialized_chunk if chunk_index == 0 else ', ' + serialized_chunk
+
+    yield ']'
+
+
+def load_json_file(path, default=None):
+    """
+    Loads a json object from a file.
+    :param path: The path of the json file.
+    :type path: str
+    :param default: The object to return if the file doesn't exist (or isn't valid json).
+    :return: The loaded json object.
+    :rtype: dict | list | str
+    """
+    try:
+        with open(path, 'rb') as json_file:
+            return json.load(json_file)
+    except (IOError, ValueError):
+        return default
+
+
+def save_json_file(path, obj, mode=None):
+    """
+    Saves a json object to a file.
+    The object is first written to a temporary file that then replaces the file,
+    so the file is never left half written.
+    :param path: The path of the json file.
+    :type path: str
+    :param obj: The json object to save.
+    :type obj: dict | list | str
+    :param mode: If given, the permissions of the file (for example 0600 for secrets),
+        which it has from its creation, so it is never readable by others.
+    :type mode: int|None
+    """
+    temporary_path = path + '.tmp'
+    if mode is None:
+        json_file = open(temporary_path, 'wb')
+    else:
+        json_file = os.fdopen(os.open(temporary_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, mode), 'wb')
+        # The temporary file might have been left with other permissions.
+        os.chmod(temporary_path, mode)
+
+    with json_file:
+        json.dump(obj, json_file)
+
+    replace_file(temporary_path, path)
+
+
+def replace_file(source_path, destination_path):
+    """
+    Moves a file over another file (which doesn't have to exist).
+    :param source_path: The path of the file to move.
+    :type source_path: str
+    :param destination_path: The path of the replaced file.
+    :type destination_path: str
+    """
+    try:
+        os.rename(source_path, destination_path)
+    except OSError:
+        # Renaming over an existing file fails on windows.
+        os.remove(destination_path)
+        os.rename(source_path, destination_path)
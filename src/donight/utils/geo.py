@@ -0,0 +1,132 @@
+import math
+from collections import namedtuple
+
+# The characters of geohashes, ordered by the value they encode (and also alphabetically).
+GEOHASH_ALPHABET = '0123456789bcdefghjkmnpqrstuvwxyz'
+GEOHASH_BITS_PER_CHAR = 5
+# The length of the kilometers in a degree of latitude (and of longitude on the equator).
+KM_PER_DEGREE = 111.195
+
+# An area between two latitudes (south and north) and two longitudes (west and east), in degrees.
+BoundingBox = namedtuple('BoundingBox', ['south', 'west', 'north', 'east'])
+
+
+def encode_geohash(latitude, longitude, precision):
+    """
+    Encodes a point as a geohash: the id of the cell holding the point, in a grid of the given precision.
+    Points in the same cell share the prefix of their geohashes, so a prefix of a geohash is its cell in a coarser grid.
+    :type latitude: float
+    :type longitude: float
+    :param precision: The length of the geohash (every character splits the cells to 32 smaller cells).
+    :type precision: int
+    :rtype: str
+    """
+    latitude_range = [-90.0, 90.0]
+    longitude_range = [-180.0, 180.0]
+    geohash = []
+    bits = 0
+    is_longitude_bit = True
+
+    for bit_index in xrange(precision * GEOHASH_BITS_PER_CHAR):
+        value, value_range = (longitude, longitude_range) if is_longitude_bit else (latitude, latitude_range)
+        middle = (value_range[0] + value_range[1]) / 2
+        if value >= middle:
+            bits = bits * 2 + 1
+            value_range[0] = middle
+        else:
+            bits *= 2
+            value_range[1] = middle
+        is_longitude_bit = not is_longitude_bit
+
+        if bit_index % GEOHASH_BITS_PER_CHAR == GEOHASH_BITS_PER_CHAR - 1:
+            geohash.append(GEOHASH_ALPHABET[bits])
+            bits = 0
+
+    return ''.join(geohash)
+
+
+def get_geohash_ranges(bounding_box, max_precision, max_cells=16):
+    """
+    Covers a bounding box with geohash cells, as fine as possible without using more than max_cells cells,
+    and returns the ranges of the geohashes in the cells.
+    The cells usually cover a larger area than the bounding box, so points in the ranges should still be filtered.
+    :type bounding_box: BoundingBox
+    :param max_precision: The precision of the covered geohashes, cells aren't finer than it.
+    :type max_precision: int
+    :param max_cells: The maximal amount of cells covering the bounding box.
+    :type max_cells: int
+    :return: Sorted ranges (start, end) of the geohashes in the cells, the end is exclusive, and is None if unbounded.
+    :rtype: list(tuple(str, str|None))
+    """
+    precision = max_precision
+    while precision > 1 and _count_covering_cells(bounding_box, precision) > max_cells:
+        precision -= 1
+
+    latitude_cells, longitude_cells = _get_covering_cells_indexes(bounding_box, precision)
+    cell_height, cell_width = _get_cell_size(precision)
+    cells = sorted(set(encode_geohash(-90 + (latitude_cell + 0.5) * cell_height,
+                                      -180 + (longitude_cell + 0.5) * cell_width, precision)
+                       for latitude_cell in latitude_cells for longitude_cell in longitude_cells))
+
+    # Cells that are adjacent in the geohash order are merged to a single range.
+    ranges = []
+    for cell in cells:
+        if ranges and ranges[-1][1] == cell:
+            ranges[-1] = (ranges[-1][0], _get_next_geohash(cell))
+        else:
+            ranges.append((cell, _get_next_geohash(cell)))
+
+    return ranges
+
+
+def get_radius_bounding_box(latitude, longitude, radius):
+    """
+    :param radius: The radius around the point, in kilometers.
+    :type radius: float
+    :return: The bounding box of the circle around the point.
+    :rtype: BoundingBox
+    """
+    latitude_radius = radius / KM_PER_DEGREE
+    longitude_radius = radius / (KM_PER_DEGREE * max(math.cos(math.radians(latitude)), 0.01))
+    return BoundingBox(max(latitude - latitude_radius, -90.0), max(longitude - longitude_radius, -180.0),
+                       min(latitude + latitude_radius, 90.0), min(longitude + longitude_radius, 180.0))
+
+
+def _get_cell_size(precision):
+    """
+    :return: The height (in latitude degrees) and width (in longitude degrees) of cells of the given precision.
+    :rtype: tuple(float, float)
+    """
+    bits = precision * GEOHASH_BITS_PER_CHAR
+    # The bits alternate between longitude and latitude, starting with longitude.
+    return 180.0 / 2 ** (bits / 2), 360.0 / 2 ** (bits - bits / 2)
+
+
+def _get_covering_cells_indexes(bounding_box, precision):
+    """
+    :return: The indexes of the rows (by latitude) and columns (by longitude) of the cells covering the bounding box.
+    :rtype: tuple(xrange, xrange)
+    """
+    cell_height, cell_width = _get_cell_size(precision)
+    latitude_cells_amount, longitude_cells_amount = int(round(180.0 / cell_height)), int(round(360.0 / cell_width))
+    return (xrange(int((bounding_box.south + 90) / cell_height),
+                   min(int((bounding_box.north + 90) / cell_height), latitude_cells_amount - 1) + 1),
+            xrange(int((bounding_box.west + 180) / cell_width),
+                   min(int((bounding_box.east + 180) / cell_width), longitude_cells_amount - 1) + 1))
+
+
+def _count_covering_cells(bounding_box, precision):
+    latitude_cells, longitude_cells = _get_covering_cells_indexes(bounding_box, precision)
+    return len(latitude_cells) * len(longitude_cells)
+
+
+def _get_next_geohash(geohash):
+    """
+    :return: The first geohash after all the geohashes starting with the given geohash, None if there is none.
+    :rtype: str|None
+    """
+    geohash = geohash.rstrip(GEOHASH_ALPHABET[-1])
+    if not geohash:
+        return None
+
+    return geohash[:-1] + GEOHASH_ALPHABET[GEOHASH_ALPHABET.index(geohash[-1]) + 1]
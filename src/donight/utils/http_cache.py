@@ -0,0 +1,239 @@
+import hashlib
+import json
+import os
+import time
+from collections import Counter
+from threading import RLock
+
+import requests
+
+from donight.utils import load_json_file, save_json_file
+
+INDEX_FILE_NAME = 'index.json'
+CONTENTS_DIR_NAME = 'contents'
+
+
+class CachedResponse(object):
+    """
+    The content of a response fetched through an HttpCache.
+    """
+    def __init__(self, content, is_modified):
+        """
+        :param content: The body of the response.
+        :type content: str
+        :param is_modified: Whether the content changed since it was last fetched.
+        :type is_modified: bool
+        """
+        self.content = content
+        self.is_modified = is_modified
+
+
+class HttpCache(object):
+    """
+    An on-disk cache of http responses, used to know whether a source changed since it was last fetched.
+
+    For every request, the cache stores the validators of the response (ETag and Last-Modified),
+    which are sent on the next request, so an unchanged source can answer with a short "304 Not Modified".
+    Sources that don't support validators (for example POST apis) are still fetched,
+    and their content is compared to the cached content.
+    The contents are stored by their hash (so equal contents are stored once).
+
+    Every entry expires after a while, so even unchanged sources are reported as modified once in a while.
+    When the cache gets too big, the least recently used entries are evicted.
+
+    Responses can be fetched in a stage (usually named by the scraped source), in which case they are only stored
+    when the stage is committed (see commit), after the source's events are uploaded.
+    Otherwise, a source whose events failed to be parsed or uploaded would be reported as unchanged by the next runs,
+    and its events would stay missing until its cached responses expire.
+    """
+    def __init__(self, cache_dir, ttl, max_size, session=requests):
+        """
+        :param cache_dir: The directory in which the cache is stored.
+        :type cache_dir: str
+        :param ttl: The time (in seconds) after which a cached response expires.
+        :type ttl: int
+        :param max_size: The maximal size (in bytes) of the cached contents.
+        :type max_size: int
+        :param session: Used to send the requests, anything with the api of requests.request.
+        :type session: requests.Session
+        """
+        self.__contents_dir = os.path.join(cache_dir, CONTENTS_DIR_NAME)
+        self.__index_path = os.path.join(cache_dir, INDEX_FILE_NAME)
+        self.__ttl = ttl
+        self.__max_size = max_size
+        self.session = session
+        self.__lock = RLock()
+
+        if not os.path.isdir(self.__contents_dir):
+            os.makedirs(self.__contents_dir)
+
+        # A dict from a request key to its cache entry.
+        self.__entries = load_json_file(self.__index_path, {})
+        # A dict from a stage to the entries fetched in it (a dict from a request key to its entry and content).
+        self.__staged_entries = {}
+
+    def fetch(self, method, url, cache_key=None, stage=None, **kwargs):
+        """
+        Sends the request, using the validators of the cached response,
+        and returns its content, and whether it changed since the last time it was fetched.
+        :param method: The http method of the request.
+        :type method: str
+        :param url: The url of the request.
+        :type url: str
+        :param cache_key: Identifies requests whose responses should be compared to each other,
+            defaults to the request itself. Useful when the request changes every time (for example it holds the time).
+        :type cache_key: str|None
+        :param stage: If given, the response is only stored when the stage is committed (see commit),
+            until then it is compared to the response stored before.
+        :type stage: str|None
+        :param kwargs: Any other parameter for the request (see requests.request).
+        :rtype: CachedResponse
+        """
+        key = cache_key or self.get_request_key(method, url, kwargs.get('params'), kwargs.get('data'))
+        entry = self.__get_entry(key)
+
+        headers = dict(kwargs.pop('headers', None) or {})
+        if entry is not None:
+            if entry.get('etag'):
+                headers['If-None-Match'] = entry['etag']
+            if entry.get('last_modified'):
+                headers['If-Modified-Since'] = entry['last_modified']
+
+        response = self.session.request(method, url, headers=headers, **kwargs)
+
+        if response.status_code == requests.codes.not_modified and entry is not None:
+            with self.__lock:
+                entry['used_at'] = time.time()
+                self.__save_index()
+            return CachedResponse(self.__read_content(entry['content_hash']), is_modified=False)
+
+        content = response.content
+        if response.status_code != requests.codes.ok:
+            return CachedResponse(content, is_modified=True)
+
+        content_hash = hashlib.sha1(content).hexdigest()
+        is_modified = entry is None or entry['content_hash'] != content_hash
+
+        new_entry = {
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+            'content_hash': content_hash,
+            'size': len(content),
+            # An unchanged content keeps its original time, so it expires even if it never changes.
+            'stored_at': time.time() if is_modified else entry['stored_at'],
+            'used_at': time.time(),
+        }
+
+        with self.__lock:
+            if stage is not None:
+                self.__staged_entries.setdefault(stage, {})[key] = (new_entry, content)
+            else:
+                self.__store({key: (new_entry, content)})
+
+        return CachedResponse(content, is_modified)
+
+    def commit(self, stage):
+        """
+        Stores the responses fetched in the stage, so the next fetches are compared to them.
+        :param stage: The stage given to fetch.
+        :type stage: str
+        """
+        with self.__lock:
+            staged_entries = self.__staged_entries.pop(stage, None)
+            if staged_entries:
+                self.__store(staged_entries)
+
+    def discard(self, stage):
+        """
+        Drops the responses fetched in the stage, so the next fetches are compared to the responses stored before it.
+        :param stage: The stage given to fetch.
+        :type stage: str
+        """
+        with self.__lock:
+            self.__staged_entries.pop(stage, None)
+
+    @staticmethod
+    def get_request_key(method, url, params=None, data=None):
+        """
+        :return: A key identifying the request.
+        :rtype: str
+        """
+        request = json.dumps([method.upper(), url, params, data], sort_keys=True)
+        return hashlib.sha1(request).hexdigest()
+
+    def __get_entry(self, key):
+        """
+        :return: The cache entry of the request key, None if it doesn't exist or expired.
+        :rtype: dict|None
+        """
+        with self.__lock:
+            entry = self.__entries.get(key)
+            if entry is None:
+                return None
+
+            if time.time() - entry['stored_at'] > self.__ttl or \
+                    not os.path.exists(self.__get_content_path(entry['content_hash'])):
+                del self.__entries[key]
+                return None
+
+            return entry
+
+    def __store(self, entries):
+        """
+        Stores the entries and their contents, and saves the index.
+        :param entries: A dict from a request key to its entry and content.
+        :type entries: dict(str, (dict, str))
+        """
+        for key, (entry, content) in entries.iteritems():
+            self.__write_content(entry['content_hash'], content)
+            self.__entries[key] = entry
+
+        self.__evict()
+        self.__save_index()
+
+    def __evict(self):
+        """
+        Removes the least recently used entries until the cache isn't bigger than its maximal size,
+        and removes the contents no entry refers to.
+        """
+        entries_by_usage = sorted(self.__entries.iteritems(), key=lambda (key, entry): entry['used_at'])
+        contents_sizes = self.__get_contents_sizes()
+        total_size = sum(contents_sizes.itervalues())
+        # Entries with the same content share it, so its size is only freed with the last of them.
+        contents_entries_counts = Counter(entry['content_hash'] for entry in self.__entries.itervalues())
+
+        for key, entry in entries_by_usage:
+            if total_size <= self.__max_size:
+                break
+
+            del self.__entries[key]
+            contents_entries_counts[entry['content_hash']] -= 1
+            if not contents_entries_counts[entry['content_hash']]:
+                total_size -= contents_sizes.pop(entry['content_hash'])
+
+        for content_file_name in os.listdir(self.__contents_dir):
+            if content_file_name not in contents_sizes:
+                os.remove(os.path.join(self.__contents_dir, content_file_name))
+
+    def __get_contents_sizes(self):
+        """
+        :return: A dict from the hash of every cached content to its size.
+        :rtype: dict(str, int)
+        """
+        return {entry['content_hash']: entry['size'] for entry in self.__entries.itervalues()}
+
+    def __get_content_path(self, content_hash):
+        return os.path.join(self.__contents_dir, content_hash)
+
+    def __read_content(self, content_hash):
+        with open(self.__get_content_path(content_hash), 'rb') as content_file:
+            return content_file.read()
+
+    def __write_content(self, content_hash, content):
+        content_path = self.__get_content_path(content_hash)
+        if not os.path.exists(content_path):
+            with open(content_path, 'wb') as content_file:
+                content_file.write(content)
+
+    def __save_index(self):
+        save_json_file(self.__index_path, self.__entries)
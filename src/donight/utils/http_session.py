@@ -0,0 +1,68 @@
+from collections import defaultdict
+from threading import Lock
+from urlparse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.packages.urllib3.util.retry import Retry
+
+# Server errors that usually pass after a while, so the request is retried.
+RETRIED_STATUS_CODES = [500, 502, 503, 504]
+# The scraped POST apis only read data, so they are safe to retry too.
+RETRIED_METHODS = frozenset(['HEAD', 'GET', 'POST', 'OPTIONS'])
+
+
+class HttpSession(requests.Session):
+    """
+    A requests session that keeps a pool of keep-alive connections to every host,
+    gives every request a default timeout, retries failed requests with an exponential backoff,
+    and counts the requests sent and bytes received per host.
+    It can be shared by a few threads.
+    """
+    def __init__(self, pool_size, connect_timeout, read_timeout, max_retries, backoff_factor):
+        """
+        :param pool_size: The maximal amount of connections kept open to every host.
+        :type pool_size: int
+        :param connect_timeout: The default time (in seconds) to wait for a connection to a host.
+        :type connect_timeout: float
+        :param read_timeout: The default time (in seconds) to wait for the host to send data.
+        :type read_timeout: float
+        :param max_retries: The maximal amount of times a failed request is retried.
+        :type max_retries: int
+        :param backoff_factor: The base of the time (in seconds) to wait before retrying,
+            the time is doubled after every retry.
+        :type backoff_factor: float
+        """
+        super(HttpSession, self).__init__()
+        self.timeout = (connect_timeout, read_timeout)
+
+        retry = Retry(total=max_retries, backoff_factor=backoff_factor, status_forcelist=RETRIED_STATUS_CODES,
+                      method_whitelist=RETRIED_METHODS, raise_on_status=False)
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+        self.mount('http://', adapter)
+        self.mount('https://', adapter)
+
+        self.__stats_lock = Lock()
+        self.__stats = defaultdict(lambda: {'requests': 0, 'bytes': 0})
+        self.hooks['response'].append(self.__count_response)
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault('timeout', self.timeout)
+        return super(HttpSession, self).request(method, url, **kwargs)
+
+    def __count_response(self, response, *args, **kwargs):
+        host = urlparse(response.url).netloc
+        with self.__stats_lock:
+            self.__stats[host]['requests'] += 1
+            self.__stats[host]['bytes'] += len(response.content)
+
+    def pop_stats(self):
+        """
+        Returns the amount of requests sent and bytes received per host, since the stats were last popped.
+        :return: A dict from a host to its stats (a dict with the 'requests' and 'bytes' keys).
+        :rtype: dict(str, dict(str, int))
+        """
+        with self.__stats_lock:
+            stats = dict(self.__stats)
+            self.__stats.clear()
+        return stats
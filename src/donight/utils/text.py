@@ -0,0 +1,114 @@
+import re
+
+# Hebrew cantillation marks and points (niqqud), which don't change the meaning of the text.
+HEBREW_MARKS_REGEX = re.compile(u'[\u0591-\u05bd\u05bf\u05c1\u05c2\u05c4\u05c5\u05c7]')
+# Maps the Hebrew final letters (sofit) to their regular forms.
+HEBREW_FINAL_LETTERS = {0x05da: u'\u05db', 0x05dd: u'\u05de', 0x05df: u'\u05e0', 0x05e3: u'\u05e4', 0x05e5: u'\u05e6'}
+NON_WORD_REGEX = re.compile(r'[\W_]+', re.UNICODE)
+# The Hebrew letters that are written as prefixes of words (and, the, in, to, from, that, as).
+HEBREW_PREFIX_LETTERS = u'\u05d5\u05d4\u05d1\u05dc\u05de\u05e9\u05db'
+
+
+def normalize_text(text):
+    """
+    Normalizes the text, so texts that differ only in writing style become equal.
+    The text is lower cased, Hebrew niqqud is removed, Hebrew final letters are replaced with their regular form,
+    and punctuation is replaced with single spaces.
+    :param text: The text to normalize.
+    :type text: basestring|None
+    :return: The normalized text (an empty string for None).
+    :rtype: unicode
+    """
+    if not text:
+        return u''
+
+    if isinstance(text, str):
+        text = text.decode('utf8')
+
+    text = HEBREW_MARKS_REGEX.sub(u'', text.lower()).translate(HEBREW_FINAL_LETTERS)
+    return NON_WORD_REGEX.sub(u' ', text).strip()
+
+
+def get_words(text, min_length=1):
+    """
+    :param text: The text to split to words.
+    :type text: basestring|None
+    :param min_length: Shorter words are dropped.
+    :type min_length: int
+    :return: The words of the normalized text.
+    :rtype: list(unicode)
+    """
+    return [word for word in normalize_text(text).split() if len(word) >= min_length]
+
+
+def get_search_words(text, max_prefixes=2, min_stem_length=2):
+    """
+    Returns the words under which the text should be found by a search.
+    Hebrew words may begin with prefix letters (like "in Jerusalem", which is written as a single word),
+    so besides the words of the text, the words without their possible prefixes are returned too.
+    :param text: The text to split to search words.
+    :type text: basestring|None
+    :param max_prefixes: The maximal amount of prefix letters removed from a word.
+    :type max_prefixes: int
+    :param min_stem_length: Prefix letters aren't removed if the rest of the word is shorter than this.
+    :type min_stem_length: int
+    :return: The words of the normalized text, followed by their variants without prefixes.
+    :rtype: list(unicode)
+    """
+    words = get_words(text)
+    search_words = list(words)
+
+    for word in words:
+        for prefixes_length in xrange(1, max_prefixes + 1):
+            if len(word) - prefixes_length < min_stem_length or word[prefixes_length - 1] not in HEBREW_PREFIX_LETTERS:
+                break
+            search_words.append(word[prefixes_length:])
+
+    return search_words
+
+
+def get_ngrams(normalized_text, n=3):
+    """
+    :param normalized_text: A normalized text (see normalize_text).
+    :type normalized_text: unicode
+    :param n: The length of the n-grams.
+    :type n: int
+    :return: The character n-grams of the text, padded so even short texts have n-grams.
+    :rtype: set(unicode)
+    """
+    padded_text = u' ' + normalized_text + u' '
+    return set(padded_text[index:index + n] for index in xrange(max(len(padded_text) - n + 1, 1)))
+
+
+def bounded_edit_distance(first, second, max_distance):
+    """
+    Calculates the Levenshtein distance between the two strings,
+    but stops as soon as it is known to be larger than max_distance,
+    so comparing very different strings is cheap.
+    :type first: unicode
+    :type second: unicode
+    :param max_distance: The maximal distance that is of interest.
+    :type max_distance: int
+    :return: The edit distance, or None if it is larger than max_distance.
+    :rtype: int|None
+    """
+    if abs(len(first) - len(second)) > max_distance:
+        return None
+
+    if len(first) > len(second):
+        first, second = second, first
+
+    previous_row = range(len(first) + 1)
+    for row_index, second_char in enumerate(second, 1):
+        current_row = [row_index]
+        for column_index, first_char in enumerate(first, 1):
+            current_row.append(min(previous_row[column_index] + 1,
+                                   current_row[column_index - 1] + 1,
+                                   previous_row[column_index - 1] + (first_char != second_char)))
+
+        if min(current_row) > max_distance:
+            return None
+        previous_row = current_row
+
+    distance = previous_row[-1]
+    return distance if distance <= max_distance else None
@@ -1,4 +1,6 @@
 from contextlib import contextmanager
+from logging import getLogger
+from threading import BoundedSemaphore, Lock
 
 import selenium.webdriver
 from selenium.common.exceptions import NoSuchElementException
@@ -6,8 +8,6 @@ from selenium.webdriver.common.by import By as BaseBy
 from selenium.webdriver.common.keys import Keys
 from selenium.webdriver.firefox.firefox_binary import FirefoxBinary
 
-from donight.config import facebook_scraping_config
-
 
 class By(BaseBy):
     pass
@@ -88,3 +88,126 @@ class EnhancedWebDriver(object):
             setattr(self.__driver, key, value)
         else:
             object.__setattr__(self, key, value)
+
+
+class WebDriverPool(object):
+    """
+    A bounded pool of web drivers (browsers), from which a driver is checked out for every scraping,
+    so a few scrapers can use browsers at the same time.
+    Drivers are created on first use, are checked to still respond before they are checked out,
+    and are replaced after being used a few times (browsers tend to get slower the longer they run).
+    """
+    def __init__(self, create_driver, size, max_uses):
+        """
+        :param create_driver: A function (receiving no arguments) that creates a new web driver.
+        :type create_driver: function
+        :param size: The maximal amount of drivers that exist at the same time.
+        :type size: int
+        :param max_uses: The amount of check outs after which a driver is quit and replaced by a new one.
+        :type max_uses: int
+        """
+        self.__create_driver = create_driver
+        self.__max_uses = max_uses
+        self.size = size
+        self.__available_drivers = BoundedSemaphore(size)
+        self.__lock = Lock()
+        self.__idle_drivers = []  # A list of (driver, uses) of the drivers that aren't checked out.
+        self.__checked_out_drivers_uses = {}  # A dict from every checked out driver to its amount of uses.
+        self.logger = getLogger(__name__)
+
+    @contextmanager
+    def checkout(self):
+        """
+        Checks out a driver for the duration of the context (see acquire and release).
+        """
+        driver = self.acquire()
+        try:
+            yield driver
+        finally:
+            self.release(driver)
+
+    def acquire(self):
+        """
+        Checks out a driver, waiting for one if all of them are checked out.
+        Every acquired driver must be released.
+        :rtype: EnhancedWebDriver
+        """
+        self.__available_drivers.acquire()
+
+        try:
+            driver, uses = self.__get_responsive_driver()
+        except Exception:
+            self.__available_drivers.release()
+            raise
+
+        with self.__lock:
+            self.__checked_out_drivers_uses[driver] = uses + 1
+
+        return driver
+
+    def release(self, driver):
+        """
+        Returns a checked out driver to the pool.
+        A driver that stopped responding, or was used too many times, is quit instead.
+        :type driver: EnhancedWebDriver
+        """
+        try:
+            with self.__lock:
+                uses = self.__checked_out_drivers_uses.pop(driver)
+
+            if not self.__is_responsive(driver):
+                self.logger.warn("A web driver stopped responding, replacing it.")
+                self.__quit(driver)
+            elif uses >= self.__max_uses:
+                self.__quit(driver)
+            else:
+                with self.__lock:
+                    self.__idle_drivers.append((driver, uses))
+
+        finally:
+            self.__available_drivers.release()
+
+    def close(self):
+        """
+        Quits all the drivers that aren't checked out.
+        """
+        with self.__lock:
+            idle_drivers, self.__idle_drivers = self.__idle_drivers, []
+
+        for driver, _ in idle_drivers:
+            self.__quit(driver)
+
+    def __get_responsive_driver(self):
+        """
+        :return: An idle driver that still responds (or a new driver if there is none), and its amount of uses.
+        :rtype: tuple(EnhancedWebDriver, int)
+        """
+        while True:
+            with self.__lock:
+                if not self.__idle_drivers:
+                    break
+                driver, uses = self.__idle_drivers.pop()
+
+            if self.__is_responsive(driver):
+                return driver, uses
+
+            self.logger.warn("An idle web driver stopped responding, replacing it.")
+            self.__quit(driver)
+
+        return self.__create_driver(), 0
+
+    # noinspection PyMethodMayBeStatic
+    def __is_responsive(self, driver):
+        try:
+            return driver.execute_script('return true;')
+        except Exception:
+            return False
+
+    def __quit(self, driver):
+        try:
+            driver.quit()
+        except Exception:
+            self.logger.exception("Failed quitting a web driver.")
+
+    def __del__(self):
+        self.close()
@@ -1,17 +1,31 @@
 import json
 import os
+import zlib
+from logging import getLogger
 
-import datetime
-from flask import Flask, Response
+import dateutil.parser
+from flask import Flask, Response, request
 from flask.helpers import send_from_directory
-from sqlalchemy import func
+from sqlalchemy.exc import DBAPIError
 
-from donight.config.consts import ROOT_DIR, DEBUG
-from donight.events import Session, Event
+from donight.config.consts import (ROOT_DIR, DEBUG, API_EVENTS_PAGE_SIZE, API_EVENTS_MAX_PAGE_SIZE, EVENTS_SNAPSHOT_PATH,
+                                   API_EVENTS_NEAR_RADIUS, API_EVENTS_NEAR_MAX_RADIUS)
+from donight.db import ReadSession
+from donight.events_query import (EVENT_FIELDS, query_events, query_events_near, search_events, get_today_start,
+                                  decode_cursor)
+from donight.search import is_search_supported
+from donight.snapshot import EventsSnapshot
+from donight.utils import iterate_json_array, prefetch_first
+from donight.utils.geo import BoundingBox
+from donight.utils.text import get_words
 
 STATIC_FOLDER = os.path.join(ROOT_DIR, 'web', 'client', 'static')
+# The size of the chunks in which a snapshot is sent.
+SNAPSHOT_CHUNK_SIZE = 64 * 1024
 
 app = Flask(__name__, static_folder=STATIC_FOLDER)
+logger = getLogger(__name__)
+events_snapshot = EventsSnapshot(EVENTS_SNAPSHOT_PATH) if EVENTS_SNAPSHOT_PATH else None
 
 
 class JsonResponse(Response):
@@ -27,24 +41,283 @@ class JsonResponse(Response):
         super(JsonResponse, self).__init__(response, *args, **kwargs)
 
 
+@app.after_request
+def remove_session_on_close(response):
+    """
+    Removes the request's session once the response is sent.
+    Responses are streamed after the request ends, so the session can't be removed when the request ends.
+    """
+    response.call_on_close(ReadSession.remove)
+    return response
+
+
+@app.teardown_request
+def remove_session_on_error(exception):
+    # Responses of failed requests aren't streamed (and remove_session_on_close isn't called).
+    if exception is not None:
+        ReadSession.remove()
+
+
 @app.route('/', defaults={'path': ''})
 @app.route('/<path:path>')
 def index(path):
     return send_from_directory(os.path.join(STATIC_FOLDER, 'build'), 'index.html')
 
 
+@app.route('/api/events')
+def get_events():
+    """
+    Returns a flask response, containing a page of the upcoming events in the db, ordered by their start time.
+    The query string may contain:
+        from, to - Only events starting in this time range are returned (defaults to all the upcoming events).
+        location, owner - Only events in one of the given locations, of one of the given owners, are returned.
+        bbox - Only events in this area are returned, given as comma separated south,west,north,east coordinates.
+        fields - A comma separated list of the fields returned for every event (defaults to all the fields).
+        limit - The maximal amount of events in the page.
+        after - The cursor of the page, taken from the 'next' of the previous page.
+    The response is a json object holding the 'events' of the page,
+    and the cursor of the 'next' page (null in the last page).
+    """
+    try:
+        start_from = parse_time_arg('from') or get_today_start()
+        start_to = parse_time_arg('to')
+        fields = parse_fields(request.args.get('fields'))
+        limit = parse_limit(request.args.get('limit'))
+        bounding_box = parse_bounding_box(request.args.get('bbox'))
+        after = decode_cursor(request.args['after']) if request.args.get('after') else None
+    except ValueError as e:
+        return JsonResponse({'error': unicode(e)}, status=400)
+
+    session = ReadSession()
+    events_page = query_events(session, fields, start_from, start_to, request.args.getlist('location'),
+                               request.args.getlist('owner'), bounding_box, after, limit)
+    return Response(iterate_events_page_json(events_page), mimetype=JsonResponse.default_mimetype)
+
+
 @app.route('/api/events/all')
 def get_all_events():
     """
-    Returns a flask response, containing all the events in the db.
+    Returns a flask response, containing all the upcoming events in the db (see get_events).
+    The response is the snapshot published by the indexer, if there is one (see donight.snapshot).
+    """
+    snapshot = events_snapshot.get() if events_snapshot is not None else None
+    if snapshot is not None:
+        etag, gzipped_content = snapshot
+        return get_snapshot_response(etag, gzipped_content)
+
+    session = ReadSession()
+    events = query_events(session, EVENT_FIELDS, get_today_start())
+    return Response(iterate_json_array(events), mimetype=JsonResponse.default_mimetype)
+
+
+@app.route('/api/events/near')
+def get_events_near():
+    """
+    Returns a flask response, containing the upcoming events around a point, ordered from the nearest.
+    The query string must contain:
+        lat, lon - The coordinates of the point.
+    And may contain:
+        radius - Only events up to this distance (in kilometers) from the point are returned.
+        from, to, fields, limit - See get_events.
+    The response is a json array of the events.
+    """
+    try:
+        latitude = parse_float_arg('lat', -90, 90)
+        longitude = parse_float_arg('lon', -180, 180)
+        radius = parse_float_arg('radius', 0, API_EVENTS_NEAR_MAX_RADIUS, API_EVENTS_NEAR_RADIUS)
+        start_from = parse_time_arg('from') or get_today_start()
+        start_to = parse_time_arg('to')
+        fields = parse_fields(request.args.get('fields'))
+        limit = parse_limit(request.args.get('limit'))
+    except ValueError as e:
+        return JsonResponse({'error': unicode(e)}, status=400)
+
+    session = ReadSession()
+    events = query_events_near(session, fields, latitude, longitude, radius, start_from, start_to, limit)
+    return Response(iterate_json_array(events), mimetype=JsonResponse.default_mimetype)
+
+
+@app.route('/api/events/search')
+def get_searched_events():
+    """
+    Returns a flask response, containing the upcoming events that match a search, ordered from the most relevant.
+    The query string must contain:
+        q - The searched text. Every word in it must be found in the event's title, location, owner or description
+            (as a whole word, or as the start of a word).
+    And may contain (see get_events):
+        from, to, fields, limit
+    The response is a json array of the events.
+    If the db doesn't support full-text search the response is a 501 error,
+    and if its search index can't be queried (for example it wasn't migrated yet) the response is a 503 error.
+    """
+    try:
+        search_query = parse_search_query(request.args.get('q'))
+        start_from = parse_time_arg('from') or get_today_start()
+        start_to = parse_time_arg('to')
+        fields = parse_fields(request.args.get('fields'))
+        limit = parse_limit(request.args.get('limit'))
+    except ValueError as e:
+        return JsonResponse({'error': unicode(e)}, status=400)
+
+    session = ReadSession()
+    if not is_search_supported(session.bind.dialect.name):
+        return JsonResponse({'error': u'Search is not supported by the db'}, status=501)
+
+    try:
+        # The search is executed before the response starts, so its errors can still be answered with an error.
+        events = prefetch_first(search_events(session, fields, search_query, start_from, start_to, limit))
+    except DBAPIError:
+        logger.exception("Failed querying the search index:")
+        return JsonResponse({'error': u'Search is unavailable'}, status=503)
+
+    return Response(iterate_json_array(events), mimetype=JsonResponse.default_mimetype)
+
+
+def iterate_events_page_json(events_page):
+    """
+    Serializes a page of events lazily (see iterate_json_array), into a json object holding the 'events' of the page,
+    and the cursor of the 'next' page.
+    :type events_page: donight.events_query.EventsPage
+    :return: A generator of the utf8 encoded chunks of the serialized page.
+    :rtype: generator(str)
+    """
+    yield '{"events": '
+
+    for chunk in iterate_json_array(events_page):
+        yield chunk
+
+    # The cursor of the next page is only known after all the events of the page were iterated.
+    yield ', "next": {}}}'.format(json.dumps(events_page.next_cursor))
+
+
+def get_snapshot_response(etag, gzipped_content):
+    """
+    Returns a flask response of a snapshot, that is only sent if the client doesn't already have it (by its etag).
+    The snapshot is sent gzipped, unless the client doesn't accept gzip.
+    """
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    elif 'gzip' in request.accept_encodings:
+        response = Response(iterate_buffer_chunks(gzipped_content), mimetype=JsonResponse.default_mimetype)
+        response.content_length = len(gzipped_content)
+        response.content_encoding = 'gzip'
+    else:
+        response = Response(zlib.decompress(gzipped_content[:], 16 + zlib.MAX_WBITS),
+                            mimetype=JsonResponse.default_mimetype)
+
+    response.set_etag(etag)
+    response.vary.add('Accept-Encoding')
+    return response
+
+
+def iterate_buffer_chunks(buffer):
+    for chunk_start in xrange(0, len(buffer), SNAPSHOT_CHUNK_SIZE):
+        yield buffer[chunk_start:chunk_start + SNAPSHOT_CHUNK_SIZE]
+
+
+def parse_time_arg(arg_name):
+    """
+    :return: The time in the given query string argument, None if it isn't given.
+    :rtype: datetime.datetime|None
+    :raises ValueError: If the argument isn't a valid time.
+    """
+    value = request.args.get(arg_name)
+    if not value:
+        return None
+
+    try:
+        return dateutil.parser.parse(value)
+    except (ValueError, OverflowError):
+        raise ValueError(u'Invalid {}: {}'.format(arg_name, value))
+
+
+def parse_float_arg(arg_name, min_value, max_value, default=None):
     """
-    session = Session()
-    all_events = (session.query(Event)
-        .filter(func.date(Event.start_time) >= datetime.datetime.now().date())
-        .order_by(Event.start_time).all())
-    return JsonResponse([event.to_dict() for event in all_events])
+    :return: The number in the given query string argument, or the default if it isn't given.
+    :rtype: float
+    :raises ValueError: If the argument isn't a number in the range, or is missing and there is no default.
+    """
+    value = request.args.get(arg_name)
+    if not value:
+        if default is None:
+            raise ValueError(u'Missing {}'.format(arg_name))
+        return default
+
+    try:
+        number = float(value)
+    except ValueError:
+        number = None
+
+    if number is None or not min_value <= number <= max_value:
+        raise ValueError(u'Invalid {}: {} (should be between {} and {})'.format(arg_name, value, min_value, max_value))
+
+    return number
+
+
+def parse_bounding_box(value):
+    """
+    :param value: Comma separated south,west,north,east coordinates, or None for no bounding box.
+    :rtype: BoundingBox|None
+    :raises ValueError: If the bounding box is invalid.
+    """
+    if not value:
+        return None
+
+    try:
+        bounding_box = BoundingBox(*map(float, value.split(',')))
+    except (TypeError, ValueError):
+        bounding_box = None
+
+    if bounding_box is None or not (-90 <= bounding_box.south <= bounding_box.north <= 90 and
+                                    -180 <= bounding_box.west <= bounding_box.east <= 180):
+        raise ValueError(u'Invalid bbox: {} (should be south,west,north,east)'.format(value))
+
+    return bounding_box
+
+
+def parse_search_query(value):
+    """
+    :param value: The searched text.
+    :type value: basestring|None
+    :rtype: basestring
+    :raises ValueError: If the searched text has no words.
+    """
+    if not get_words(value):
+        raise ValueError(u'Invalid search query: {}'.format(value or u''))
+
+    return value
+
+
+def parse_fields(value):
+    """
+    :param value: A comma separated list of event fields, or None for all the fields.
+    :rtype: list(str)
+    :raises ValueError: If one of the fields doesn't exist.
+    """
+    if not value:
+        return EVENT_FIELDS
+
+    fields = value.split(',')
+    unknown_fields = [field for field in fields if field not in EVENT_FIELDS]
+    if unknown_fields:
+        raise ValueError(u'Unknown fields: {}'.format(', '.join(unknown_fields)))
+
+    return fields
+
+
+def parse_limit(value):
+    """
+    :rtype: int
+    :raises ValueError: If the limit isn't a positive number.
+    """
+    if not value:
+        return API_EVENTS_PAGE_SIZE
+
+    if not value.isdigit() or int(value) <= 0:
+        raise ValueError(u'Invalid limit: {}'.format(value))
+
+    return min(int(value), API_EVENTS_MAX_PAGE_SIZE)
 
 
 # if __name__ == '__main__':
 #     app.run('0.0.0.0', debug=DEBUG)
-
@@ -4,7 +4,7 @@ setup(
     name='donight',
     version='1.0.0',
     description='Finds events, and notifies users about them.',
-    packages=find_packages(),
+    packages=find_packages(exclude=['tests', 'tests.*']),
     install_requires=['sqlalchemy',
                       'requests',
                       'beautifulsoup4',
@@ -13,5 +13,12 @@ setup(
                       'python-dateutil',
                       'facebook-sdk',
                       'selenium==2.53.2',
-                      'flask'])
+                      'flask'],
+    # The scraped sources (see donight.event_finder.scrapers.registry).
+    entry_points={'donight.scrapers': [
+        'levontin7 = donight.event_finder.scrapers.levontin7:Levontin7Scraper',
+        'ozen_bar = donight.event_finder.scrapers.ozen_bar:OzenBarScraper',
+        'shows_around = donight.event_finder.scrapers.shows_around:ShowsAroundScraper',
+        'facebook = donight.event_finder.scrapers.facebook_events:get_facebook_scrapers',
+    ]})
 
@@ -0,0 +1,19 @@
+"""
+The tests of donight, run from the src directory with:
+python -m unittest discover -s tests -t .
+"""
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from donight.events import Base
+
+
+def create_test_session():
+    """
+    Creates a session of a new in-memory db with the full schema,
+    so tests don't touch the configured db (and don't bootstrap it, see donight.db).
+    :rtype: sqlalchemy.orm.Session
+    """
+    engine = create_engine('sqlite://')
+    Base.metadata.create_all(engine)
+    return sessionmaker(bind=engine)()
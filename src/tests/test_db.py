@@ -0,0 +1,33 @@
+import unittest
+
+from sqlalchemy import create_engine
+
+from donight.db import LazyEngine
+
+
+class LazyEngineTest(unittest.TestCase):
+    def test_engine_is_created_on_first_use(self):
+        created_engines = []
+
+        def get_engine():
+            if not created_engines:
+                created_engines.append(create_engine('sqlite://'))
+            return created_engines[0]
+
+        engine = LazyEngine(get_engine)
+        self.assertEqual(created_engines, [])
+
+        self.assertEqual(engine.execute('SELECT 1').scalar(), 1)
+        self.assertEqual(engine.dialect.name, 'sqlite')
+        self.assertEqual(len(created_engines), 1)
+
+    def test_events_module_exposes_engine(self):
+        from donight import db
+        from donight.events import engine
+
+        self.assertIs(engine, db.engine)
+        self.assertIsInstance(engine, LazyEngine)
+
+
+if __name__ == '__main__':
+    unittest.main()
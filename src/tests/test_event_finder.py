@@ -0,0 +1,53 @@
+import logging
+import unittest
+
+from donight.event_finder import EventFinder
+from donight.event_finder.scraping_halt_condition import MaxEventsHaltCondition
+from donight.event_finder.scrapers.facebook_events import FacebookEventsScraper
+from donight.utils.web_drivers import WebDriverPool
+from tests import create_test_session
+
+
+class StubScraper(object):
+    def __init__(self, shared_resource=None):
+        self.shared_resource = shared_resource
+
+    def get_shared_resource(self):
+        return self.shared_resource
+
+
+class ScrapeAllTest(unittest.TestCase):
+    def test_no_scrapers(self):
+        logger = logging.getLogger(__name__)
+        logger.addHandler(logging.NullHandler())
+
+        for scraping_workers in [1, 4]:
+            event_finder = EventFinder(scrapers=[None], session=create_test_session(), logger=logger,
+                                       scraping_workers=scraping_workers, scraping_task_workers=4)
+            # The selected sources might resolve to no scrapers (see get_all_scrapers).
+            event_finder.scrapers = []
+            self.assertEqual(event_finder.scrape_all(), [])
+
+
+class GroupBySharedResourceTest(unittest.TestCase):
+    def test_scrapers_sharing_a_resource_are_grouped(self):
+        driver = object()
+        scrapers = [StubScraper(driver), StubScraper(), StubScraper(driver), StubScraper()]
+
+        self.assertEqual(EventFinder.group_by_shared_resource(scrapers),
+                         [[scrapers[0], scrapers[2]], [scrapers[1]], [scrapers[3]]])
+
+    def test_scrapers_sharing_a_pool_are_split_by_its_size(self):
+        pool = WebDriverPool(create_driver=None, size=2, max_uses=10)
+        facebook_scrapers = [FacebookEventsScraper(page_url=None, email=None, password=None,
+                                                   halt_condition=MaxEventsHaltCondition(10), driver_pool=pool)
+                             for _ in xrange(5)]
+
+        other_scraper = StubScraper()
+
+        self.assertEqual(EventFinder.group_by_shared_resource(facebook_scrapers + [other_scraper]),
+                         [facebook_scrapers[0::2], facebook_scrapers[1::2], [other_scraper]])
+
+
+if __name__ == '__main__':
+    unittest.main()
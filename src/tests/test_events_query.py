@@ -0,0 +1,60 @@
+import base64
+import datetime
+import json
+import unittest
+
+from sqlalchemy.orm import scoped_session
+
+from donight.events import Event
+from donight.events_query import encode_cursor, decode_cursor
+from donight.web import app as app_module
+from tests import create_test_session
+
+# The fields of an event returned by the api (the fields of the events table before the internal fields were added).
+API_EVENT_FIELDS = {'id', 'title', 'start_time', 'end_time', 'location', 'price', 'url', 'description', 'image',
+                    'owner', 'owner_url', 'ticket_url'}
+
+
+class CursorTest(unittest.TestCase):
+    def test_decodes_encoded_cursor(self):
+        start_time = datetime.datetime(2016, 3, 10, 21, 30)
+        self.assertEqual(decode_cursor(encode_cursor(start_time, 42)), (start_time, 42))
+
+    def test_invalid_cursors(self):
+        invalid_jsons = [[1, 2], ['2016-03-10T21:30:00', '42'], ['2016-03-10T21:30:00', True],
+                         ['2016-03-10T21:30:00'], {'a': 1}, 'text', None, ['not a time', 42]]
+        invalid_cursors = [base64.urlsafe_b64encode(json.dumps(invalid_json)) for invalid_json in invalid_jsons]
+
+        for cursor in invalid_cursors + ['not base64!', base64.urlsafe_b64encode('not json')]:
+            with self.assertRaises(ValueError):
+                decode_cursor(cursor)
+
+
+class EventsApiTest(unittest.TestCase):
+    def setUp(self):
+        session = create_test_session()
+        session.add(Event(title=u'Jazz night', location=u'Ozen', start_time=datetime.datetime.now(),
+                          latitude=32.07, longitude=34.78, content_hash='0' * 40))
+        session.commit()
+
+        self.read_session = app_module.ReadSession
+        app_module.ReadSession = scoped_session(lambda: session)
+        self.client = app_module.app.test_client()
+
+    def tearDown(self):
+        app_module.ReadSession = self.read_session
+
+    def test_api_events_have_only_public_fields(self):
+        response = self.client.get('/api/events?location=Ozen')
+        self.assertEqual(response.status_code, 200)
+
+        events = json.loads(response.data)['events']
+        self.assertEqual(len(events), 1)
+        self.assertEqual(set(events[0]), API_EVENT_FIELDS)
+
+    def test_internal_fields_cant_be_requested(self):
+        self.assertEqual(self.client.get('/api/events?fields=title,geohash').status_code, 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,26 @@
+import datetime
+import os
+import shutil
+import tempfile
+import unittest
+
+from openpyxl import load_workbook
+
+from donight.applications.events_to_excel import EventsExcel
+from donight.events import Event
+
+
+class EventsExcelTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.excel_path = os.path.join(self.directory, 'events.xlsx')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_control_characters_are_removed(self):
+        event = Event(title=u'Jazz\x0b night\x1f', location=u'Ozen', start_time=datetime.datetime(2016, 3, 10, 21))
+        EventsExcel(field_names=[u'title', u'location']).write([event], self.excel_path)
+
+        rows = [[cell.value for cell in row] for row in load_workbook(self.excel_path).active.rows]
+        self.assertEqual(rows, [[u'Title', u'Location'], [u'2016-03-10', None], [u'Jazz night', u'Ozen']])
@@ -0,0 +1,260 @@
+import json
+import os
+import shutil
+import stat
+import tempfile
+import time
+import unittest
+import urlparse
+from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+from logging import getLogger, NullHandler
+from threading import Thread
+
+import facebook
+
+from donight.errors import EventScrapingError
+from donight.event_finder.scraping_halt_condition import MaxEventsHaltCondition
+from donight.event_finder.scrapers import facebook_events
+from donight.event_finder.scrapers.facebook_events import (FacebookEventsScraper, FacebookEventScraper, AuthError,
+                                                           CanceledEventError, AccessTokensStore)
+
+EMAIL = 'user@example.com'
+EXPIRED_ACCESS_TOKEN = 'expired-token'
+FRESH_ACCESS_TOKEN = 'fresh-token'
+OAUTH_ERROR = {'error': {'type': 'OAuthException', 'code': 190, 'message': 'Error validating access token.'}}
+NOT_FOUND_ERROR = {'error': {'type': 'GraphMethodException', 'code': 100, 'message': 'Unsupported get request.'}}
+
+# The failures of the scraped events are logged.
+logger = getLogger(__name__)
+logger.addHandler(NullHandler())
+
+
+class StubGraphHandler(BaseHTTPRequestHandler):
+    """
+    Answers graph api requests from the server's events dict (a dict from an event id to its graph api dict),
+    every request of a batch sent with the expired access token is answered with an OAuthException,
+    and so are the edge requests sent with one of the server's rejected edge tokens.
+    """
+    def do_GET(self):
+        path, _, query = self.path.partition('?')
+        args = urlparse.parse_qs(query)
+
+        if path == '/v2.5/debug_token':
+            self.send_json({'data': {'is_valid': True, 'expires_at': int(time.time()) + 60 * 60}})
+        elif path == '/v2.5/me/events':
+            self.server.edge_requests.append(args)
+            if args['access_token'][0] in self.server.rejected_edge_tokens:
+                self.send_json(OAUTH_ERROR, status=400)
+            else:
+                self.send_json({'data': [{'id': event_id} for event_id in sorted(self.server.events)]})
+        else:
+            self.send_json(NOT_FOUND_ERROR, status=400)
+
+    def do_POST(self):
+        form = urlparse.parse_qs(self.rfile.read(int(self.headers['Content-Length'])))
+        access_token = form['access_token'][0]
+        batch = json.loads(form['batch'][0])
+        self.server.batches.append((access_token, [request['relative_url'] for request in batch]))
+
+        responses = []
+        for request in batch:
+            event_id = request['relative_url'].partition('?')[0]
+            if access_token == EXPIRED_ACCESS_TOKEN:
+                responses.append({'code': 400, 'body': json.dumps(OAUTH_ERROR)})
+            elif event_id in self.server.events:
+                responses.append({'code': 200, 'body': json.dumps(self.server.events[event_id])})
+            else:
+                responses.append({'code': 400, 'body': json.dumps(NOT_FOUND_ERROR)})
+
+        self.send_json(responses)
+
+    def send_json(self, obj, status=200):
+        body = json.dumps(obj)
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class StubTokenFacebookEventsScraper(FacebookEventsScraper):
+    """
+    Scrapes a fresh access token without a browser, and browses a page in a single load.
+    """
+    def _FacebookEventsScraper__scrape_access_token(self, driver):
+        self._access_token = FRESH_ACCESS_TOKEN
+        return FRESH_ACCESS_TOKEN
+
+    def _FacebookEventsScraper__load_more_posts(self, driver):
+        return False
+
+
+class StubDriver(object):
+    """
+    A browser whose pages hold anchors to the given events.
+    """
+    def __init__(self, events_ids):
+        self.events_ids = events_ids
+        self.browsed_urls = []
+
+    def get(self, url):
+        self.browsed_urls.append(url)
+
+    def execute_script(self, script):
+        return ['https://www.facebook.com/events/{}/'.format(event_id) for event_id in self.events_ids]
+
+
+def create_event_dict(event_id, **fields):
+    event_dict = {'id': event_id, 'name': 'Event ' + event_id, 'start_time': '2016-03-10T21:00:00+0200',
+                  'place': {'name': 'Ozen', 'location': {'latitude': 32.07, 'longitude': 34.77}},
+                  'updated_time': '2016-03-01T10:00:00+0000'}
+    event_dict.update(fields)
+    return event_dict
+
+
+class FacebookGraphStubTest(unittest.TestCase):
+    def setUp(self):
+        self.server = HTTPServer(('127.0.0.1', 0), StubGraphHandler)
+        self.server.events = {}
+        self.server.batches = []
+        self.server.edge_requests = []
+        self.server.rejected_edge_tokens = set()
+        self.server_thread = Thread(target=self.server.serve_forever)
+        self.server_thread.daemon = True
+        self.server_thread.start()
+
+        self.original_graph_url = facebook.FACEBOOK_GRAPH_URL
+        facebook.FACEBOOK_GRAPH_URL = 'http://127.0.0.1:{}/'.format(self.server.server_port)
+
+        # The facebook scrapers store their access tokens and cached events in these paths.
+        self.stores_dir = tempfile.mkdtemp()
+        self.original_stores_paths = (facebook_events.FACEBOOK_ACCESS_TOKENS_PATH,
+                                      facebook_events.FACEBOOK_EVENTS_CACHE_PATH)
+        facebook_events.FACEBOOK_ACCESS_TOKENS_PATH = os.path.join(self.stores_dir, 'access_tokens.json')
+        facebook_events.FACEBOOK_EVENTS_CACHE_PATH = os.path.join(self.stores_dir, 'events_cache.json')
+        self.reset_shared_stores()
+
+    def tearDown(self):
+        facebook.FACEBOOK_GRAPH_URL = self.original_graph_url
+        facebook_events.FACEBOOK_ACCESS_TOKENS_PATH, facebook_events.FACEBOOK_EVENTS_CACHE_PATH = \
+            self.original_stores_paths
+        self.reset_shared_stores()
+        shutil.rmtree(self.stores_dir)
+
+        self.server.shutdown()
+        self.server.server_close()
+
+    @staticmethod
+    def reset_shared_stores():
+        FacebookEventsScraper._FacebookEventsScraper__access_tokens_store = None
+        FacebookEventsScraper._FacebookEventsScraper__events_cache = None
+
+    def test_scrape_many_in_a_single_batch(self):
+        self.server.events = {'1': create_event_dict('1'), '2': create_event_dict('2', is_canceled=True)}
+
+        results = FacebookEventScraper(FRESH_ACCESS_TOKEN).scrape_many(['1', '2', '3'])
+
+        self.assertEqual(len(self.server.batches), 1)
+        self.assertEqual([relative_url.partition('?')[0] for relative_url in self.server.batches[0][1]],
+                         ['1', '2', '3'])
+        self.assertEqual(results[0].title, u'Event 1')
+        self.assertEqual((results[0].location, results[0].latitude), (u'Ozen', 32.07))
+        self.assertIsInstance(results[1], CanceledEventError)
+        self.assertIsInstance(results[2], EventScrapingError)
+        self.assertNotIsInstance(results[2], CanceledEventError)
+
+    def test_scrape_many_raises_auth_error_for_item_oauth_exception(self):
+        self.server.events = {'1': create_event_dict('1')}
+
+        with self.assertRaises(AuthError):
+            FacebookEventScraper(EXPIRED_ACCESS_TOKEN).scrape_many(['1'])
+
+    def test_cached_events_are_only_probed(self):
+        self.server.events = {'1': create_event_dict('1'), '2': create_event_dict('2')}
+        events_cache = facebook_events.FacebookEventsCache(facebook_events.FACEBOOK_EVENTS_CACHE_PATH, ttl=60)
+        FacebookEventScraper(FRESH_ACCESS_TOKEN, events_cache).scrape_many(['1', '2'])
+
+        self.server.events['2'] = create_event_dict('2', name='Renamed', updated_time='2016-03-02T10:00:00+0000')
+        results = FacebookEventScraper(FRESH_ACCESS_TOKEN, events_cache).scrape_many(['1', '2'])
+
+        self.assertEqual([event.title for event in results], [u'Event 1', u'Renamed'])
+        self.assertEqual(self.server.batches[1][1], ['1?fields=updated_time', '2?fields=updated_time'])
+        self.assertEqual([relative_url.partition('?')[0] for relative_url in self.server.batches[2][1]], ['2'])
+
+    def test_refreshes_access_token_and_retries_chunk(self):
+        self.server.events = {'1': create_event_dict('1'), '2': create_event_dict('2', is_canceled=True),
+                              '3': create_event_dict('3')}
+        events = list(self.create_scraper(StubDriver([])).scrape())
+
+        self.assertEqual([event.title for event in events], [u'Event 1', u'Event 3'])
+        self.assertEqual([(access_token, len(relative_urls)) for access_token, relative_urls in self.server.batches],
+                         [(EXPIRED_ACCESS_TOKEN, 3), (FRESH_ACCESS_TOKEN, 3)])
+        self.assertEqual(FacebookEventsScraper.get_access_tokens_store().get(EMAIL), FRESH_ACCESS_TOKEN)
+
+    def test_refreshes_access_token_and_retries_edge(self):
+        self.server.events = {'1': create_event_dict('1'), '2': create_event_dict('2')}
+        self.server.rejected_edge_tokens = {EXPIRED_ACCESS_TOKEN}
+        driver = StubDriver([])
+
+        events = list(self.create_scraper(driver).scrape())
+
+        self.assertEqual([event.title for event in events], [u'Event 1', u'Event 2'])
+        self.assertEqual([args['access_token'] for args in self.server.edge_requests],
+                         [[EXPIRED_ACCESS_TOKEN], [FRESH_ACCESS_TOKEN]])
+        self.assertEqual([access_token for access_token, _ in self.server.batches], [FRESH_ACCESS_TOKEN])
+        self.assertEqual(driver.browsed_urls, [])
+
+    def test_browses_page_if_edge_retry_fails(self):
+        self.server.events = {'1': create_event_dict('1'), '2': create_event_dict('2')}
+        self.server.rejected_edge_tokens = {EXPIRED_ACCESS_TOKEN, FRESH_ACCESS_TOKEN}
+        driver = StubDriver(['2'])
+
+        events = list(self.create_scraper(driver).scrape())
+
+        self.assertEqual([event.title for event in events], [u'Event 2'])
+        self.assertEqual(len(self.server.edge_requests), 2)
+        self.assertEqual(driver.browsed_urls, ['https://www.facebook.com/events/subscribed'])
+
+    def test_fetches_no_events_past_halt_condition(self):
+        self.server.events = {str(event_id): create_event_dict(str(event_id)) for event_id in xrange(10, 20)}
+        self.server.events['11'] = create_event_dict('11', is_canceled=True)
+
+        scraper = self.create_scraper(StubDriver([]), MaxEventsHaltCondition(3))
+        FacebookEventsScraper.get_access_tokens_store().set(EMAIL, FRESH_ACCESS_TOKEN, None)
+        events = list(scraper.scrape())
+
+        self.assertEqual([event.title for event in events], [u'Event 10', u'Event 12', u'Event 13'])
+        # The canceled event isn't counted by the halt condition, so one more event is fetched in another batch.
+        self.assertEqual([[relative_url.partition('?')[0] for relative_url in relative_urls]
+                          for _, relative_urls in self.server.batches], [['10', '11', '12'], ['13']])
+
+    @staticmethod
+    def create_scraper(driver, halt_condition=None):
+        FacebookEventsScraper.get_access_tokens_store().set(EMAIL, EXPIRED_ACCESS_TOKEN, None)
+        return StubTokenFacebookEventsScraper(page_url='https://www.facebook.com/events/subscribed',
+                                              graph_edge='me/events', email=EMAIL, password=None,
+                                              halt_condition=halt_condition or MaxEventsHaltCondition(10),
+                                              driver=driver, logger=logger)
+
+
+class AccessTokensStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.stores_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.stores_dir)
+
+    def test_access_tokens_are_only_readable_by_owner(self):
+        tokens_path = os.path.join(self.stores_dir, 'donight', 'access_tokens.json')
+        AccessTokensStore(tokens_path, refresh_margin=0).set(EMAIL, FRESH_ACCESS_TOKEN, None)
+
+        self.assertEqual(stat.S_IMODE(os.stat(tokens_path).st_mode), 0600)
+        self.assertEqual(stat.S_IMODE(os.stat(os.path.dirname(tokens_path)).st_mode), 0700)
+        self.assertEqual(AccessTokensStore(tokens_path, refresh_margin=0).get(EMAIL), FRESH_ACCESS_TOKEN)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,112 @@
+import shutil
+import tempfile
+import unittest
+from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+from threading import Thread
+
+from donight.utils.http_cache import HttpCache
+
+ETAG = '"v1"'
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """
+    Answers /etag with a response validated by an ETag (and 304 when it is sent back),
+    and /plain with a response without validators.
+    The contents are taken from the server's contents dict.
+    """
+    def do_GET(self):
+        self.server.requests.append((self.path, self.headers.get('If-None-Match')))
+
+        if self.path == '/etag' and self.headers.get('If-None-Match') == ETAG:
+            self.send_response(304)
+            self.end_headers()
+            return
+
+        content = self.server.contents[self.path]
+        self.send_response(200)
+        if self.path == '/etag':
+            self.send_header('ETag', ETAG)
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, *args):
+        pass
+
+
+class HttpCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.server = HTTPServer(('127.0.0.1', 0), StubHandler)
+        self.server.contents = {'/etag': 'etag content', '/plain': 'plain content'}
+        self.server.requests = []
+        self.server_thread = Thread(target=self.server.serve_forever)
+        self.server_thread.daemon = True
+        self.server_thread.start()
+
+        self.cache_dir = tempfile.mkdtemp()
+        self.cache = self.create_cache()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        shutil.rmtree(self.cache_dir)
+
+    def create_cache(self):
+        return HttpCache(self.cache_dir, ttl=60, max_size=1024 * 1024)
+
+    def fetch(self, path, cache=None, stage=None):
+        return (cache or self.cache).fetch('GET', 'http://127.0.0.1:{}{}'.format(self.server.server_port, path),
+                                           stage=stage)
+
+    def test_not_modified_response(self):
+        first_response = self.fetch('/etag')
+        self.assertEqual((first_response.content, first_response.is_modified), ('etag content', True))
+
+        second_response = self.fetch('/etag')
+        self.assertEqual(self.server.requests[-1], ('/etag', ETAG))
+        self.assertEqual((second_response.content, second_response.is_modified), ('etag content', False))
+
+    def test_unchanged_content(self):
+        self.assertTrue(self.fetch('/plain').is_modified)
+        self.assertFalse(self.fetch('/plain').is_modified)
+
+        self.server.contents['/plain'] = 'changed content'
+        response = self.fetch('/plain')
+        self.assertEqual((response.content, response.is_modified), ('changed content', True))
+
+    def test_responses_are_stored_on_disk(self):
+        self.fetch('/plain')
+        self.assertFalse(self.fetch('/plain', cache=self.create_cache()).is_modified)
+
+    def test_staged_responses_are_stored_on_commit(self):
+        self.assertTrue(self.fetch('/etag', stage='source').is_modified)
+        self.assertTrue(self.fetch('/etag', stage='source').is_modified)
+        self.assertEqual(self.server.requests[-1], ('/etag', None))
+
+        self.cache.commit('source')
+        self.assertFalse(self.fetch('/etag', cache=self.create_cache(), stage='source').is_modified)
+
+    def test_discarded_responses_are_not_stored(self):
+        self.fetch('/plain', stage='source')
+        self.cache.discard('source')
+        self.cache.commit('source')
+
+        self.assertTrue(self.fetch('/plain').is_modified)
+
+    def test_least_recently_used_responses_are_evicted(self):
+        self.server.contents.update({'/other': 'other content', '/same': 'plain content'})
+        cache = HttpCache(self.cache_dir, ttl=60, max_size=len('plain content') + len('other content') - 1)
+
+        self.fetch('/plain', cache)
+        # Responses with the same content share it, so they are stored (and counted) once.
+        self.fetch('/same', cache)
+        self.assertFalse(self.fetch('/plain', cache).is_modified)
+
+        self.fetch('/other', cache)
+        self.assertTrue(self.fetch('/plain', cache).is_modified)
+        self.assertTrue(self.fetch('/same', cache).is_modified)
+
+
+if __name__ == '__main__':
+    unittest.main()
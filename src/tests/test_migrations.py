@@ -0,0 +1,43 @@
+import unittest
+
+from sqlalchemy import create_engine, text
+
+from donight import migrations
+from donight.events import Base
+
+# The events table before migrations existed.
+CREATE_FIRST_EVENTS_TABLE = """
+CREATE TABLE events (id INTEGER PRIMARY KEY, title VARCHAR(1024), start_time DATETIME, end_time DATETIME,
+                     location VARCHAR(1024), price VARCHAR(1024), url VARCHAR(1024), description TEXT,
+                     image VARCHAR(1024), owner VARCHAR(1024), owner_url VARCHAR(1024), ticket_url VARCHAR(1024))
+"""
+
+
+class MigrationsTest(unittest.TestCase):
+    def setUp(self):
+        self.engine = create_engine('sqlite://')
+        self.engine.execute(text(CREATE_FIRST_EVENTS_TABLE))
+
+    def insert_event(self, event_id, title, start_time, description=None, ticket_url=None):
+        self.engine.execute(text('INSERT INTO events (id, title, location, start_time, description, ticket_url) '
+                                 'VALUES (:id, :title, :location, :start_time, :description, :ticket_url)'),
+                            id=event_id, title=title, location=u'Ozen', start_time=start_time,
+                            description=description, ticket_url=ticket_url)
+
+    def test_duplicate_events_are_merged(self):
+        self.insert_event(1, u'Jazz night', '2016-03-10 21:00:00.000000', description=u'Old description')
+        self.insert_event(2, u'Jazz night', '2016-03-10 22:00:00.000000', ticket_url=u'https://tickets')
+        self.insert_event(3, u'Jazz night', '2016-03-10 22:00:00.000000', description=u'New description')
+        self.insert_event(4, u'Jazz night', '2016-03-11 21:00:00.000000')
+
+        migrations.migrate(self.engine, Base.metadata)
+
+        events = self.engine.execute(text('SELECT id, start_time, description, ticket_url FROM events ORDER BY id'))
+        self.assertEqual([tuple(event) for event in events],
+                         [(1, u'2016-03-10 22:00:00.000000', u'New description', u'https://tickets'),
+                          (4, u'2016-03-11 21:00:00.000000', None, None)])
+        self.assertEqual(migrations.get_schema_version(self.engine.connect()), migrations.LATEST_VERSION)
+
+
+if __name__ == '__main__':
+    unittest.main()
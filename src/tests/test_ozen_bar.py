@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+import datetime
+import os
+import unittest
+from logging import getLogger, NullHandler
+
+from donight.event_finder.scrapers.ozen_bar import OzenBarScraper
+from donight.scripts.benchmark_ozen_bar import parse_with_beautifulsoup, to_comparable
+from donight.utils import to_local_timezone
+
+MONTH_HTML_PATH = os.path.join(os.path.dirname(__file__), 'fixtures', 'ozen_bar_month.html')
+
+# The canceled event of the month fails to parse, which is logged.
+logger = getLogger(__name__)
+logger.addHandler(NullHandler())
+
+
+class OzenBarParsingTest(unittest.TestCase):
+    def setUp(self):
+        self.scraper = OzenBarScraper(logger=logger)
+        with open(MONTH_HTML_PATH, 'rb') as month_html:
+            self.month_html = month_html.read()
+
+    def test_parses_events_like_beautifulsoup(self):
+        events = self.scraper.parse_events(self.month_html, 2016, 3)
+
+        self.assertEqual(to_comparable(events), to_comparable(parse_with_beautifulsoup(self.month_html, 2016, 3)))
+
+    def test_parses_event_fields(self):
+        events = self.scraper.parse_events(self.month_html, 2016, 3)
+
+        self.assertEqual(len(events), 5)
+        # The canceled event has no time.
+        self.assertIsNone(events[3])
+
+        first_event = events[0]
+        self.assertEqual(first_event.title, u'הלה & המינוריות - השקת אלבום')
+        self.assertEqual(first_event.start_time, to_local_timezone(datetime.datetime(2016, 3, 3, 20, 30)))
+        self.assertEqual(first_event.price, u'60 ₪')
+        self.assertEqual(first_event.image, u'http://www.ozenbar.com/wp-content/uploads/2016/02/minor-300x200.jpg')
+        self.assertEqual(events[1].title, u'Jazz Monday: The Yoni Rechter Songbook')
+
+    def test_blank_month(self):
+        self.assertEqual(self.scraper.parse_events('', 2016, 3), [])
+        self.assertEqual(self.scraper.parse_events(' \n', 2016, 3), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,19 @@
+import unittest
+
+from donight.errors import NoSourcesError
+from donight.event_finder.scrapers.registry import ScrapersRegistry
+
+
+class ScrapersRegistryTest(unittest.TestCase):
+    def test_no_registered_sources(self):
+        registry = ScrapersRegistry('donight.tests.unregistered_scrapers')
+
+        self.assertEqual(registry.get_sources_names(), [])
+        with self.assertRaises(NoSourcesError):
+            registry.get_scrapers()
+        with self.assertRaises(NoSourcesError):
+            registry.get_scrapers(['levontin7'])
+
+
+if __name__ == '__main__':
+    unittest.main()
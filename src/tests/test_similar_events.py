@@ -0,0 +1,51 @@
+import datetime
+import unittest
+
+from donight.event_finder import EventFinder
+from donight.event_finder.similar_events import SimilarEventsIndex
+from donight.events import Event
+from tests import create_test_session
+
+START_TIME = datetime.datetime(2016, 3, 10, 21)
+
+
+class SimilarEventsIndexTest(unittest.TestCase):
+    def test_similar_title_at_same_venue(self):
+        event = Event(title=u'Jazz night', location=u'Ozen, Tel Aviv', start_time=START_TIME)
+        index = SimilarEventsIndex([event])
+
+        similar_event = Event(title=u'Jazz nights', location=u'ozen tel-aviv', start_time=START_TIME)
+        self.assertIs(index.find(similar_event), event)
+
+    def test_venues_sharing_words_are_different(self):
+        index = SimilarEventsIndex([Event(title=u'Jazz night', location=u'Ozen, Tel Aviv', start_time=START_TIME)])
+
+        other_venue_event = Event(title=u'Jazz nights', location=u'Barby, Tel Aviv', start_time=START_TIME)
+        self.assertIsNone(index.find(other_venue_event))
+
+    def test_different_days_are_different(self):
+        index = SimilarEventsIndex([Event(title=u'Jazz night', location=u'Ozen', start_time=START_TIME)])
+
+        next_day_event = Event(title=u'Jazz night', location=u'Ozen',
+                               start_time=START_TIME + datetime.timedelta(days=1))
+        self.assertIsNone(index.find(next_day_event))
+
+
+class UploadSimilarEventsTest(unittest.TestCase):
+    def test_events_at_venues_sharing_words_are_both_kept(self):
+        session = create_test_session()
+        event_finder = EventFinder(scrapers=[None], session=session)
+
+        event_finder.upload_to_db([Event(title=u'Jazz night', location=u'Ozen, Tel Aviv', start_time=START_TIME,
+                                         latitude=32.07, longitude=34.78)])
+        summary = event_finder.upload_to_db([Event(title=u'Jazz nights', location=u'Barby, Tel Aviv',
+                                                   start_time=START_TIME)])
+
+        self.assertEqual(summary.created, 1)
+        events = session.query(Event).order_by(Event.id).all()
+        self.assertEqual([event.location for event in events], [u'Ozen, Tel Aviv', u'Barby, Tel Aviv'])
+        self.assertEqual((events[0].latitude, events[0].longitude), (32.07, 34.78))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+import datetime
+import gzip
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from sqlalchemy.orm import scoped_session
+
+from donight.events import Event
+from donight.snapshot import publish_events_snapshot, EventsSnapshot
+from donight.web import app as app_module
+from tests import create_test_session
+from tests.test_events_query import API_EVENT_FIELDS
+
+
+class EventsSnapshotTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.snapshot_path = os.path.join(self.directory, 'events_snapshot.json.gz')
+
+        self.session = create_test_session()
+        self.event = Event(title=u'Jazz night', location=u'Ozen', start_time=datetime.datetime.now(),
+                           latitude=32.07, longitude=34.78, content_hash='0' * 40)
+        self.session.add(self.event)
+        self.session.commit()
+
+        self.read_session = app_module.ReadSession
+        self.events_snapshot = app_module.events_snapshot
+        app_module.ReadSession = scoped_session(lambda: self.session)
+        self.client = app_module.app.test_client()
+
+    def tearDown(self):
+        app_module.ReadSession = self.read_session
+        app_module.events_snapshot = self.events_snapshot
+        shutil.rmtree(self.directory)
+
+    def test_snapshot_has_only_public_fields(self):
+        publish_events_snapshot(self.session, self.snapshot_path)
+
+        snapshot_file = gzip.open(self.snapshot_path)
+        try:
+            events = json.load(snapshot_file)
+        finally:
+            snapshot_file.close()
+        self.assertEqual([set(event) for event in events], [API_EVENT_FIELDS])
+
+    def test_all_events_have_only_public_fields(self):
+        app_module.events_snapshot = None
+        events = json.loads(self.client.get('/api/events/all').data)
+        self.assertEqual([set(event) for event in events], [API_EVENT_FIELDS])
+
+    def test_etag_ignores_internal_fields(self):
+        publish_events_snapshot(self.session, self.snapshot_path)
+        etag, _ = EventsSnapshot(self.snapshot_path).get()
+
+        self.event.content_hash = '1' * 40
+        self.event.latitude, self.event.longitude = 32.08, 34.79
+        self.session.commit()
+        publish_events_snapshot(self.session, self.snapshot_path)
+        self.assertEqual(EventsSnapshot(self.snapshot_path).get()[0], etag)
+
+        self.event.price = u'50'
+        self.session.commit()
+        publish_events_snapshot(self.session, self.snapshot_path)
+        self.assertNotEqual(EventsSnapshot(self.snapshot_path).get()[0], etag)
+
+
+if __name__ == '__main__':
+    unittest.main()